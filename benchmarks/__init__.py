@@ -0,0 +1 @@
+"""Synthetic fleets and timing runs; see benchmarks/run.py"""
@@ -0,0 +1,45 @@
+import random
+from typing import Any, Dict, List, Optional
+
+
+STATUS_WEIGHTS = (("online", 0.8), ("offline", 0.15), ("maintenance", 0.05))
+
+
+def classroom_count(size: int) -> int:
+    """Roughly 25 seats per room, capped at a few hundred rooms for large fleets"""
+    return max(1, min(400, size // 25))
+
+
+def generate_fleet(size: int, classrooms: Optional[int] = None, seed: int = 0) -> List[Dict[str, Any]]:
+    """Deterministic synthetic inventory rows in the shape InventoryReader produces
+
+    Rooms get uneven sizes (like a real school, a few labs are much larger
+    than the rest) so per-classroom benchmarks see realistic skew.
+    """
+    rng = random.Random(seed)
+    rooms = [f"Кабинет {number:03d}" for number in range(1, (classrooms or classroom_count(size)) + 1)]
+    weights = [rng.paretovariate(2.0) for _ in rooms]
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    status_weights = [weight for _, weight in STATUS_WEIGHTS]
+
+    fleet = []
+    counters = dict.fromkeys(rooms, 0)
+    for index in range(size):
+        classroom = rng.choices(rooms, weights)[0]
+        counters[classroom] += 1
+        host = index + 1
+        fleet.append({
+            "name": f"ПК-{counters[classroom]:03d}",
+            "ip_address": f"10.{host >> 16 & 255}.{host >> 8 & 255}.{host & 255}",
+            "classroom": classroom,
+            "status": rng.choices(statuses, status_weights)[0],
+            "mac_address": "02:00:" + ":".join(f"{host >> shift & 255:02X}" for shift in (24, 16, 8, 0))
+        })
+    return fleet
+
+
+def largest_classroom(fleet: List[Dict[str, Any]]) -> str:
+    counts: Dict[str, int] = {}
+    for row in fleet:
+        counts[row["classroom"]] = counts.get(row["classroom"], 0) + 1
+    return max(counts, key=counts.get)
@@ -0,0 +1,261 @@
+"""Benchmarks for storage queries, service object construction, search, table rendering and login
+
+    python -m benchmarks.run                        # run and print the results
+    python -m benchmarks.run --save-baseline        # store them in benchmarks/baselines.json (not committed)
+    python -m benchmarks.run --compare              # exit with 1 on a regression
+
+The SQLite backend in a temporary directory is used by default, so no server
+is needed. With --backend postgres the DB_* settings are used together with
+--database, whose computers table is emptied before every fleet size.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from models.auth_service import AuthService
+from models.computer_service import ComputerService
+from models.password_hasher import PasswordHasher
+from models.settings_service import SettingsService
+from models.storage import StorageBackend, create_storage, page_key
+from .fleet import generate_fleet, largest_classroom
+
+
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def measure(fn: Callable[[int], Any], repeat: int) -> Dict[str, float]:
+    """Time fn(iteration) `repeat` times; fn gets the iteration number to vary its input"""
+    timings = []
+    for iteration in range(repeat):
+        started = time.perf_counter()
+        fn(iteration)
+        timings.append(time.perf_counter() - started)
+    return {"median": statistics.median(timings), "min": min(timings), "runs": repeat}
+
+
+def open_storage(backend: str, workdir: str, database: str) -> StorageBackend:
+    hasher = PasswordHasher(**Config.get_password_hasher_config())
+    if backend == "sqlite":
+        return create_storage("sqlite", path=os.path.join(workdir, "bench.db"), password_hasher=hasher)
+    options = dict(Config.get_db_config(), database=database)
+    return create_storage("postgres", password_hasher=hasher, **options)
+
+
+def reset_fleet(storage: StorageBackend):
+    # Deliberately outside StorageBackend: only benchmarks wipe the fleet
+    if hasattr(storage, "_transaction"):
+        with storage._transaction() as cur:
+            cur.execute("DELETE FROM computers")
+    else:
+        with storage.get_connection() as conn:
+            conn.cursor().execute("TRUNCATE computers RESTART IDENTITY")
+            conn.commit()
+
+
+class UiBench:
+    """An offscreen MainView bound to the benchmark storage"""
+
+    def __init__(self, storage: StorageBackend):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+        from viewmodels.main_viewmodel import MainViewModel
+        from views.main_view import MainView
+
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self.view_model = MainViewModel(
+            AuthService(storage), ComputerService(storage), SettingsService(storage)
+        )
+        self.view = MainView(self.view_model)
+        self.view.show()
+        self.settle()
+
+    def settle(self):
+        self.app.processEvents()
+        while self.view_model.is_busy:
+            time.sleep(0.001)
+            self.app.processEvents()
+
+    def load(self, computers):
+        self.view_model._set_computers(computers)
+        self.settle()
+
+    def update_pc_table(self):
+        self.view.update_pc_table()
+        self.view.pc_table.viewport().repaint()
+
+    def apply_theme(self, theme: str):
+        """Theme switch including the re-polish and repaint it causes"""
+        from utils.theme_manager import ThemeManager
+        ThemeManager.apply_theme(theme)
+        self.app.processEvents()
+        self.view.repaint()
+
+    def close(self):
+        self.view.close()
+        self.settle()
+
+
+def run_size(storage: StorageBackend, size: int, repeat: int, ui: Optional[UiBench]) -> Dict[str, Dict]:
+    results = {}
+
+    def record(name: str, fn: Callable[[int], Any], runs: int = repeat):
+        results[f"{name}[{size}]"] = measure(fn, runs)
+
+    fleet = generate_fleet(size)
+    reset_fleet(storage)
+    record("db.import_computers", lambda _: storage.import_computers(fleet), runs=1)
+    record("db.import_computers_dry_run", lambda _: storage.import_computers(fleet, dry_run=True))
+
+    room = largest_classroom(fleet)
+    rows = list(storage.iter_all_computers())
+    ids = [row["id"] for row in rows]
+    sample = ids[::10]
+    # A page from the middle of the fleet costs the same as the first one
+    middle = page_key(rows[len(rows) // 2])
+
+    record("db.get_classrooms", lambda _: storage.get_classrooms())
+    record("db.get_computers_by_classroom", lambda _: storage.get_computers_by_classroom(room))
+    record("db.get_all_computers", lambda _: storage.get_all_computers())
+    record("db.get_computers_page", lambda _: storage.get_computers_page(middle, Config.COMPUTERS_PAGE_SIZE))
+    record("db.iter_all_computers", lambda _: sum(1 for _ in storage.iter_all_computers()))
+    record("db.update_statuses", lambda i: storage.update_statuses(
+        dict.fromkeys(sample, "offline" if i % 2 == 0 else "online")
+    ))
+    record("db.update_status_bulk", lambda i: storage.update_status_bulk(
+        "offline" if i % 2 == 0 else "online", classroom=room
+    ))
+
+    service = ComputerService(storage)
+    record("service.get_computers_by_classroom",
+           lambda _: service.get_computers_by_classroom(room, use_cache=False))
+    record("service.get_all_computers", lambda _: service.get_all_computers())
+    record("search.build_index", lambda _: service.build_search_index())
+    queries = [rows[0]["ip"], rows[len(rows) // 2]["name"], rows[-1]["ip"][:5]]
+    record("search.query", lambda i: service.search_computers(queries[i % len(queries)]))
+
+    if ui is not None:
+        computers = [computer for rows in service.get_all_computers().values() for computer in rows]
+        ui.load(computers)
+        record("ui.update_pc_table", lambda _: ui.update_pc_table())
+        themes = ["dark", "glass", "light"]
+        record("ui.apply_theme", lambda i: ui.apply_theme(themes[i % len(themes)]))
+    return results
+
+
+def run_login(storage: StorageBackend, repeat: int) -> Dict[str, Dict]:
+    auth = AuthService(storage)
+    results = {"auth.login": measure(lambda _: auth.authenticate_user("admin", "admin123"), repeat)}
+    config = Config.get_password_hasher_config()
+    for algorithm in PasswordHasher.ALGORITHMS:
+        hasher = PasswordHasher(**dict(config, algorithm=algorithm))
+        encoded = hasher.hash("admin123")
+        results[f"auth.verify.{algorithm}"] = measure(lambda _: hasher.verify("admin123", encoded), repeat)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+            min_delta: float) -> List[str]:
+    """Names slower than the baseline by more than threshold and min_delta
+
+    The fastest run is compared: it is the least disturbed by other load on
+    the machine, while the median is what the table shows.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = result["min"] - base["min"]
+        if slower > min_delta and result["min"] > base["min"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]], regressions: List[str]):
+    print(f"{'benchmark':<48} {'median ms':>11} {'min ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        line = f"{name:<48} {result['median'] * 1000:>11.3f} {result['min'] * 1000:>10.3f}"
+        base = (baseline or {}).get(name)
+        if base is not None:
+            change = (result["median"] / base["median"] - 1) * 100 if base["median"] else 0.0
+            line += f" {base['median'] * 1000:>10.3f} {change:>+7.1f}%"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="fleet sizes, comma separated (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the median is kept")
+    parser.add_argument("--backend", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--database", default="pc_manager_bench",
+                        help="PostgreSQL database to use (its computers are deleted)")
+    parser.add_argument("--no-ui", action="store_true", help="skip the offscreen Qt benchmarks")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with --baseline, exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument("--min-delta", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many milliseconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.exists(args.baseline):
+        # Checked before the run, which takes minutes at the default sizes
+        parser.error(f"no baseline at {args.baseline}; create one with --save-baseline first")
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="pc-bench-") as workdir:
+        storage = open_storage(args.backend, workdir, args.database)
+        ui = None if args.no_ui else UiBench(storage)
+        try:
+            results.update(run_login(storage, args.repeat))
+            for size in sizes:
+                print(f"fleet of {size} computers...", file=sys.stderr)
+                results.update(run_size(storage, size, args.repeat, ui))
+        finally:
+            if ui is not None:
+                ui.close()
+            storage.close()
+
+    baseline = None
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta / 1000)
+    print_results(results, baseline, regressions)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "backend": args.backend,
+                    "python": platform.python_version(),
+                    "machine": platform.platform(),
+                    "repeat": args.repeat,
+                },
+                "results": results
+            }, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
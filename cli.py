@@ -0,0 +1,264 @@
+"""Command line for scripted operations, without Qt
+
+    python cli.py rooms
+    python cli.py computers --classroom 101 --json
+    python cli.py status maintenance --classroom 101 --from-status offline
+    python cli.py import inventory.csv --apply
+    python cli.py wake --classroom 101
+    python cli.py sweep --classroom 101
+
+Every command logs in first, like the application: the user comes from
+--user or PC_MANAGER_USER and the password from PC_MANAGER_PASSWORD, or
+is asked for when running in a terminal. Storage is the one configured
+for the application (DB_BACKEND and the DB_* settings), used directly:
+the command fails instead of falling back to the local snapshot.
+
+Only argparse is loaded before the arguments are parsed; the storage
+driver, the services and asyncio (sweep only) are imported by the
+commands that need them, so `--help` and typos cost nothing and a
+command starts without the GUI libraries. --user and --json are accepted
+before or after the command. Exit status: 0 on success,
+1 when the database or some computer failed, 2 on usage errors, 3 when
+the login is refused.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_DENIED = 3
+
+
+def _ids(value: str) -> List[int]:
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидаются номера через запятую: {value!r}")
+
+
+def _common_options(**defaults) -> argparse.ArgumentParser:
+    options = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    options.add_argument("--user", help="логин (по умолчанию PC_MANAGER_USER)")
+    options.add_argument("--json", action="store_true", help="вывод в JSON")
+    options.set_defaults(**defaults)
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        parents=[_common_options(user=os.getenv("PC_MANAGER_USER"), json=False)]
+    )
+    # Repeated on every command so the options also work after its name;
+    # without defaults there a command keeps the value given before it
+    common = _common_options()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("rooms", parents=[common], help="список кабинетов")
+
+    computers = commands.add_parser("computers", parents=[common], help="компьютеры кабинета или всего парка")
+    computers.add_argument("--classroom")
+
+    # Values are checked against Computer.STATUSES once the models are loaded
+    status = commands.add_parser("status", parents=[common], help="изменить статус компьютеров")
+    status.add_argument("status", help="online, offline или maintenance")
+    status.add_argument("--classroom")
+    status.add_argument("--ids", type=_ids, help="номера компьютеров через запятую")
+    status.add_argument("--from-status", help="только компьютеры с этим статусом")
+
+    inventory = commands.add_parser("import", parents=[common], help="импорт инвентаря из JSON/CSV (администратор)")
+    inventory.add_argument("path")
+    inventory.add_argument("--apply", action="store_true",
+                           help="записать изменения; без флага только предварительный просмотр")
+
+    wake = commands.add_parser("wake", parents=[common], help="отправить Wake-on-LAN")
+    wake.add_argument("--classroom")
+    wake.add_argument("--ids", type=_ids, help="номера компьютеров через запятую")
+
+    sweep = commands.add_parser("sweep", parents=[common], help="проверить доступность и сохранить изменившиеся статусы")
+    sweep.add_argument("--classroom", help="по умолчанию весь парк")
+    return parser
+
+
+def _password() -> Optional[str]:
+    password = os.getenv("PC_MANAGER_PASSWORD")
+    if password is None and sys.stdin.isatty():
+        import getpass
+        password = getpass.getpass("Пароль: ")
+    return password
+
+
+def _print_computers(computers, as_json: bool):
+    if as_json:
+        _print_json([computer.to_dict() for computer in computers])
+        return
+    for computer in computers:
+        print("\t".join(str(value) for value in (
+            computer.id, computer.classroom, computer.name,
+            computer.ip_address, computer.status, computer.mac_address
+        )))
+
+
+def _print_json(value):
+    import json
+    print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+def cmd_rooms(args, service, user) -> int:
+    classrooms = service.get_classrooms()
+    if args.json:
+        _print_json(classrooms)
+    else:
+        print("\n".join(classrooms))
+    return 0
+
+
+def cmd_computers(args, service, user) -> int:
+    if args.classroom:
+        computers = service.get_computers_by_classroom(args.classroom, use_cache=False)
+    else:
+        computers = service.iter_computers()
+    _print_computers(computers, args.json)
+    return 0
+
+
+def cmd_status(args, service, user) -> int:
+    from models.computer import Computer
+
+    for status in (args.status, args.from_status):
+        if status is not None and status not in Computer.STATUSES:
+            print(f"Неизвестный статус: {status}", file=sys.stderr)
+            return EXIT_USAGE
+    if not args.classroom and args.ids is None:
+        print("Укажите --classroom или --ids", file=sys.stderr)
+        return EXIT_USAGE
+    computers = service.bulk_update_status(
+        args.status, computer_ids=args.ids, classroom=args.classroom, current_status=args.from_status
+    )
+    if computers is None:
+        print("Не удалось изменить статус: ошибка базы данных", file=sys.stderr)
+        return EXIT_FAILED
+    if args.json:
+        _print_computers(computers, True)
+    else:
+        print(f"Статус изменен на {args.status} у компьютеров: {len(computers)}")
+    return 0
+
+
+def cmd_import(args, service, user) -> int:
+    if not user.can_access_admin_features():
+        print("Импорт доступен только администратору", file=sys.stderr)
+        return EXIT_DENIED
+    try:
+        report = service.import_inventory(args.path, dry_run=not args.apply)
+    except ValueError as e:
+        print(f"Не удалось прочитать файл: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    if report is None:
+        print("Не удалось выполнить импорт: ошибка базы данных", file=sys.stderr)
+        return EXIT_FAILED
+    if args.json:
+        from dataclasses import asdict
+        _print_json(asdict(report))
+    else:
+        print(report.summary())
+        for error in report.errors:
+            print(error, file=sys.stderr)
+    return 0
+
+
+def cmd_wake(args, service, user) -> int:
+    if not args.classroom and args.ids is None:
+        print("Укажите --classroom или --ids", file=sys.stderr)
+        return EXIT_USAGE
+    if args.classroom:
+        computers = service.get_computers_by_classroom(args.classroom, use_cache=False)
+    else:
+        computers = service.iter_computers()
+    if args.ids is not None:
+        wanted = set(args.ids)
+        computers = [computer for computer in computers if computer.id in wanted]
+    results = service.wake_computers(list(computers))
+    if args.json:
+        from dataclasses import asdict
+        _print_json([{**asdict(result), "ok": result.ok} for result in results])
+    else:
+        for result in results:
+            print(f"{result.name}\t{result.target if result.ok else result.error}")
+        print(f"Сигнал включения отправлен: {sum(result.ok for result in results)} из {len(results)}")
+    return 0 if all(result.ok for result in results) else EXIT_FAILED
+
+
+def cmd_sweep(args, service, user) -> int:
+    computers = service.sweep_statuses(args.classroom)
+    _print_computers(computers, args.json)
+    if not args.json:
+        print(f"Статус изменился у компьютеров: {len(computers)}")
+    return 0
+
+
+COMMANDS = {
+    "rooms": cmd_rooms,
+    "computers": cmd_computers,
+    "status": cmd_status,
+    "import": cmd_import,
+    "wake": cmd_wake,
+    "sweep": cmd_sweep,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.user:
+        print("Укажите пользователя: --user или PC_MANAGER_USER", file=sys.stderr)
+        return EXIT_USAGE
+
+    import logging
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    from config import Config
+    from models.auth_service import AuthService
+    from models.computer_service import ComputerService
+    from models.wake_on_lan import WakeOnLanSender
+    from storage_setup import create_configured_storage
+
+    try:
+        storage = create_configured_storage()
+    except Exception as e:
+        print(f"База данных недоступна: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    # Storage methods swallow driver errors; any of them fails the command
+    failures = []
+    storage.failure_listener = lambda operation, error: failures.append(operation)
+    try:
+        success, user = AuthService(storage).authenticate_user(args.user, _password() or "")
+        if not success:
+            if failures:
+                print("База данных недоступна", file=sys.stderr)
+                return EXIT_FAILED
+            print("Неверный логин или пароль", file=sys.stderr)
+            return EXIT_DENIED
+        prober = None
+        if args.command == "sweep":
+            from models.reachability import ReachabilityProber
+            prober = ReachabilityProber(**Config.get_sweep_config())
+        service = ComputerService(storage, prober, WakeOnLanSender(**Config.get_wol_config()))
+        status = COMMANDS[args.command](args, service, user)
+    finally:
+        storage.close()
+    if status == 0 and failures:
+        print(f"Ошибка базы данных: {', '.join(sorted(set(failures)))}", file=sys.stderr)
+        return EXIT_FAILED
+    return status
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output piped into head and the like; keep the exit-time flush quiet too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(EXIT_FAILED)
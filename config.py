@@ -3,6 +3,11 @@ import os
 
 class Config:
     
+    # Storage backend: "postgres" or "sqlite" (single local file in WAL mode)
+    DB_BACKEND = os.getenv('DB_BACKEND', 'postgres')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'pc_manager.db')
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5.0))
+
     # Database configuration
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = int(os.getenv('DB_PORT', 5432))
@@ -10,6 +15,84 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
 
+    # Local copy of the server's data (PostgreSQL only; empty = off): the
+    # console starts from it at once and keeps working while the server is down.
+    # Off by default: the file holds the password hashes of everyone who
+    # logged in, so it belongs in a directory only the console's user can read
+    OFFLINE_SNAPSHOT_PATH = os.getenv('OFFLINE_SNAPSHOT_PATH', '')
+    OFFLINE_RETRY_INTERVAL = float(os.getenv('OFFLINE_RETRY_INTERVAL', 5.0))
+    OFFLINE_MAX_RETRY_INTERVAL = float(os.getenv('OFFLINE_MAX_RETRY_INTERVAL', 60.0))
+    # Changes made offline are sent this many per server transaction on reconnect
+    OFFLINE_REPLAY_BATCH_SIZE = int(os.getenv('OFFLINE_REPLAY_BATCH_SIZE', 500))
+    # A login at startup waits this many seconds for the server before
+    # falling back to the credentials in the snapshot
+    OFFLINE_LOGIN_WAIT = float(os.getenv('OFFLINE_LOGIN_WAIT', 10.0))
+
+    # Connection pool configuration
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30.0))
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30.0))
+
+    # Password hashing ("pbkdf2_sha256" or "scrypt"); existing hashes are
+    # upgraded to these parameters on the next successful login
+    PASSWORD_ALGORITHM = os.getenv('PASSWORD_ALGORITHM', 'pbkdf2_sha256')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 100000))
+    PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+    PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+
+    # Prometheus textfile export of the operation metrics (empty = off)
+    METRICS_FILE = os.getenv('METRICS_FILE', '')
+    METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', 15.0))
+
+    # Slow query log (PostgreSQL): statements over the threshold are written
+    # with their EXPLAIN (ANALYZE, BUFFERS) plan; admins can toggle it at runtime
+    SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+
+    # Status history: raw status events are rolled up into hourly and daily
+    # availability summaries and dropped after the retention period
+    STATUS_HISTORY_RETENTION_DAYS = int(os.getenv('STATUS_HISTORY_RETENTION_DAYS', 90))
+    STATUS_ROLLUP_INTERVAL = float(os.getenv('STATUS_ROLLUP_INTERVAL', 300))  # seconds, 0 disables
+
+    # User settings are saved in the background once they stay unchanged
+    # for this many seconds; failed writes are retried after SETTINGS_RETRY_DELAY
+    SETTINGS_SAVE_DELAY = float(os.getenv('SETTINGS_SAVE_DELAY', 1.0))
+    SETTINGS_RETRY_DELAY = float(os.getenv('SETTINGS_RETRY_DELAY', 30.0))
+
+    # Background worker threads used by the viewmodels for database work
+    WORKER_THREADS = int(os.getenv('WORKER_THREADS', 4))
+
+    # Rows per page when the table lists the whole fleet; more pages load on scroll
+    COMPUTERS_PAGE_SIZE = int(os.getenv('COMPUTERS_PAGE_SIZE', 500))
+
+    # Search box: results shown at most (the total number of matches is shown too)
+    SEARCH_LIMIT = int(os.getenv('SEARCH_LIMIT', 50))
+
+    # ComputerService read-through cache
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 30.0))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 256))
+
+    # Reachability sweeps (TCP connect probes)
+    SWEEP_PORTS = [int(port) for port in os.getenv('SWEEP_PORTS', '445,3389,22').split(',') if port.strip()]
+    SWEEP_TIMEOUT = float(os.getenv('SWEEP_TIMEOUT', 0.5))
+    SWEEP_CONCURRENCY = int(os.getenv('SWEEP_CONCURRENCY', 500))
+    SWEEP_JITTER = float(os.getenv('SWEEP_JITTER', 0.2))
+    SWEEP_INTERVAL = float(os.getenv('SWEEP_INTERVAL', 0))  # seconds, 0 disables periodic sweeps
+
+    # Wake-on-LAN
+    WOL_BROADCAST = os.getenv('WOL_BROADCAST', '255.255.255.255')
+    WOL_PORT = int(os.getenv('WOL_PORT', 9))
+    WOL_REPEAT = int(os.getenv('WOL_REPEAT', 3))
+    WOL_INTERVAL = float(os.getenv('WOL_INTERVAL', 0.1))
+    WOL_RATE_LIMIT = int(os.getenv('WOL_RATE_LIMIT', 0))  # packets per second, 0 = unlimited
+    WOL_DIRECTED = os.getenv('WOL_DIRECTED', '0').lower() in ('1', 'true', 'yes')
+    WOL_PREFIX_LENGTH = int(os.getenv('WOL_PREFIX_LENGTH', 24))
+
     @classmethod
     def get_db_config(cls):
         return {
@@ -17,5 +100,58 @@ class Config:
             'port': cls.DB_PORT,
             'database': cls.DB_NAME,
             'user': cls.DB_USER,
-            'password': cls.DB_PASSWORD
-        }
\ No newline at end of file
+            'password': cls.DB_PASSWORD,
+            'pool_min_size': cls.DB_POOL_MIN_SIZE,
+            'pool_max_size': cls.DB_POOL_MAX_SIZE,
+            'pool_timeout': cls.DB_POOL_TIMEOUT,
+            'pool_health_check_interval': cls.DB_POOL_HEALTH_CHECK_INTERVAL
+        }
+
+    @classmethod
+    def get_storage_config(cls):
+        if cls.DB_BACKEND == 'sqlite':
+            options = {'path': cls.SQLITE_PATH, 'busy_timeout': cls.SQLITE_BUSY_TIMEOUT}
+        else:
+            options = cls.get_db_config()
+        return {'backend': cls.DB_BACKEND, **options}
+
+    @classmethod
+    def get_sweep_config(cls):
+        return {
+            'ports': cls.SWEEP_PORTS,
+            'timeout': cls.SWEEP_TIMEOUT,
+            'concurrency': cls.SWEEP_CONCURRENCY,
+            'jitter': cls.SWEEP_JITTER
+        }
+
+    @classmethod
+    def get_wol_config(cls):
+        return {
+            'broadcast': cls.WOL_BROADCAST,
+            'port': cls.WOL_PORT,
+            'repeat': cls.WOL_REPEAT,
+            'interval': cls.WOL_INTERVAL,
+            'rate_limit': cls.WOL_RATE_LIMIT,
+            'directed': cls.WOL_DIRECTED,
+            'prefix_length': cls.WOL_PREFIX_LENGTH
+        }
+
+    @classmethod
+    def get_password_hasher_config(cls):
+        return {
+            'algorithm': cls.PASSWORD_ALGORITHM,
+            'pbkdf2_iterations': cls.PASSWORD_PBKDF2_ITERATIONS,
+            'scrypt_n': cls.PASSWORD_SCRYPT_N,
+            'scrypt_r': cls.PASSWORD_SCRYPT_R,
+            'scrypt_p': cls.PASSWORD_SCRYPT_P
+        }
+
+    @classmethod
+    def get_slow_query_log_config(cls):
+        return {
+            'path': cls.SLOW_QUERY_LOG_PATH,
+            'threshold': cls.SLOW_QUERY_THRESHOLD_MS / 1000,
+            'enabled': cls.SLOW_QUERY_LOG_ENABLED,
+            'max_bytes': cls.SLOW_QUERY_LOG_MAX_BYTES,
+            'backup_count': cls.SLOW_QUERY_LOG_BACKUPS
+        }
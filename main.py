@@ -1,28 +1,56 @@
 import sys
+from typing import Optional
 from PyQt6.QtWidgets import QApplication
-from models.database import DatabaseManager
+from models.storage import StorageBackend
 from models.auth_service import AuthService
 from models.computer_service import ComputerService
+from models.reachability import ReachabilityProber
+from models.wake_on_lan import WakeOnLanSender
+from models.cache import TTLCache
+from models.metrics import REGISTRY, MetricsExporter
+from models.status_history import StatusHistoryMaintainer
 from models.settings_service import SettingsService
 from viewmodels.login_viewmodel import LoginViewModel
 from viewmodels.main_viewmodel import MainViewModel
 from views.login_view import LoginView
 from views.main_view import MainView
+from storage_setup import create_startup_storage
 from config import Config
 
 
 class Application:
     
-    def __init__(self):
-        self.app = QApplication(sys.argv)
+    def __init__(self, db_manager: Optional[StorageBackend] = None):
+        self.app = QApplication.instance() or QApplication(sys.argv)
 
-        db_config = Config.get_db_config()
-        self.db_manager = DatabaseManager(**db_config)
+        if db_manager is None:
+            db_manager = create_startup_storage()
+        self.db_manager = db_manager
         self.auth_service = AuthService(self.db_manager)
-        self.computer_service = ComputerService(self.db_manager)
-        self.settings_service = SettingsService(self.db_manager)
+        self.computer_service = ComputerService(
+            self.db_manager,
+            ReachabilityProber(**Config.get_sweep_config()),
+            WakeOnLanSender(**Config.get_wol_config()),
+            TTLCache(max_entries=Config.CACHE_MAX_ENTRIES, ttl=Config.CACHE_TTL)
+        )
+        self.settings_service = SettingsService(
+            self.db_manager, Config.SETTINGS_SAVE_DELAY, Config.SETTINGS_RETRY_DELAY
+        )
+
+        REGISTRY.add_collector(self.db_manager.collect_metrics)
+        REGISTRY.add_collector(self.computer_service.collect_metrics)
+        self.metrics_exporter = None
+        if Config.METRICS_FILE:
+            self.metrics_exporter = MetricsExporter(Config.METRICS_FILE, Config.METRICS_INTERVAL)
+            self.metrics_exporter.start()
+        self.status_history = None
+        if Config.STATUS_ROLLUP_INTERVAL > 0:
+            self.status_history = StatusHistoryMaintainer(
+                self.db_manager, Config.STATUS_ROLLUP_INTERVAL, Config.STATUS_HISTORY_RETENTION_DAYS
+            )
+            self.status_history.start()
 
-        self.login_viewmodel = LoginViewModel(self.auth_service)
+        self.login_viewmodel = LoginViewModel(self.auth_service, self.settings_service)
         self.main_viewmodel = MainViewModel(
             self.auth_service,
             self.computer_service,
@@ -44,7 +72,13 @@ class Application:
     
     def run(self):
         self.login_view.show()
-        sys.exit(self.app.exec())
+        exit_code = self.app.exec()
+        if self.status_history is not None:
+            self.status_history.stop()
+        self.settings_service.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        sys.exit(exit_code)
 
 
 def main():
@@ -1,11 +1,11 @@
 from typing import Optional, Tuple
 from .user import User
-from .database import DatabaseManager
+from .storage import StorageBackend
 
 
 class AuthService:
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: StorageBackend):
         self.db_manager = db_manager
         self.current_user: Optional[User] = None
     
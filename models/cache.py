@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time to live"""
+
+    MISSING = object()
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        # Bumped by invalidate(key) and, for every key at once, by invalidate()
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                       "invalidations": 0, "stale_sets": 0}
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or TTLCache.MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return self.MISSING
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return self.MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def generation(self, key: Hashable) -> tuple:
+        """Taken before reading the value to cache; see set()"""
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, generation: Optional[tuple] = None) -> bool:
+        """Store value; False if key was invalidated since generation was taken"""
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                # Read before a change that invalidated it
+                self._stats["stale_sets"] += 1
+                return False
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            return True
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._epoch += 1
+                self._generations.clear()
+                return
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_ratio": stats["hits"] / lookups if lookups else 0.0,
+            })
+            return stats
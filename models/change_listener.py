@@ -0,0 +1,112 @@
+import json
+import os
+import select
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .computer import Computer
+
+
+@dataclass
+class ComputerChange:
+    """A row change on the computers table received from the database"""
+    operation: str  # "INSERT", "UPDATE", "DELETE"
+    computer: Computer
+    previous_classroom: Optional[str] = None
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ComputerChange":
+        data = json.loads(payload)
+        return cls(
+            operation=data.get("op", "UPDATE"),
+            computer=Computer.from_dict(data),
+            previous_classroom=data.get("old_classroom")
+        )
+
+
+class ComputerChangeListener:
+    """Background LISTEN loop on a dedicated connection; blocks in select(), never polls the table"""
+
+    CHANNEL = "computers_changed"
+
+    def __init__(self, connect: Callable[[], Any],
+                 on_change: Callable[[ComputerChange], None],
+                 on_reconnect: Optional[Callable[[], None]] = None,
+                 retry_delay: float = 5.0):
+        self._connect = connect
+        self._on_change = on_change
+        self._on_reconnect = on_reconnect
+        self.retry_delay = retry_delay
+
+        self._stop = threading.Event()
+        self._wake_read, self._wake_write = os.pipe()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="computer-change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        os.write(self._wake_write, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+            self._thread = None
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+    def _run(self):
+        # Imported here so ComputerChange does not load the driver
+        import psycopg2
+        from psycopg2 import extensions
+
+        first_attempt = True
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+            except psycopg2.Error:
+                self._sleep(self.retry_delay)
+                continue
+
+            try:
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.CHANNEL}")
+                if not first_attempt and self._on_reconnect is not None:
+                    # Notifications sent while we were disconnected are lost
+                    self._on_reconnect()
+                first_attempt = False
+                self._listen(conn)
+            except psycopg2.Error:
+                self._sleep(self.retry_delay)
+            finally:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([conn, self._wake_read], [], [])
+            if self._wake_read in readable:
+                return
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    change = ComputerChange.from_payload(notify.payload)
+                except ValueError:
+                    continue
+                self._on_change(change)
+
+    def _sleep(self, seconds: float):
+        select.select([self._wake_read], [], [], seconds)
@@ -1,15 +1,18 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import ClassVar, Optional, Tuple
 
 
 @dataclass
 class Computer:
     """Represents a computer in the system"""
+    STATUSES: ClassVar[Tuple[str, ...]] = ("online", "offline", "maintenance")
+    
     id: Optional[int] = None
     name: str = ""
     ip_address: str = ""
     classroom: str = ""
     status: str = "online"  # "online", "offline", "maintenance"
+    mac_address: str = ""
     
     @classmethod
     def from_dict(cls, data: dict):
@@ -19,7 +22,8 @@ class Computer:
             name=data.get('name', ''),
             ip_address=data.get('ip', data.get('ip_address', '')),
             classroom=data.get('classroom', ''),
-            status=data.get('status', 'online')
+            status=data.get('status', 'online'),
+            mac_address=data.get('mac_address', data.get('mac')) or ''
         )
     
     def to_dict(self) -> dict:
@@ -29,7 +33,8 @@ class Computer:
             'name': self.name,
             'ip_address': self.ip_address,
             'classroom': self.classroom,
-            'status': self.status
+            'status': self.status,
+            'mac_address': self.mac_address
         }
     
     def is_online(self) -> bool:
@@ -1,12 +1,65 @@
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Dict, Optional, Tuple
 from .computer import Computer
-from .database import DatabaseManager
+from .storage import PageKey, StorageBackend
+from .inventory_import import ImportReport, InventoryReader
+from .wake_on_lan import WakeOnLanSender, WakeResult
+from .change_listener import ComputerChange, ComputerChangeListener
+from .cache import TTLCache
+from .search_index import SearchIndex
+from .metrics import instrumented, record_failure
+
+if TYPE_CHECKING:
+    # Loads asyncio; created on the first sweep
+    from .reachability import ReachabilityProber
 
 class ComputerService:
     
-    def __init__(self, db_manager: DatabaseManager):
+    CLASSROOMS_KEY = ("classrooms",)
+    
+    def __init__(self, db_manager: StorageBackend, prober: Optional["ReachabilityProber"] = None,
+                 wol_sender: Optional[WakeOnLanSender] = None, cache: Optional[TTLCache] = None,
+                 search_index: Optional[SearchIndex] = None):
         self.db_manager = db_manager
+        self._prober = prober
+        self.wol_sender = wol_sender or WakeOnLanSender()
+        self.cache = cache or TTLCache()
+        self.search_index = search_index or SearchIndex()
+    
+    @property
+    def prober(self) -> "ReachabilityProber":
+        if self._prober is None:
+            from .reachability import ReachabilityProber
+            self._prober = ReachabilityProber()
+        return self._prober
+    
+    @staticmethod
+    def _classroom_key(classroom: str) -> tuple:
+        return ("classroom", classroom)
+    
+    def invalidate(self, classroom: Optional[str] = None, include_classrooms: bool = False):
+        """Drop cached data for one classroom, or everything when classroom is None"""
+        if classroom is None:
+            self.cache.invalidate()
+            return
+        self.cache.invalidate(self._classroom_key(classroom))
+        if include_classrooms:
+            self.cache.invalidate(self.CLASSROOMS_KEY)
     
+    def _invalidate_for(self, computers: List[Computer]):
+        for classroom in {computer.classroom for computer in computers}:
+            self.invalidate(classroom)
+        self.search_index.update(computers)
+    
+    def get_cache_stats(self) -> Dict[str, float]:
+        return self.cache.get_stats()
+    
+    def collect_metrics(self):
+        """Gauges for MetricsRegistry.add_collector: the classroom cache statistics"""
+        for name, value in self.get_cache_stats().items():
+            yield "pc_cache", {"stat": name}, value
+    
+    @instrumented("service.get_all_computers")
     def get_all_computers(self) -> Dict[str, List[Computer]]:
 
         try:
@@ -15,33 +68,272 @@ class ComputerService:
             for classroom, computer_list in raw_data.items():
                 computers[classroom] = [Computer.from_dict(data) for data in computer_list]
             return computers
-        except Exception:
+        except Exception as e:
+            record_failure("service.get_all_computers", e)
             return {}
     
-    def get_computers_by_classroom(self, classroom: str) -> List[Computer]:
+    @instrumented("service.get_computers_page")
+    def get_computers_page(self, after: Optional[PageKey] = None, limit: int = 500,
+                           classroom: Optional[str] = None) -> Optional[Tuple[List[Computer], Optional[PageKey]]]:
+        """One keyset page and the key of the next one (None after the last page); None on failure"""
+        try:
+            rows = self.db_manager.get_computers_page(after, limit, classroom)
+            if rows is None:
+                return None
+            computers = [Computer.from_dict(data) for data in rows]
+        except Exception as e:
+            record_failure("service.get_computers_page", e)
+            return None
+        if len(computers) < limit:
+            return computers, None
+        last = computers[-1]
+        return computers, (last.classroom, last.name, last.id)
+    
+    @instrumented("service.build_search_index")
+    def build_search_index(self) -> int:
+        """(Re)load the search index from a stream of the whole fleet; returns its size"""
+        self.search_index.rebuild(self.iter_computers())
+        return len(self.search_index)
+    
+    @property
+    def search_index_ready(self) -> bool:
+        return self.search_index.ready
+    
+    def search_computers(self, query: str, limit: int = 50) -> Tuple[List[Computer], int]:
+        """Up to `limit` computers in any classroom matching the query, and the total count"""
+        return self.search_index.search(query, limit)
+    
+    def iter_computers(self, batch_size: int = 2000) -> Iterator[Computer]:
+        """The whole fleet as a stream, for sweeps and exports of any size"""
+        for data in self.db_manager.iter_all_computers(batch_size):
+            yield Computer.from_dict(data)
+    
+    @instrumented("service.get_computers_by_classroom")
+    def get_computers_by_classroom(self, classroom: str, use_cache: bool = True) -> List[Computer]:
 
-        all_computers = self.get_all_computers()
-        return all_computers.get(classroom, [])
+        key = self._classroom_key(classroom)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not TTLCache.MISSING:
+                # Callers get their own list; Computer objects are replaced, never mutated
+                return list(cached)
+        # A change invalidating the key during the read keeps these rows out of the cache
+        generation = self.cache.generation(key)
+        
+        try:
+            raw_data = self.db_manager.get_computers_by_classroom(classroom)
+            if raw_data is None:
+                # Logged by the backend; not cached, so the next call retries
+                return []
+            computers = [Computer.from_dict(data) for data in raw_data]
+        except Exception as e:
+            record_failure("service.get_computers_by_classroom", e)
+            return []
+        self.cache.set(key, computers, generation)
+        return list(computers)
     
+    @instrumented("service.add_computer")
     def add_computer(self, computer: Computer) -> bool:
 
         try:
-            return self.db_manager.add_computer(
+            added = self.db_manager.add_computer(
                 computer.name,
                 computer.ip_address,
-                computer.classroom
+                computer.classroom,
+                computer.mac_address
             )
-        except Exception:
+        except Exception as e:
+            record_failure("service.add_computer", e)
             return False
+        self.invalidate(computer.classroom, include_classrooms=True)
+        # The new row's id is not known here; the next rebuild picks it up
+        self.search_index.invalidate()
+        return added
     
+    @instrumented("service.update_computer_status")
     def update_computer_status(self, name: str, status: str) -> bool:
 
         try:
-            return self.db_manager.update_computer_status(name, status)
-        except Exception:
+            updated = self.db_manager.update_computer_status(name, status)
+        except Exception as e:
+            record_failure("service.update_computer_status", e)
             return False
+        # Names are not unique across classrooms
+        self.invalidate()
+        self.search_index.invalidate()
+        return updated
+    
+    @instrumented("service.set_computer_status")
+    def set_computer_status(self, computer_id: int, status: str) -> Optional[Computer]:
+
+        try:
+            data = self.db_manager.update_computer_status_by_id(computer_id, status)
+        except Exception as e:
+            record_failure("service.set_computer_status", e)
+            return None
+        if not data:
+            return None
+        computer = Computer.from_dict(data)
+        self._invalidate_for([computer])
+        return computer
+    
+    @instrumented("service.bulk_update_status")
+    def bulk_update_status(self, status: str, computer_ids: Optional[List[int]] = None,
+                           classroom: Optional[str] = None,
+                           current_status: Optional[str] = None) -> Optional[List[Computer]]:
+
+        try:
+            rows = self.db_manager.update_status_bulk(
+                status,
+                computer_ids=computer_ids,
+                classroom=classroom,
+                current_status=current_status
+            )
+            if rows is None:
+                return None
+            computers = [Computer.from_dict(data) for data in rows]
+        except Exception as e:
+            record_failure("service.bulk_update_status", e)
+            return None
+        self._invalidate_for(computers)
+        return computers
+    
+    @instrumented("service.sweep_statuses")
+    def sweep_statuses(self, classroom: Optional[str] = None) -> List[Computer]:
+        """Probe computers (one classroom or the whole fleet) and store changed statuses"""
+        if classroom is not None:
+            computers = self.get_computers_by_classroom(classroom, use_cache=False)
+        else:
+            computers = list(self.iter_computers())
+        
+        # Machines under maintenance are deliberately taken out of rotation
+        candidates = [computer for computer in computers if not computer.is_in_maintenance()]
+        current = {computer.id: computer.status for computer in candidates}
+        changes = {
+            result.computer_id: result.status
+            for result in self.prober.sweep(candidates)
+            if result.computer_id is not None and current.get(result.computer_id) != result.status
+        }
+        
+        try:
+            updated = [Computer.from_dict(data) for data in self.db_manager.update_statuses(changes)]
+        except Exception as e:
+            record_failure("service.sweep_statuses", e)
+            return []
+        self._invalidate_for(updated)
+        return updated
+    
+    @instrumented("service.wake_computers")
+    def wake_computers(self, computers: List[Computer]) -> List[WakeResult]:
+
+        return self.wol_sender.wake(computers)
+    
+    @instrumented("service.wake_classroom")
+    def wake_classroom(self, classroom: str) -> List[WakeResult]:
+
+        return self.wol_sender.wake(self.get_computers_by_classroom(classroom))
+    
+    @instrumented("service.import_inventory")
+    def import_inventory(self, path: str, dry_run: bool = False) -> Optional[ImportReport]:
+        """Import a JSON/CSV inventory; raises ValueError for unreadable files, None on DB failure"""
+        reader = InventoryReader(path)
+        rows = (computer.to_dict() for computer in reader.read())
+        result = self.db_manager.import_computers(rows, dry_run=dry_run)
+        if result is None:
+            return None
+        if not dry_run:
+            self.invalidate()
+            self.search_index.invalidate()
+        return ImportReport(
+            dry_run=dry_run,
+            added=result["added"],
+            updated=result["updated"],
+            unchanged=result["unchanged"],
+            errors=reader.errors
+        )
+    
+    @instrumented("service.listen_for_changes")
+    def listen_for_changes(self, on_change: Callable[[ComputerChange], None],
+                           on_reconnect: Optional[Callable[[], None]] = None) -> Optional[ComputerChangeListener]:
+        """Start a change feed; callbacks run on the listener thread
+
+        Returns None when the storage backend cannot push changes (SQLite).
+        """
+        def handle_change(change: ComputerChange):
+            moved = change.previous_classroom not in (None, change.computer.classroom)
+            structural = change.operation != "UPDATE" or moved
+            self.invalidate(change.computer.classroom, include_classrooms=structural)
+            if moved:
+                self.invalidate(change.previous_classroom)
+            if change.operation == "DELETE":
+                self.search_index.remove(change.computer.id)
+            else:
+                self.search_index.update([change.computer])
+            on_change(change)
+        
+        def handle_reconnect():
+            self.invalidate()
+            self.search_index.invalidate()
+            if on_reconnect is not None:
+                on_reconnect()
+        
+        listener = self.db_manager.create_change_listener(handle_change, handle_reconnect)
+        if listener is not None:
+            listener.start()
+        return listener
+    
+    @property
+    def online(self) -> bool:
+        """False while the storage serves its local snapshot"""
+        return self.db_manager.online
+    
+    def add_connection_listener(self, callback: Callable[[bool], None]):
+        self.db_manager.add_connection_listener(callback)
+    
+    @property
+    def pending_writes(self) -> int:
+        """Changes made offline and waiting to be sent to the server"""
+        return self.db_manager.pending_writes
+    
+    def take_replay_report(self) -> Optional[Dict[str, Any]]:
+        return self.db_manager.take_replay_report()
     
+    @instrumented("service.get_classrooms")
     def get_classrooms(self) -> List[str]:
 
-        all_computers = self.get_all_computers()
-        return list(all_computers.keys())
\ No newline at end of file
+        cached = self.cache.get(self.CLASSROOMS_KEY)
+        if cached is not TTLCache.MISSING:
+            return list(cached)
+        generation = self.cache.generation(self.CLASSROOMS_KEY)
+        try:
+            classrooms = self.db_manager.get_classrooms()
+        except Exception as e:
+            record_failure("service.get_classrooms", e)
+            return []
+        if classrooms is None:
+            return []
+        self.cache.set(self.CLASSROOMS_KEY, classrooms, generation)
+        return list(classrooms)
+
+    @instrumented("service.get_status_summary")
+    def get_status_summary(self, start: datetime, end: datetime, classroom: Optional[str] = None,
+                           granularity: str = "day") -> List[Dict[str, Any]]:
+        """Rolled-up seconds per status; the raw events are never scanned"""
+        try:
+            return self.db_manager.get_status_summary(start, end, classroom, granularity)
+        except Exception as e:
+            record_failure("service.get_status_summary", e)
+            return []
+
+    def get_uptime(self, classroom: Optional[str], start: datetime, end: datetime,
+                   granularity: str = "day") -> Optional[float]:
+        """Share of online time among online and offline time; maintenance is left out
+
+        None when nothing was rolled up for the period yet.
+        """
+        rows = self.get_status_summary(start, end, classroom, granularity)
+        online = sum(row["online"] for row in rows)
+        offline = sum(row["offline"] for row in rows)
+        if online + offline <= 0:
+            return None
+        return online / (online + offline)
@@ -0,0 +1,180 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no connection becomes free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections with health checks on checkout"""
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, health_check_interval: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Condition()
+        self._idle: List[tuple] = []  # (connection, returned_at)
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "reuses": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "wait_time_total": 0.0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    def _new_connection(self):
+        conn = self._connect()
+        self._stats["connections_created"] += 1
+        return conn
+
+    def _needs_check(self, idle_since: float) -> bool:
+        if self.health_check_interval < 0:
+            return False
+        return time.monotonic() - idle_since >= self.health_check_interval
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """A network round trip; always called without the lock held"""
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._stats["connections_discarded"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """Check out a healthy connection, opening a new one if the pool is not full"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise psycopg2.InterfaceError("Connection pool is closed")
+
+                    # An idle connection is taken off the list, and counted as in
+                    # use, before it is checked
+                    candidate = None
+                    while self._idle:
+                        conn, idle_since = self._idle.pop()
+                        if conn.closed:
+                            self._discard(conn)
+                            continue
+                        candidate = conn, idle_since
+                        break
+                    if candidate is not None or self._in_use < self.max_size:
+                        # Reserve the slot before checking or connecting outside the lock
+                        self._in_use += 1
+                        break
+
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No free database connection within {self.timeout} s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._lock.wait(remaining)
+                checked = candidate is not None and self._needs_check(candidate[1])
+
+            if candidate is None:
+                break
+            conn = candidate[0]
+            # The health check's round trip never blocks other checkouts or returns
+            healthy = not checked or self._ping(conn)
+            with self._lock:
+                if checked:
+                    self._stats["health_checks"] += 1
+                    if not healthy:
+                        self._stats["health_check_failures"] += 1
+                if healthy and not self._closed:
+                    self._stats["checkouts"] += 1
+                    self._stats["reuses"] += 1
+                    self._stats["wait_time_total"] += time.monotonic() - started
+                    return conn
+                self._in_use -= 1
+                self._discard(conn)
+                self._lock.notify()
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._stats["connections_created"] += 1
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection; broken or dirty connections are closed instead of reused"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            })
+            return stats
@@ -1,21 +1,143 @@
-import hashlib
+import csv
+import io
+import logging
+import re
 import secrets
+import time
+from datetime import datetime, timedelta, timezone
 import psycopg2
-from typing import Optional, Tuple, List, Dict, Any
+import psycopg2.errors
+import psycopg2.extras
+import threading
+from typing import Optional, Tuple, List, Dict, Any, Iterable, Iterator, Callable
 from contextlib import contextmanager
 import os
+from .connection_pool import ConnectionPool
+from .change_listener import ComputerChange, ComputerChangeListener
+from .migrations import LATEST_VERSION, apply_migrations, get_schema_version
+from .password_hasher import PasswordHasher, legacy_pbkdf2
+from .metrics import REGISTRY, instrumented
+from .slow_query_log import SlowQueryCursor, SlowQueryLog
+from .storage import PageKey, StorageBackend, as_date
 
 
-class DatabaseManager:
+logger = logging.getLogger(__name__)
+
+# One console at a time rolls up and prunes the status history
+STATUS_HISTORY_LOCK_ID = 0x535453  # "STS"
+EVENT_PARTITION = re.compile(r"computer_status_events_p(\d{8})")
+
+# Seconds per classroom and status for every hour in [lo, hi). The status
+# at lo is the old_status of a computer's first later event or, without
+# one, its current status; each event then starts a new span.
+ROLLUP_HOURS_SQL = """
+    WITH events AS (
+        SELECT id, computer_id, classroom, old_status, status, occurred_at
+        FROM computer_status_events
+        WHERE occurred_at >= %(lo)s
+    ),
+    first_events AS (
+        SELECT DISTINCT ON (computer_id) computer_id, classroom, old_status
+        FROM events
+        ORDER BY computer_id, occurred_at, id
+    ),
+    starts AS (
+        SELECT c.id AS computer_id, c.classroom,
+               CASE WHEN f.computer_id IS NULL THEN c.status ELSE f.old_status END AS status
+        FROM computers c
+        LEFT JOIN first_events f ON f.computer_id = c.id
+        UNION ALL
+        -- Deleted since lo
+        SELECT f.computer_id, f.classroom, f.old_status
+        FROM first_events f
+        WHERE NOT EXISTS (SELECT 1 FROM computers c WHERE c.id = f.computer_id)
+    ),
+    changes AS (
+        SELECT computer_id, classroom, %(lo)s::timestamptz AS since, 0::bigint AS seq, status
+        FROM starts
+        UNION ALL
+        SELECT computer_id, classroom, occurred_at, id, status
+        FROM events
+        WHERE occurred_at < %(hi)s
+    ),
+    spans AS (
+        SELECT classroom, status, since,
+               lead(since, 1, %(hi)s::timestamptz)
+                   OVER (PARTITION BY computer_id ORDER BY since, seq) AS until
+        FROM changes
+    ),
+    pieces AS (
+        SELECT s.classroom, s.status, h.hour,
+               extract(epoch FROM least(s.until, h.hour + interval '1 hour')
+                                  - greatest(s.since, h.hour)) AS seconds
+        FROM spans s
+        CROSS JOIN LATERAL generate_series(
+            date_trunc('hour', s.since), s.until - interval '1 microsecond', interval '1 hour'
+        ) AS h (hour)
+        WHERE s.status IS NOT NULL AND s.until > s.since
+    )
+    INSERT INTO computer_status_hourly
+        (classroom, hour, online_seconds, offline_seconds, maintenance_seconds)
+    SELECT classroom, hour,
+           coalesce(sum(seconds) FILTER (WHERE status = 'online'), 0),
+           coalesce(sum(seconds) FILTER (WHERE status = 'offline'), 0),
+           coalesce(sum(seconds) FILTER (WHERE status = 'maintenance'), 0)
+    FROM pieces
+    GROUP BY classroom, hour
+    ON CONFLICT (classroom, hour) DO UPDATE SET
+        online_seconds = EXCLUDED.online_seconds,
+        offline_seconds = EXCLUDED.offline_seconds,
+        maintenance_seconds = EXCLUDED.maintenance_seconds
+"""
+
+# Days touched by [lo, hi) are recomputed from their hours
+ROLLUP_DAYS_SQL = """
+    INSERT INTO computer_status_daily
+        (classroom, day, online_seconds, offline_seconds, maintenance_seconds)
+    SELECT classroom, hour::date,
+           sum(online_seconds), sum(offline_seconds), sum(maintenance_seconds)
+    FROM computer_status_hourly
+    WHERE hour >= date_trunc('day', %(lo)s::timestamptz) AND hour < %(hi)s
+    GROUP BY classroom, hour::date
+    ON CONFLICT (classroom, day) DO UPDATE SET
+        online_seconds = EXCLUDED.online_seconds,
+        offline_seconds = EXCLUDED.offline_seconds,
+        maintenance_seconds = EXCLUDED.maintenance_seconds
+"""
+
+
+class DatabaseManager(StorageBackend):
+    """PostgreSQL storage: pooled connections, migrations and LISTEN/NOTIFY"""
+    
+    # Column order expected by _computer_row_to_dict
+    COMPUTER_COLUMNS = "id, name, ip_address, classroom, status, mac_address"
+    # Daily event partitions created in advance, so events never land in the default one
+    PARTITIONS_AHEAD = 7
     
     def __init__(self, host: str = "localhost", port: int = 5432, 
                  database: str = "pc_manager", user: str = "postgres", 
-                 password: str = "postgres"):
+                 password: str = "postgres", pool_min_size: int = 1,
+                 pool_max_size: int = 10, pool_timeout: float = 30.0,
+                 pool_health_check_interval: float = 30.0,
+                 password_hasher: Optional[PasswordHasher] = None,
+                 slow_query_log: Optional[SlowQueryLog] = None):
+        super().__init__(password_hasher)
+        self.slow_query_log = slow_query_log or SlowQueryLog()
+        # Every connection's cursors report to this manager's slow query log
+        self._cursor_factory = type(
+            "SlowQueryCursor", (SlowQueryCursor,), {"slow_query_log": self.slow_query_log}
+        )
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_timeout = pool_timeout
+        self.pool_health_check_interval = pool_health_check_interval
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
         self.init_database()
     
     def test_connection(self) -> bool:
@@ -33,127 +155,152 @@ class DatabaseManager:
         except psycopg2.Error:
             return False
     
+    def _connect(self):
+        return psycopg2.connect(
+            host=self.host,
+            port=self.port,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            options="-c client_encoding=utf8",
+            cursor_factory=self._cursor_factory
+        )
+    
+    def _get_pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self._connect,
+                        min_size=self.pool_min_size,
+                        max_size=self.pool_max_size,
+                        timeout=self.pool_timeout,
+                        health_check_interval=self.pool_health_check_interval
+                    )
+        return self._pool
+    
     @contextmanager
     def get_connection(self):
-        conn = None
+        pool = self._get_pool()
+        with REGISTRY.timer("pc_db_connection_acquire_seconds"):
+            conn = pool.getconn()
+        broken = False
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database=self.database,
-                user=self.user,
-                password=self.password,
-                options="-c client_encoding=utf8"
-            )
             yield conn
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
+            broken = bool(conn.closed) or isinstance(
+                e, (psycopg2.OperationalError, psycopg2.InterfaceError)
+            )
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
             raise e
         finally:
-            if conn:
-                conn.close()
+            pool.putconn(conn, discard=broken)
     
-    def init_database(self):
+    def create_change_listener(self, on_change: Callable[[ComputerChange], None],
+                               on_reconnect: Optional[Callable[[], None]] = None) -> ComputerChangeListener:
+        # LISTEN needs its own long-lived connection outside the pool
+        return ComputerChangeListener(self._connect, on_change, on_reconnect)
+    
+    def is_connection_error(self, error: Exception) -> bool:
+        # A cancelled statement is an OperationalError too, but the server answered
+        if isinstance(error, psycopg2.errors.QueryCanceled):
+            return False
+        return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+    
+    def ping(self) -> bool:
+        try:
+            with self.get_connection() as conn:
+                conn.cursor().execute("SELECT 1")
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {}
+        return self._pool.get_stats()
+    
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+    
+    def _create_database_if_missing(self) -> bool:
+        """Connect to the maintenance DB and create ours; True if it had to be created"""
+        conn = psycopg2.connect(
+            host=self.host,
+            port=self.port,
+            database="postgres",
+            user=self.user,
+            password=self.password,
+            options="-c client_encoding=utf8"
+        )
         try:
-            conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database="postgres",
-                user=self.user,
-                password=self.password,
-                options="-c client_encoding=utf8"
-            )
-            
             conn.autocommit = True
             cur = conn.cursor()
-
             cur.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s", (self.database,))
-            exists = cur.fetchone()
-            if not exists:
-                cur.execute(f"CREATE DATABASE {self.database}")
-            
-            cur.close()
+            if cur.fetchone():
+                return False
+            cur.execute(f"CREATE DATABASE {self.database}")
+            return True
+        finally:
             conn.close()
-
-            with self.get_connection() as conn:
-                cur = conn.cursor()
-
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS users (
-                        id SERIAL PRIMARY KEY,
-                        username VARCHAR(50) UNIQUE NOT NULL,
-                        password_hash VARCHAR(128) NOT NULL,
-                        salt VARCHAR(64) NOT NULL,
-                        role VARCHAR(20) NOT NULL CHECK (role IN ('teacher', 'admin'))
-                    )
-                """)
-
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS settings (
-                        id INTEGER PRIMARY KEY CHECK (id = 1),
-                        theme VARCHAR(20) NOT NULL DEFAULT 'light'
-                    )
-                """)
-
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS computers (
-                        id SERIAL PRIMARY KEY,
-                        name VARCHAR(100) NOT NULL,
-                        ip_address VARCHAR(15) NOT NULL,
-                        classroom VARCHAR(100) NOT NULL,
-                        status VARCHAR(20) DEFAULT 'online',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-
-                cur.execute("""
-                    INSERT INTO settings (id, theme) 
-                    VALUES (1, 'light') 
-                    ON CONFLICT (id) DO NOTHING
-                """)
-                
-                default_users = [
-                    ("teacher", "123456", "teacher"),
-                    ("admin", "admin123", "admin")
-                ]
-                
-                for username, password, role in default_users:
-                    salt = self._generate_salt()
-                    password_hash = self._hash_password(password, salt)
-                    cur.execute("""
-                        INSERT INTO users (username, password_hash, salt, role)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (username) DO NOTHING
-                    """, (username, password_hash, salt, role))
-                
-                cur.execute("""
-                    INSERT INTO computers (name, ip_address, classroom)
-                    VALUES 
-                        ('ПК-01', '192.168.1.101', 'Cab 201'),
-                        ('ПК-02', '192.168.1.102', 'Cab 201'),
-                        ('ПК-03', '192.168.1.103', 'Cab 201'),
-                        ('ПК-11', '192.168.1.111', 'Cab 202'),
-                        ('ПК-12', '192.168.1.112', 'Cab 202')
-                    ON CONFLICT DO NOTHING
-                """)
-                
-                conn.commit()
-                cur.close()
+    
+    def init_database(self):
+        """Bring the schema up to date; a normal launch costs one version query"""
+        timings = {}
+        started = time.perf_counter()
+        try:
+            try:
+                pool = self._get_pool()
+                conn = pool.getconn()
+            except psycopg2.OperationalError:
+                # Only fall back to the maintenance database when ours is missing
+                if not self._create_database_if_missing():
+                    raise
+                pool = self._get_pool()
+                conn = pool.getconn()
+            timings["connect"] = time.perf_counter() - started
+            
+            try:
+                checked = time.perf_counter()
+                current_version = get_schema_version(conn)
+                timings["schema_check"] = time.perf_counter() - checked
                 
+                applied = []
+                if current_version < LATEST_VERSION:
+                    migrated = time.perf_counter()
+                    applied = apply_migrations(conn, self)
+                    timings["migrations"] = time.perf_counter() - migrated
+            finally:
+                pool.putconn(conn)
         except psycopg2.Error as e:
             raise Exception(f"Database initialization error: {e}")
+        
+        timings["total"] = time.perf_counter() - started
+        self.startup_timings = timings
+        logger.info(
+            "Database startup: %s; schema v%d%s",
+            ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()),
+            max([current_version] + applied),
+            f" (applied {applied})" if applied else ""
+        )
     
     def _generate_salt(self) -> str:
         return secrets.token_hex(32)
     
     def _hash_password(self, password: str, salt: str) -> str:
-        pwd_bytes = password.encode('utf-8')
-        salt_bytes = salt.encode('utf-8')
-        hash_bytes = hashlib.pbkdf2_hmac('sha256', pwd_bytes, salt_bytes, 100000)
-        return hash_bytes.hex()
+        # Legacy format (schema v1); new hashes come from self.password_hasher
+        return legacy_pbkdf2(password, salt)
     
-    def verify_user(self, username: str, password: str) -> Tuple[bool, Optional[str]]:
+    @instrumented("db.get_credentials")
+    def _get_credentials(self, username: str) -> Optional[Tuple[str, Optional[str], str]]:
         try:
             with self.get_connection() as conn:
                 cur = conn.cursor()
@@ -161,20 +308,27 @@ class DatabaseManager:
                     SELECT password_hash, salt, role FROM users 
                     WHERE username = %s
                 """, (username,))
-                row = cur.fetchone()
-                
-                if not row:
-                    return False, None
-                
-                stored_hash, salt, role = row
-                input_hash = self._hash_password(password, salt)
-                
-                if input_hash == stored_hash:
-                    return True, role
-                return False, None
-        except psycopg2.Error:
-            return False, None
+                return cur.fetchone()
+        except psycopg2.Error as e:
+            self._record_failure("db.get_credentials", e)
+            return None
+    
+    @instrumented("db.replace_password_hash")
+    def _replace_password_hash(self, username: str, old_hash: str, new_hash: str):
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                # Only replace the hash we verified against (another login may have won)
+                cur.execute("""
+                    UPDATE users SET password_hash = %s, salt = NULL
+                    WHERE username = %s AND password_hash = %s
+                """, (new_hash, username, old_hash))
+                conn.commit()
+        except psycopg2.Error as e:
+            # The login still succeeds; the upgrade is retried next time
+            self._record_failure("db.replace_password_hash", e)
     
+    @instrumented("db.get_theme")
     def get_theme(self) -> str:
         try:
             with self.get_connection() as conn:
@@ -182,9 +336,11 @@ class DatabaseManager:
                 cur.execute("SELECT theme FROM settings WHERE id = 1")
                 row = cur.fetchone()
                 return row[0] if row else "light"
-        except psycopg2.Error:
+        except psycopg2.Error as e:
+            self._record_failure("db.get_theme", e)
             return "light"
     
+    @instrumented("db.set_theme")
     def set_theme(self, theme: str) -> bool:
         if theme not in ["light", "dark", "glass"]:
             theme = "light"
@@ -195,47 +351,176 @@ class DatabaseManager:
                 cur.execute("UPDATE settings SET theme = %s WHERE id = 1", (theme,))
                 conn.commit()
                 return True
-        except psycopg2.Error:
+        except psycopg2.Error as e:
+            self._record_failure("db.set_theme", e)
             return False
     
-    def get_all_computers(self) -> Dict[str, List[Dict[str, str]]]:
+    @instrumented("db.get_user_settings")
+    def get_user_settings(self, username: Optional[str]) -> Optional[Dict[str, str]]:
         try:
             with self.get_connection() as conn:
                 cur = conn.cursor()
                 cur.execute("""
-                    SELECT classroom, name, ip_address, status 
+                    SELECT 0, 'theme', theme FROM settings WHERE id = 1
+                    UNION ALL
+                    SELECT 1, key, value FROM user_settings WHERE username = %s
+                    ORDER BY 1
+                """, (username,))
+                return {key: value for _, key, value in cur.fetchall()}
+        except psycopg2.Error as e:
+            self._record_failure("db.get_user_settings", e)
+            return None
+    
+    @instrumented("db.save_user_settings")
+    def save_user_settings(self, username: str, values: Dict[str, str]) -> bool:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                psycopg2.extras.execute_values(cur, """
+                    INSERT INTO user_settings (username, key, value) VALUES %s
+                    ON CONFLICT (username, key) DO UPDATE SET
+                        value = EXCLUDED.value,
+                        updated_at = now()
+                """, [(username, key, value) for key, value in values.items()])
+                conn.commit()
+                return True
+        except psycopg2.Error as e:
+            self._record_failure("db.save_user_settings", e)
+            return False
+    
+    @instrumented("db.get_all_computers")
+    def get_all_computers(self) -> Dict[str, List[Dict[str, str]]]:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    SELECT {self.COMPUTER_COLUMNS}
                     FROM computers 
                     ORDER BY classroom, name
                 """)
                 rows = cur.fetchall()
                 
                 computers = {}
-                for classroom, name, ip, status in rows:
-                    if classroom not in computers:
-                        computers[classroom] = []
-                    computers[classroom].append({
-                        "name": name,
-                        "ip": ip,
-                        "status": status
-                    })
+                for row in rows:
+                    data = self._computer_row_to_dict(row)
+                    computers.setdefault(data["classroom"], []).append(data)
                 
                 return computers
-        except psycopg2.Error:
+        except psycopg2.Error as e:
+            self._record_failure("db.get_all_computers", e)
             return {}
     
-    def add_computer(self, name: str, ip_address: str, classroom: str) -> bool:
+    @instrumented("db.get_computers_page")
+    def get_computers_page(self, after: Optional[PageKey] = None, limit: int = 500,
+                           classroom: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        conditions, params = [], []
+        if classroom is not None:
+            conditions.append("classroom = %s")
+            params.append(classroom)
+        if after is not None:
+            # A row comparison, so idx_computers_keyset can seek straight to the page
+            conditions.append("(classroom, name, id) > (%s, %s, %s)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    SELECT {self.COMPUTER_COLUMNS}
+                    FROM computers
+                    {where}
+                    ORDER BY classroom, name, id
+                    LIMIT %s
+                """, params + [limit])
+                return [self._computer_row_to_dict(row) for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            self._record_failure("db.get_computers_page", e)
+            return None
+    
+    def iter_all_computers(self, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """One snapshot of the fleet through a server-side (named) cursor
+        
+        The server keeps the result; the client fetches batch_size rows per
+        round trip. The pooled connection is held until the stream is
+        exhausted or closed, and the transaction is then rolled back.
+        """
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor(name=f"computers_scan_{secrets.token_hex(4)}")
+                cur.itersize = batch_size
+                try:
+                    cur.execute(f"""
+                        SELECT {self.COMPUTER_COLUMNS}
+                        FROM computers
+                        ORDER BY classroom, name, id
+                    """)
+                    for row in cur:
+                        yield self._computer_row_to_dict(row)
+                finally:
+                    if not conn.closed:
+                        cur.close()
+        except psycopg2.Error as e:
+            self._record_failure("db.iter_all_computers", e)
+    
+    @instrumented("db.get_computers_by_classroom")
+    def get_computers_by_classroom(self, classroom: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    SELECT {self.COMPUTER_COLUMNS}
+                    FROM computers
+                    WHERE classroom = %s
+                    ORDER BY name
+                """, (classroom,))
+                return [self._computer_row_to_dict(row) for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            self._record_failure("db.get_computers_by_classroom", e)
+            return None
+    
+    @instrumented("db.get_classrooms")
+    def get_classrooms(self) -> Optional[List[str]]:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                # Loose index scan over idx_computers_keyset:
+                # one index probe per classroom instead of reading every row
+                cur.execute("""
+                    WITH RECURSIVE rooms AS (
+                        (SELECT classroom FROM computers ORDER BY classroom LIMIT 1)
+                        UNION ALL
+                        SELECT (
+                            SELECT c.classroom FROM computers c
+                            WHERE c.classroom > r.classroom
+                            ORDER BY c.classroom LIMIT 1
+                        )
+                        FROM rooms r
+                        WHERE r.classroom IS NOT NULL
+                    )
+                    SELECT classroom FROM rooms WHERE classroom IS NOT NULL
+                """)
+                return [row[0] for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            self._record_failure("db.get_classrooms", e)
+            return None
+    
+    @instrumented("db.add_computer")
+    def add_computer(self, name: str, ip_address: str, classroom: str,
+                     mac_address: Optional[str] = None) -> bool:
         try:
             with self.get_connection() as conn:
                 cur = conn.cursor()
                 cur.execute("""
-                    INSERT INTO computers (name, ip_address, classroom)
-                    VALUES (%s, %s, %s)
-                """, (name, ip_address, classroom))
+                    INSERT INTO computers (name, ip_address, classroom, mac_address)
+                    VALUES (%s, %s, %s, %s)
+                """, (name, ip_address, classroom, mac_address or None))
                 conn.commit()
                 return True
-        except psycopg2.Error:
+        except psycopg2.Error as e:
+            self._record_failure("db.add_computer", e)
             return False
     
+    @instrumented("db.update_computer_status")
     def update_computer_status(self, name: str, status: str) -> bool:
         try:
             with self.get_connection() as conn:
@@ -247,5 +532,351 @@ class DatabaseManager:
                 """, (status, name))
                 conn.commit()
                 return cur.rowcount > 0
-        except psycopg2.Error:
-            return False
\ No newline at end of file
+        except psycopg2.Error as e:
+            self._record_failure("db.update_computer_status", e)
+            return False
+    
+    @instrumented("db.update_computer_status_by_id")
+    def update_computer_status_by_id(self, computer_id: int, status: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    UPDATE computers
+                    SET status = %s
+                    WHERE id = %s
+                    RETURNING {self.COMPUTER_COLUMNS}
+                """, (status, computer_id))
+                row = cur.fetchone()
+                conn.commit()
+                return self._computer_row_to_dict(row) if row else None
+        except psycopg2.Error as e:
+            self._record_failure("db.update_computer_status_by_id", e)
+            return None
+    
+    @instrumented("db.update_status_bulk")
+    def update_status_bulk(self, status: str, computer_ids: Optional[List[int]] = None,
+                           classroom: Optional[str] = None,
+                           current_status: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        conditions = []
+        params: List[Any] = [status]
+        if computer_ids is not None:
+            conditions.append("id = ANY(%s)")
+            params.append(list(computer_ids))
+        if classroom is not None:
+            conditions.append("classroom = %s")
+            params.append(classroom)
+        if current_status is not None:
+            conditions.append("status = %s")
+            params.append(current_status)
+        if not conditions:
+            # Never touch the whole fleet by accident
+            return []
+        # Rows already in the target status are left alone
+        conditions.append("status IS DISTINCT FROM %s")
+        params.append(status)
+        
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    UPDATE computers
+                    SET status = %s
+                    WHERE {' AND '.join(conditions)}
+                    RETURNING {self.COMPUTER_COLUMNS}
+                """, params)
+                rows = cur.fetchall()
+                conn.commit()
+                return [self._computer_row_to_dict(row) for row in rows]
+        except psycopg2.Error as e:
+            self._record_failure("db.update_status_bulk", e)
+            return None
+    
+    @instrumented("db.update_statuses")
+    def update_statuses(self, statuses: Dict[int, str]) -> List[Dict[str, Any]]:
+        """Apply per-computer statuses in one statement; maintenance rows are left alone"""
+        if not statuses:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                rows = psycopg2.extras.execute_values(cur, """
+                    UPDATE computers AS c
+                    SET status = v.status
+                    FROM (VALUES %s) AS v(id, status)
+                    WHERE c.id = v.id
+                      AND c.status IS DISTINCT FROM v.status
+                      AND c.status <> 'maintenance'
+                    RETURNING c.id, c.name, c.ip_address, c.classroom, c.status, c.mac_address
+                """, list(statuses.items()), page_size=1000, fetch=True)
+                conn.commit()
+                return [self._computer_row_to_dict(row) for row in rows]
+        except psycopg2.Error as e:
+            self._record_failure("db.update_statuses", e)
+            return []
+    
+    @instrumented("db.replay_actions")
+    def replay_actions(self, status_changes: List[Dict[str, Any]],
+                       additions: List[Dict[str, Any]]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        added, updated, current = [], [], {}
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                if additions:
+                    added = psycopg2.extras.execute_values(cur, """
+                        INSERT INTO computers (name, ip_address, classroom, mac_address, status)
+                        SELECT v.name, v.ip, v.classroom, v.mac, COALESCE(v.status, 'online')
+                        FROM (VALUES %s) AS v(name, ip, classroom, mac, status)
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM computers c
+                            WHERE c.classroom = v.classroom AND c.name = v.name
+                        )
+                        RETURNING id, name, ip_address, classroom, status, mac_address
+                    """, [
+                        (item["name"], item["ip"], item["classroom"], item.get("mac") or None,
+                         item.get("status"))
+                        for item in additions
+                    ], template="(%s::varchar, %s::varchar, %s::varchar, %s::varchar, %s::varchar)",
+                        page_size=1000, fetch=True)
+                if status_changes:
+                    # Compare-and-set: a row someone else changed meanwhile keeps their status
+                    updated = psycopg2.extras.execute_values(cur, """
+                        UPDATE computers AS c
+                        SET status = v.status
+                        FROM (VALUES %s) AS v(id, expected, status)
+                        WHERE c.id = v.id
+                          AND (c.status IS NOT DISTINCT FROM v.expected OR c.status = v.status)
+                        RETURNING c.id, c.name, c.ip_address, c.classroom, c.status, c.mac_address
+                    """, [
+                        (change["id"], change["expected"], change["status"]) for change in status_changes
+                    ], template="(%s::integer, %s::varchar, %s::varchar)", page_size=1000, fetch=True)
+                    updated_ids = {row[0] for row in updated}
+                    missed = [change["id"] for change in status_changes if change["id"] not in updated_ids]
+                    if missed:
+                        cur.execute("SELECT id, status FROM computers WHERE id = ANY(%s)", (missed,))
+                        current = dict(cur.fetchall())
+                conn.commit()
+        except psycopg2.Error as e:
+            self._record_failure("db.replay_actions", e)
+            return None
+        return self._replay_report(
+            status_changes, additions,
+            [self._computer_row_to_dict(row) for row in updated],
+            [self._computer_row_to_dict(row) for row in added],
+            current
+        )
+    
+    @instrumented("db.import_computers")
+    def import_computers(self, computers: Iterable[Dict[str, Any]],
+                         dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        """Upsert inventory rows keyed by (classroom, name) through a COPY-loaded staging table"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for data in computers:
+            writer.writerow((
+                data["name"], data["ip_address"], data["classroom"], data["status"],
+                data.get("mac_address") or ""
+            ))
+        buffer.seek(0)
+        
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("""
+                    CREATE TEMP TABLE computers_import (
+                        position BIGSERIAL,
+                        name VARCHAR(100) NOT NULL,
+                        ip_address VARCHAR(15) NOT NULL,
+                        classroom VARCHAR(100) NOT NULL,
+                        status VARCHAR(20) NOT NULL,
+                        mac_address VARCHAR(17)
+                    ) ON COMMIT DROP
+                """)
+                cur.copy_expert(
+                    "COPY computers_import (name, ip_address, classroom, status, mac_address) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                # The last occurrence of a (classroom, name) pair in the file wins
+                cur.execute("""
+                    CREATE TEMP TABLE computers_import_dedup ON COMMIT DROP AS
+                    SELECT DISTINCT ON (classroom, name)
+                           name, ip_address, classroom, status, mac_address
+                    FROM computers_import
+                    ORDER BY classroom, name, position DESC
+                """)
+                
+                cur.execute("""
+                    SELECT s.classroom, s.name,
+                           CASE
+                               WHEN NOT EXISTS (
+                                   SELECT 1 FROM computers c
+                                   WHERE c.classroom = s.classroom AND c.name = s.name
+                               ) THEN 'added'
+                               WHEN EXISTS (
+                                   SELECT 1 FROM computers c
+                                   WHERE c.classroom = s.classroom AND c.name = s.name
+                                     AND (c.ip_address <> s.ip_address
+                                          OR (s.mac_address IS NOT NULL
+                                              AND c.mac_address IS DISTINCT FROM s.mac_address))
+                               ) THEN 'updated'
+                               ELSE 'unchanged'
+                           END
+                    FROM computers_import_dedup s
+                    ORDER BY s.classroom, s.name
+                """)
+                report = {"added": [], "updated": [], "unchanged": 0}
+                for classroom, name, change in cur.fetchall():
+                    if change == "unchanged":
+                        report["unchanged"] += 1
+                    else:
+                        report[change].append((classroom, name))
+                
+                if dry_run:
+                    conn.rollback()
+                    return report
+                
+                # Inventory files describe hardware; live status is only set for new rows
+                cur.execute("""
+                    UPDATE computers c
+                    SET ip_address = s.ip_address,
+                        mac_address = COALESCE(s.mac_address, c.mac_address)
+                    FROM computers_import_dedup s
+                    WHERE c.classroom = s.classroom AND c.name = s.name
+                      AND (c.ip_address <> s.ip_address
+                           OR (s.mac_address IS NOT NULL
+                               AND c.mac_address IS DISTINCT FROM s.mac_address))
+                """)
+                cur.execute("""
+                    INSERT INTO computers (name, ip_address, classroom, status, mac_address)
+                    SELECT s.name, s.ip_address, s.classroom, s.status, s.mac_address
+                    FROM computers_import_dedup s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM computers c
+                        WHERE c.classroom = s.classroom AND c.name = s.name
+                    )
+                """)
+                conn.commit()
+                return report
+        except psycopg2.Error as e:
+            self._record_failure("db.import_computers", e)
+            return None
+    
+    def _create_event_partitions(self, cur) -> int:
+        """Create the status event partitions for today and the next days (UTC)"""
+        cur.execute("SELECT (now() AT TIME ZONE 'UTC')::date")
+        today = cur.fetchone()[0]
+        created = 0
+        for offset in range(self.PARTITIONS_AHEAD + 1):
+            day = today + timedelta(days=offset)
+            name = f"computer_status_events_p{day:%Y%m%d}"
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0] is not None:
+                continue
+            cur.execute("SAVEPOINT event_partition")
+            try:
+                cur.execute(f"""
+                    CREATE TABLE {name} PARTITION OF computer_status_events
+                    FOR VALUES FROM (%s) TO (%s)
+                """, (f"{day} 00:00+00", f"{day + timedelta(days=1)} 00:00+00"))
+                cur.execute("RELEASE SAVEPOINT event_partition")
+                created += 1
+            except psycopg2.Error as e:
+                # The default partition already holds rows of that day;
+                # they stay there until retention deletes them
+                cur.execute("ROLLBACK TO SAVEPOINT event_partition")
+                logger.warning("Cannot create partition %s: %s", name, e)
+        return created
+    
+    def _roll_up_status_history(self, cur) -> int:
+        cur.execute("""
+            SELECT rolled_until, date_trunc('hour', now())
+            FROM status_rollup_state
+            WHERE id = 1
+            FOR UPDATE
+        """)
+        lo, hi = cur.fetchone()
+        if hi <= lo:
+            return 0
+        bounds = {"lo": lo, "hi": hi}
+        cur.execute(ROLLUP_HOURS_SQL, bounds)
+        cur.execute(ROLLUP_DAYS_SQL, bounds)
+        cur.execute("UPDATE status_rollup_state SET rolled_until = %s WHERE id = 1", (hi,))
+        return int((hi - lo).total_seconds() // 3600)
+    
+    def _drop_expired_events(self, cur, retention_days: int) -> int:
+        # Events not rolled up yet are kept whatever their age
+        cur.execute("""
+            SELECT least(now() - make_interval(days => %s), rolled_until)
+            FROM status_rollup_state
+            WHERE id = 1
+        """, (retention_days,))
+        cutoff = cur.fetchone()[0]
+        cur.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'computer_status_events'::regclass
+        """)
+        dropped = 0
+        for (name,) in cur.fetchall():
+            match = EVENT_PARTITION.fullmatch(name)
+            if match is None:
+                continue
+            day = datetime.strptime(match.group(1), "%Y%m%d").replace(tzinfo=timezone.utc)
+            if day + timedelta(days=1) <= cutoff:
+                cur.execute(f"DROP TABLE {name}")
+                dropped += 1
+        cur.execute("DELETE FROM computer_status_events_default WHERE occurred_at < %s", (cutoff,))
+        return dropped
+    
+    @instrumented("db.maintain_status_history")
+    def maintain_status_history(self, retention_days: int = 90) -> Optional[Dict[str, int]]:
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (STATUS_HISTORY_LOCK_ID,))
+                if not cur.fetchone()[0]:
+                    # Another console is doing it right now
+                    conn.rollback()
+                    return {"hours": 0, "partitions_created": 0, "partitions_dropped": 0}
+                result = {
+                    "partitions_created": self._create_event_partitions(cur),
+                    "hours": self._roll_up_status_history(cur),
+                    "partitions_dropped": self._drop_expired_events(cur, retention_days),
+                }
+                conn.commit()
+                return result
+        except psycopg2.Error as e:
+            self._record_failure("db.maintain_status_history", e)
+            return None
+    
+    @instrumented("db.get_status_summary")
+    def get_status_summary(self, start: datetime, end: datetime, classroom: Optional[str] = None,
+                           granularity: str = "day") -> List[Dict[str, Any]]:
+        if granularity == "day":
+            table, period = "computer_status_daily", "day"
+            start, end = as_date(start), as_date(end)
+        else:
+            table, period = "computer_status_hourly", "hour"
+        conditions, params = [f"{period} >= %s", f"{period} < %s"], [start, end]
+        if classroom is not None:
+            conditions.append("classroom = %s")
+            params.append(classroom)
+        try:
+            with self.get_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"""
+                    SELECT classroom, {period}, online_seconds, offline_seconds, maintenance_seconds
+                    FROM {table}
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY classroom, {period}
+                """, params)
+                return [
+                    {"classroom": row[0], "period": row[1], "online": row[2],
+                     "offline": row[3], "maintenance": row[4]}
+                    for row in cur.fetchall()
+                ]
+        except psycopg2.Error as e:
+            self._record_failure("db.get_status_summary", e)
+            return []
@@ -0,0 +1,109 @@
+import csv
+import ipaddress
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+from .computer import Computer
+from .wake_on_lan import normalize_mac
+
+
+@dataclass
+class ImportReport:
+    """Result of an inventory import (or of its dry run)"""
+    dry_run: bool = False
+    added: List[Tuple[str, str]] = field(default_factory=list)    # (classroom, name)
+    updated: List[Tuple[str, str]] = field(default_factory=list)  # (classroom, name)
+    unchanged: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.added) + len(self.updated) + self.unchanged
+
+    def summary(self) -> str:
+        """Human-readable summary for dialogs and the console"""
+        title = "Предварительный просмотр импорта" if self.dry_run else "Импорт завершен"
+        lines = [
+            f"{title}:",
+            f"  новых компьютеров: {len(self.added)}",
+            f"  изменено: {len(self.updated)}",
+            f"  без изменений: {self.unchanged}",
+        ]
+        if self.errors:
+            lines.append(f"  пропущено строк с ошибками: {len(self.errors)}")
+        return "\n".join(lines)
+
+
+class InventoryReader:
+    """Streams Computer records from a JSON or CSV inventory file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.errors: List[str] = []
+
+    def read(self) -> Iterator[Computer]:
+        extension = os.path.splitext(self.path)[1].lower()
+        if extension == ".json":
+            records = self._read_json()
+        elif extension == ".csv":
+            records = self._read_csv()
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {self.path}")
+
+        for position, computer in records:
+            error = self._validate(computer)
+            if error:
+                self.errors.append(f"{position}: {error}")
+                continue
+            yield computer
+
+    def _read_json(self) -> Iterator[Tuple[str, Computer]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Не удалось прочитать {self.path}: {e}")
+
+        if isinstance(data, dict):
+            # Legacy computers.json layout: {"classroom": [{"name": ..., "ip": ...}, ...]}
+            for classroom, entries in data.items():
+                for number, entry in enumerate(entries, start=1):
+                    yield f"{classroom}[{number}]", Computer.from_dict(
+                        dict(entry, classroom=classroom)
+                    )
+        elif isinstance(data, list):
+            for number, entry in enumerate(data, start=1):
+                yield f"запись {number}", Computer.from_dict(entry)
+        else:
+            raise ValueError(f"Неизвестная структура файла: {self.path}")
+
+    def _read_csv(self) -> Iterator[Tuple[str, Computer]]:
+        try:
+            with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    row = {key.strip().lower(): (value or "").strip()
+                           for key, value in row.items() if key}
+                    if not row.get("status"):
+                        row.pop("status", None)
+                    yield f"строка {reader.line_num}", Computer.from_dict(row)
+        except OSError as e:
+            raise ValueError(f"Не удалось прочитать {self.path}: {e}")
+
+    @staticmethod
+    def _validate(computer: Computer) -> Optional[str]:
+        if not computer.name or not computer.classroom:
+            return "не указано имя или кабинет"
+        try:
+            ipaddress.IPv4Address(computer.ip_address)
+        except ValueError:
+            return f"некорректный IP-адрес {computer.ip_address!r}"
+        if computer.status not in Computer.STATUSES:
+            return f"неизвестный статус {computer.status!r}"
+        if computer.mac_address:
+            try:
+                computer.mac_address = normalize_mac(computer.mac_address)
+            except ValueError as e:
+                return str(e)
+        return None
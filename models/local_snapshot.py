@@ -0,0 +1,376 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .metrics import instrumented
+from .migrations import Migration
+from .sqlite_storage import SQLiteStorage
+
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_schema(cur, storage):
+    # The tables SQLiteStorage reads, without the status history triggers
+    # and without default users: only accounts that logged in here are kept
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt TEXT,
+            role TEXT NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            theme TEXT NOT NULL DEFAULT 'light'
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO settings (id, theme) VALUES (1, 'light')")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_settings (
+            username TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (username, key)
+        )
+    """)
+    # ids are the server's, so changes can be matched to rows
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS computers (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            ip_address TEXT NOT NULL,
+            classroom TEXT NOT NULL,
+            status TEXT DEFAULT 'online',
+            mac_address TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_computers_classroom_name
+        ON computers (classroom, name)
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            synced_at REAL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO snapshot_state (id, synced_at) VALUES (1, NULL)")
+
+
+def _pending_actions(cur, storage):
+    # Changes made while the server was unreachable, oldest first; payload is JSON
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pending_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL CHECK (kind IN ('status', 'add')),
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+
+
+SNAPSHOT_MIGRATIONS: List[Migration] = [
+    Migration(1, "Локальная копия данных сервера", _snapshot_schema),
+    Migration(2, "Очередь изменений без связи с сервером", _pending_actions),
+]
+
+
+def _computer_params(row: Dict[str, Any]) -> tuple:
+    return row["id"], row["name"], row["ip"], row["classroom"], row["status"], row.get("mac") or None
+
+
+class LocalSnapshot(SQLiteStorage):
+    """On-disk copy of the server's computers, settings and recent logins"""
+
+    MIGRATIONS = SNAPSHOT_MIGRATIONS
+    UPSERT_COMPUTER = """
+        INSERT INTO computers (id, name, ip_address, classroom, status, mac_address)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            name = excluded.name,
+            ip_address = excluded.ip_address,
+            classroom = excluded.classroom,
+            status = excluded.status,
+            mac_address = excluded.mac_address
+    """
+
+    def init_database(self):
+        super().init_database()
+        # Holds the password hashes of users who logged in on this computer
+        try:
+            os.chmod(self.path, 0o600)
+        except OSError as e:
+            logger.warning("Cannot restrict access to %s: %s", self.path, e)
+
+    @property
+    def synced_at(self) -> Optional[datetime]:
+        """When the computers were last copied from the server in full"""
+        try:
+            row = self.get_connection().execute(
+                "SELECT synced_at FROM snapshot_state WHERE id = 1"
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.synced_at", e)
+            return None
+        if row is None or row[0] is None:
+            return None
+        return datetime.fromtimestamp(row[0], timezone.utc)
+
+    @instrumented("snapshot.replace_computers")
+    def replace_computers(self, rows: Iterable[Dict[str, Any]]) -> bool:
+        """Replace every computer; an exception raised by `rows` leaves the old copy intact"""
+        try:
+            conn = self.get_connection()
+            # `rows` streams from the server; staged in this connection's temp
+            # table, it does not hold the snapshot's write lock meanwhile
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS staged_computers (
+                    id INTEGER PRIMARY KEY, name TEXT, ip_address TEXT,
+                    classroom TEXT, status TEXT, mac_address TEXT
+                )
+            """)
+            conn.execute("BEGIN")
+            try:
+                conn.execute("DELETE FROM temp.staged_computers")
+                conn.executemany("INSERT OR REPLACE INTO temp.staged_computers VALUES (?, ?, ?, ?, ?, ?)",
+                                 (_computer_params(row) for row in rows))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            try:
+                with self._transaction() as cur:
+                    cur.execute("DELETE FROM computers")
+                    cur.execute("""
+                        INSERT INTO computers (id, name, ip_address, classroom, status, mac_address)
+                        SELECT id, name, ip_address, classroom, status, mac_address FROM temp.staged_computers
+                    """)
+                    cur.execute("UPDATE snapshot_state SET synced_at = ? WHERE id = 1", (time.time(),))
+            finally:
+                conn.execute("DELETE FROM temp.staged_computers")
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.replace_computers", e)
+            return False
+
+    @instrumented("snapshot.replace_classroom")
+    def replace_classroom(self, classroom: str, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.execute("DELETE FROM computers WHERE classroom = ?", (classroom,))
+                cur.executemany(self.UPSERT_COMPUTER, [_computer_params(row) for row in rows])
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.replace_classroom", e)
+            return False
+
+    @instrumented("snapshot.apply_computers")
+    def apply_computers(self, rows: List[Dict[str, Any]]) -> bool:
+        if not rows:
+            return True
+        try:
+            with self._transaction() as cur:
+                cur.executemany(self.UPSERT_COMPUTER, [_computer_params(row) for row in rows])
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.apply_computers", e)
+            return False
+
+    @instrumented("snapshot.remove_computers")
+    def remove_computers(self, computer_ids: List[int]) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.executemany("DELETE FROM computers WHERE id = ?", [(i,) for i in computer_ids])
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.remove_computers", e)
+            return False
+
+    @instrumented("snapshot.save_credentials")
+    def save_credentials(self, username: str, password_hash: str, salt: Optional[str], role: str) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.execute("""
+                    INSERT INTO users (username, password_hash, salt, role) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (username) DO UPDATE SET
+                        password_hash = excluded.password_hash,
+                        salt = excluded.salt,
+                        role = excluded.role
+                """, (username, password_hash, salt, role))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.save_credentials", e)
+            return False
+
+    # Offline changes
+
+    @instrumented("snapshot.get_computer")
+    def get_computer(self, computer_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            row = self.get_connection().execute(
+                f"SELECT {self.COMPUTER_COLUMNS} FROM computers WHERE id = ?", (computer_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.get_computer", e)
+            return None
+        return self._computer_row_to_dict(row) if row else None
+
+    @instrumented("snapshot.find_computer_ids")
+    def find_computer_ids(self, computer_ids: Optional[List[int]] = None, name: Optional[str] = None,
+                          classroom: Optional[str] = None,
+                          current_status: Optional[str] = None) -> List[int]:
+        """Ids matching every given filter, resolved against the local copy"""
+        conditions, params = [], []
+        if computer_ids is not None:
+            conditions.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(computer_ids)))
+        for column, value in (("name", name), ("classroom", classroom), ("status", current_status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if not conditions:
+            return []
+        try:
+            rows = self.get_connection().execute(
+                f"SELECT id FROM computers WHERE {' AND '.join(conditions)}", params
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.find_computer_ids", e)
+            return []
+        return [row[0] for row in rows]
+
+    @instrumented("snapshot.queue_status_changes")
+    def queue_status_changes(self, statuses: Dict[int, str],
+                             skip_maintenance: bool = False) -> List[Dict[str, Any]]:
+        """Apply statuses to the copy and queue them for the server; returns the changed rows
+
+        Each queued change remembers the status it replaced, which replay
+        uses to notice that someone else changed the computer meanwhile.
+        """
+        if not statuses:
+            return []
+        created_at = time.time()
+        try:
+            with self._transaction() as cur:
+                rows = cur.execute(f"""
+                    SELECT {self.COMPUTER_COLUMNS}
+                    FROM computers
+                    WHERE id IN (SELECT value FROM json_each(?))
+                """, (json.dumps(list(statuses)),)).fetchall()
+                changed, actions = [], []
+                for row in rows:
+                    computer = self._computer_row_to_dict(row)
+                    status = statuses[computer["id"]]
+                    if computer["status"] == status:
+                        continue
+                    if skip_maintenance and computer["status"] == "maintenance":
+                        continue
+                    changed.append({**computer, "status": status})
+                    if computer["id"] < 0:
+                        # Not on the server yet: the queued addition carries the status
+                        cur.execute("""
+                            UPDATE pending_actions SET payload = json_set(payload, '$.status', ?)
+                            WHERE kind = 'add'
+                              AND json_extract(payload, '$.classroom') = ?
+                              AND json_extract(payload, '$.name') = ?
+                        """, (status, computer["classroom"], computer["name"]))
+                        continue
+                    actions.append(("status", json.dumps({
+                        "id": computer["id"], "name": computer["name"],
+                        "expected": computer["status"], "status": status
+                    }), created_at))
+                cur.executemany("UPDATE computers SET status = ? WHERE id = ?",
+                                [(computer["status"], computer["id"]) for computer in changed])
+                cur.executemany("INSERT INTO pending_actions (kind, payload, created_at) VALUES (?, ?, ?)",
+                                actions)
+            return changed
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.queue_status_changes", e)
+            return []
+
+    @instrumented("snapshot.queue_addition")
+    def queue_addition(self, name: str, ip_address: str, classroom: str,
+                       mac_address: Optional[str] = None) -> bool:
+        """Add the computer to the copy and queue it; False if the classroom already has that name"""
+        try:
+            with self._transaction() as cur:
+                if cur.execute("SELECT 1 FROM computers WHERE classroom = ? AND name = ?",
+                               (classroom, name)).fetchone():
+                    return False
+                # A negative id until the server assigns one at the next synchronization
+                cur.execute("""
+                    INSERT INTO computers (id, name, ip_address, classroom, mac_address)
+                    SELECT MIN(0, COALESCE(MIN(id), 0)) - 1, ?, ?, ?, ? FROM computers
+                """, (name, ip_address, classroom, mac_address or None))
+                cur.execute("INSERT INTO pending_actions (kind, payload, created_at) VALUES ('add', ?, ?)", (
+                    json.dumps({"name": name, "ip": ip_address, "classroom": classroom,
+                                "mac": mac_address or None}),
+                    time.time()
+                ))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.queue_addition", e)
+            return False
+
+    @instrumented("snapshot.pending_actions")
+    def pending_actions(self, limit: int = 500) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """The oldest queued actions as (id, kind, payload)"""
+        try:
+            rows = self.get_connection().execute(
+                "SELECT id, kind, payload FROM pending_actions ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.pending_actions", e)
+            return []
+        return [(action_id, kind, json.loads(payload)) for action_id, kind, payload in rows]
+
+    @instrumented("snapshot.remove_actions")
+    def remove_actions(self, action_ids: List[int]) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.execute("DELETE FROM pending_actions WHERE id IN (SELECT value FROM json_each(?))",
+                            (json.dumps(action_ids),))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.remove_actions", e)
+            return False
+
+    @property
+    def pending_count(self) -> int:
+        try:
+            return self.get_connection().execute("SELECT COUNT(*) FROM pending_actions").fetchone()[0]
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.pending_count", e)
+            return 0
+
+    @instrumented("snapshot.apply_replay")
+    def apply_replay(self, additions: List[Dict[str, Any]], report: Dict[str, List[Dict[str, Any]]]) -> bool:
+        """Swap replayed additions' placeholders for the server's rows and take its side of conflicts"""
+        try:
+            with self._transaction() as cur:
+                cur.executemany("DELETE FROM computers WHERE id < 0 AND classroom = ? AND name = ?",
+                                [(item["classroom"], item["name"]) for item in additions])
+                cur.executemany(self.UPSERT_COMPUTER, [
+                    _computer_params(row) for row in report["updated"] + report["added"]
+                ])
+                for conflict in report["conflicts"]:
+                    if conflict["kind"] != "status":
+                        continue
+                    if conflict["current"] is None:
+                        cur.execute("DELETE FROM computers WHERE id = ?", (conflict["id"],))
+                    else:
+                        cur.execute("UPDATE computers SET status = ? WHERE id = ?",
+                                    (conflict["current"], conflict["id"]))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("snapshot.apply_replay", e)
+            return False
@@ -0,0 +1,270 @@
+import bisect
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds; fine enough to tell an index scan from a sequential one
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# A collector returns (name, labels, value) gauges sampled at read time
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and max, as Prometheus expects"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by name and labels"""
+
+    HELP = {
+        "pc_operation_duration_seconds": "Duration of model layer operations",
+        "pc_operation_errors_total": "Failed model layer operations",
+        "pc_operation_rows_total": "Rows returned or changed by model layer operations",
+        "pc_db_connection_acquire_seconds": "Time spent waiting for a pooled database connection",
+        "pc_task_duration_seconds": "Time from queueing a background task to its result",
+        "pc_task_errors_total": "Background tasks that raised",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._collectors: List[Collector] = []
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _gauges(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            collectors = list(self._collectors)
+        gauges = []
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.append((name, self._key(labels), float(value)))
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain data for the diagnostics panel"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {
+                    key: {
+                        "count": h.count,
+                        "sum": h.sum,
+                        "max": h.max,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                    }
+                    for key, h in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+        gauges: Dict[str, Dict[LabelKey, float]] = {}
+        for name, key, value in self._gauges():
+            gauges.setdefault(name, {})[key] = value
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = []
+        for name, value in pairs:
+            value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{name}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{self._format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+        typed = set()
+        for name, key, value in sorted(self._gauges()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(f"{name}{self._format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Atomically replace path, so a textfile collector never reads half a file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+REGISTRY = MetricsRegistry()
+
+
+def count_rows(result: Any) -> Optional[int]:
+    """Rows in a model layer result: list length, or the total of a dict of lists"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and result and all(isinstance(v, list) for v in result.values()):
+        return sum(len(rows) for rows in result.values())
+    return None
+
+
+def record_failure(operation: str, error: Exception, registry: Optional[MetricsRegistry] = None):
+    """For errors a method handles itself (returning False/[]), which instrumented() cannot see"""
+    logger.warning("%s failed: %s: %s", operation, type(error).__name__, error)
+    (registry or REGISTRY).inc("pc_operation_errors_total", operation=operation)
+
+
+def instrumented(operation: str, registry: Optional[MetricsRegistry] = None):
+    """Record duration, rows and escaping exceptions of a method under `operation`"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = registry or REGISTRY
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                target.inc("pc_operation_errors_total", operation=operation)
+                raise
+            finally:
+                target.observe("pc_operation_duration_seconds", time.perf_counter() - started,
+                               operation=operation)
+            rows = count_rows(result)
+            if rows:
+                target.inc("pc_operation_rows_total", rows, operation=operation)
+            return result
+        return wrapper
+    return decorator
+
+
+class MetricsExporter:
+    """Periodically writes the registry to a Prometheus textfile-collector file"""
+
+    def __init__(self, path: str, interval: float = 15.0, registry: Optional[MetricsRegistry] = None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        self.export()
+
+    def export(self):
+        try:
+            self.registry.write(self.path)
+        except OSError as e:
+            logger.warning("Cannot write metrics to %s: %s", self.path, e)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
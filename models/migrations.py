@@ -0,0 +1,347 @@
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+
+# Serializes concurrent consoles that start against a fresh database
+MIGRATION_LOCK_ID = 0x574F4C  # "WOL"
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Any, Any], None]  # (cursor, DatabaseManager)
+
+
+def _initial_schema(cur, db_manager):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(128) NOT NULL,
+            salt VARCHAR(64) NOT NULL,
+            role VARCHAR(20) NOT NULL CHECK (role IN ('teacher', 'admin'))
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            theme VARCHAR(20) NOT NULL DEFAULT 'light'
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS computers (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            ip_address VARCHAR(15) NOT NULL,
+            classroom VARCHAR(100) NOT NULL,
+            status VARCHAR(20) DEFAULT 'online',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cur.execute("""
+        ALTER TABLE computers ADD COLUMN IF NOT EXISTS mac_address VARCHAR(17)
+    """)
+
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_computers_classroom_name
+        ON computers (classroom, name)
+    """)
+
+    # Every row change is published to LISTEN-ing consoles
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION notify_computer_change() RETURNS trigger AS $$
+        DECLARE
+            row_data computers%ROWTYPE;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data := OLD;
+            ELSE
+                row_data := NEW;
+            END IF;
+            PERFORM pg_notify('computers_changed', json_build_object(
+                'op', TG_OP,
+                'id', row_data.id,
+                'name', row_data.name,
+                'ip', row_data.ip_address,
+                'classroom', row_data.classroom,
+                'status', row_data.status,
+                'mac', row_data.mac_address,
+                'old_classroom', CASE WHEN TG_OP = 'UPDATE' THEN OLD.classroom END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS computers_notify_insert_delete ON computers")
+    cur.execute("""
+        CREATE TRIGGER computers_notify_insert_delete
+        AFTER INSERT OR DELETE ON computers
+        FOR EACH ROW EXECUTE FUNCTION notify_computer_change()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS computers_notify_update ON computers")
+    cur.execute("""
+        CREATE TRIGGER computers_notify_update
+        AFTER UPDATE ON computers
+        FOR EACH ROW
+        WHEN (OLD.* IS DISTINCT FROM NEW.*)
+        EXECUTE FUNCTION notify_computer_change()
+    """)
+
+    cur.execute("""
+        INSERT INTO settings (id, theme)
+        VALUES (1, 'light')
+        ON CONFLICT (id) DO NOTHING
+    """)
+
+    default_users = [
+        ("teacher", "123456", "teacher"),
+        ("admin", "admin123", "admin")
+    ]
+    cur.execute("SELECT username FROM users WHERE username = ANY(%s)",
+                ([username for username, _, _ in default_users],))
+    existing = {row[0] for row in cur.fetchall()}
+    for username, password, role in default_users:
+        if username in existing:
+            continue
+        salt = db_manager._generate_salt()
+        password_hash = db_manager._hash_password(password, salt)
+        cur.execute("""
+            INSERT INTO users (username, password_hash, salt, role)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (username) DO NOTHING
+        """, (username, password_hash, salt, role))
+
+    # Demo computers only for an empty installation
+    cur.execute("""
+        INSERT INTO computers (name, ip_address, classroom)
+        SELECT name, ip_address, classroom
+        FROM (VALUES
+            ('ПК-01', '192.168.1.101', 'Cab 201'),
+            ('ПК-02', '192.168.1.102', 'Cab 201'),
+            ('ПК-03', '192.168.1.103', 'Cab 201'),
+            ('ПК-11', '192.168.1.111', 'Cab 202'),
+            ('ПК-12', '192.168.1.112', 'Cab 202')
+        ) AS seed (name, ip_address, classroom)
+        WHERE NOT EXISTS (SELECT 1 FROM computers)
+    """)
+
+
+def _self_describing_password_hashes(cur, db_manager):
+    # algorithm$parameters$salt$hash no longer fits 128 chars, and the salt
+    # moves into the hash; legacy rows keep their salt until they are rehashed
+    cur.execute("""
+        ALTER TABLE users
+            ALTER COLUMN password_hash TYPE VARCHAR(255),
+            ALTER COLUMN salt DROP NOT NULL
+    """)
+
+
+def _index_computer_name(cur, db_manager):
+    # update_computer_status filters on name alone, which is not unique
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_computers_name ON computers (name)")
+
+
+def _keyset_index(cur, db_manager):
+    # Ends in id so keyset pages seek and come out in ORDER BY classroom,
+    # name, id without a sort; it also serves everything the old index did
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_computers_keyset
+        ON computers (classroom, name, id)
+    """)
+    cur.execute("DROP INDEX IF EXISTS idx_computers_classroom_name")
+
+
+def _status_history(cur, db_manager):
+    # Raw events are partitioned by day (UTC) so retention drops whole
+    # partitions; DatabaseManager.maintain_status_history creates them ahead.
+    # The default partition only catches rows whose day was not created yet.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS computer_status_events (
+            id BIGSERIAL,
+            computer_id INTEGER NOT NULL,
+            classroom VARCHAR(100) NOT NULL,
+            old_status VARCHAR(20),
+            status VARCHAR(20),
+            occurred_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        ) PARTITION BY RANGE (occurred_at)
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS computer_status_events_default
+        PARTITION OF computer_status_events DEFAULT
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_status_events_time
+        ON computer_status_events (occurred_at, computer_id)
+    """)
+    # Today and the next seven days (UTC), so events do not start out in the
+    # default partition; later days are created by maintain_status_history.
+    # Written out here so this migration does not change with that method.
+    cur.execute("""
+        DO $$
+        DECLARE
+            first_day date := (now() AT TIME ZONE 'UTC')::date;
+            d date;
+        BEGIN
+            FOR i IN 0..7 LOOP
+                d := first_day + i;
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF computer_status_events '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'computer_status_events_p' || to_char(d, 'YYYYMMDD'),
+                    d || ' 00:00+00', (d + 1) || ' 00:00+00'
+                );
+            END LOOP;
+        END
+        $$
+    """)
+
+    # Statement-level triggers: a bulk update or import of N computers is
+    # recorded by one INSERT ... SELECT over the transition tables. A NULL
+    # status marks a deleted computer.
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION record_computer_status_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+                SELECT id, classroom, NULL, status FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+                SELECT id, classroom, status, NULL FROM old_rows;
+            ELSE
+                INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+                SELECT n.id, n.classroom, o.status, n.status
+                FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.status IS DISTINCT FROM o.status;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS computers_status_insert ON computers")
+    cur.execute("""
+        CREATE TRIGGER computers_status_insert
+        AFTER INSERT ON computers
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_computer_status_changes()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS computers_status_delete ON computers")
+    cur.execute("""
+        CREATE TRIGGER computers_status_delete
+        AFTER DELETE ON computers
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_computer_status_changes()
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS computers_status_update ON computers")
+    cur.execute("""
+        CREATE TRIGGER computers_status_update
+        AFTER UPDATE ON computers
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_computer_status_changes()
+    """)
+
+    # Seconds spent in each status, summed over a classroom's computers
+    for table, period in (("computer_status_hourly", "hour TIMESTAMPTZ"),
+                          ("computer_status_daily", "day DATE")):
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                classroom VARCHAR(100) NOT NULL,
+                {period} NOT NULL,
+                online_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+                offline_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+                maintenance_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+                PRIMARY KEY (classroom, {period.split()[0]})
+            )
+        """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS status_rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rolled_until TIMESTAMPTZ
+        )
+    """)
+    cur.execute("""
+        INSERT INTO status_rollup_state (id, rolled_until)
+        VALUES (1, date_trunc('hour', now()))
+        ON CONFLICT (id) DO NOTHING
+    """)
+
+
+def _user_settings(cur, db_manager):
+    # One row per user and setting, so adding a setting needs no migration;
+    # the settings row with id = 1 keeps the defaults for everyone
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_settings (
+            username VARCHAR(50) NOT NULL REFERENCES users (username) ON DELETE CASCADE,
+            key VARCHAR(50) NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (username, key)
+        )
+    """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема: пользователи, настройки, компьютеры", _initial_schema),
+    Migration(2, "Хеши паролей с алгоритмом и параметрами", _self_describing_password_hashes),
+    Migration(3, "Индекс по имени компьютера", _index_computer_name),
+    Migration(4, "Индекс для постраничной выборки компьютеров", _keyset_index),
+    Migration(5, "История статусов компьютеров и сводки доступности", _status_history),
+    Migration(6, "Персональные настройки пользователей", _user_settings),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn) -> int:
+    """One cheap query; 0 means the database has never been migrated"""
+    # psycopg2 is imported by the PostgreSQL functions only: the SQLite
+    # backends share Migration without loading the driver
+    from psycopg2 import errors
+
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT max(version) FROM schema_version")
+        row = cur.fetchone()
+        conn.rollback()
+        return row[0] or 0
+    except errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+
+def apply_migrations(conn, db_manager) -> List[int]:
+    """Apply pending migrations in one transaction; returns the applied versions"""
+    import psycopg2
+
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    # Another console may have migrated while we waited for the lock
+    cur.execute("SELECT COALESCE(max(version), 0) FROM schema_version")
+    current = cur.fetchone()[0]
+
+    applied = []
+    try:
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            migration.apply(cur, db_manager)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (migration.version, migration.description)
+            )
+            applied.append(migration.version)
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    return applied
@@ -0,0 +1,424 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .change_listener import ComputerChange
+from .local_snapshot import LocalSnapshot
+from .slow_query_log import SlowQueryLog
+from .storage import PageKey, StorageBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineError(Exception):
+    """The server is unreachable and the operation cannot be served locally"""
+
+
+def _change_row(change: ComputerChange) -> Dict[str, Any]:
+    computer = change.computer
+    return {
+        "id": computer.id,
+        "name": computer.name,
+        "ip": computer.ip_address,
+        "classroom": computer.classroom,
+        "status": computer.status,
+        "mac": computer.mac_address,
+    }
+
+
+def _coalesce(actions: List[Tuple[int, str, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """One change per computer, from its first expected to its last status; one addition per name"""
+    changes: Dict[int, Dict[str, Any]] = {}
+    additions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for _, kind, payload in actions:
+        if kind == "add":
+            additions.setdefault((payload["classroom"], payload["name"]), payload)
+        else:
+            changes.setdefault(payload["id"], dict(payload))["status"] = payload["status"]
+    # A computer switched back and forth ends where the server still is
+    return [change for change in changes.values() if change["status"] != change["expected"]], \
+        list(additions.values())
+
+
+class OfflineFirstStorage(StorageBackend):
+    """Serves the last known data from a LocalSnapshot whenever the server is unreachable"""
+
+    def __init__(self, connect: Callable[[], StorageBackend], snapshot: LocalSnapshot,
+                 retry_interval: float = 5.0, max_retry_interval: float = 60.0,
+                 slow_query_log: Optional[SlowQueryLog] = None, replay_batch_size: int = 500,
+                 login_wait: float = 10.0):
+        super().__init__(snapshot.password_hasher)
+        # The server backend's log; SettingsService toggles it through us
+        self.slow_query_log = slow_query_log
+        self.snapshot = snapshot
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.replay_batch_size = replay_batch_size
+        self.login_wait = login_wait
+        self.startup_timings = dict(snapshot.startup_timings)
+        self._connect = connect
+        self._remote: Optional[StorageBackend] = None
+        self._online = False
+        self._was_online = False
+        # Set once the first connection attempt has produced a server backend or failed
+        self._first_attempt = threading.Event()
+        self._listeners: List[Callable[[bool], None]] = []
+        self._state_lock = threading.Lock()
+        self._local = threading.local()
+        self._report: Optional[Dict[str, Any]] = None
+        self._failed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Connect on a background thread, so startup never waits for the network"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="storage-connector", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._failed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.max_retry_interval)
+            self._thread = None
+        if self._remote is not None:
+            self._remote.close()
+        self.snapshot.close()
+
+    # Connection state
+
+    @property
+    def online(self) -> bool:
+        return self._online
+
+    def add_connection_listener(self, callback: Callable[[bool], None]):
+        self._listeners.append(callback)
+
+    def _set_online(self, online: bool):
+        with self._state_lock:
+            if self._online == online:
+                return
+            self._online = online
+            self._was_online = self._was_online or online
+        if online:
+            logger.info("Server reachable, snapshot synchronized")
+        else:
+            logger.warning("Server unreachable, serving the local snapshot")
+        for callback in list(self._listeners):
+            try:
+                callback(online)
+            except Exception:
+                logger.exception("Connection listener failed")
+
+    def _run(self):
+        delay = self.retry_interval
+        while not self._stop.is_set():
+            if self._online:
+                # Sleep until a call finds the server gone
+                self._failed.wait()
+                self._failed.clear()
+                continue
+            connected = self._try_connect()
+            self._first_attempt.set()
+            if connected:
+                delay = self.retry_interval
+                continue
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_retry_interval)
+
+    def _try_connect(self) -> bool:
+        remote = self._remote
+        if remote is None:
+            started = time.perf_counter()
+            try:
+                remote = self._connect()
+            except Exception as e:
+                logger.warning("Server unavailable: %s", e)
+                return False
+            self.startup_timings["server"] = time.perf_counter() - started
+            remote.failure_listener = self._on_remote_failure
+            self._remote = remote
+            self._first_attempt.set()
+        elif not remote.ping():
+            return False
+        # Replayed first: the rebuilt snapshot must not undo queued changes
+        if not self._replay(remote) or not self._sync(remote):
+            return False
+        self._set_online(True)
+        # Changes queued while the snapshot was being rebuilt
+        self._replay(remote)
+        return True
+
+    def _replay(self, remote: StorageBackend) -> bool:
+        """Send the queued actions; False if the server became unreachable meanwhile"""
+        while True:
+            actions = self.snapshot.pending_actions(self.replay_batch_size)
+            if not actions:
+                return True
+            status_changes, additions = _coalesce(actions)
+            self._local.failure = None
+            report = remote.replay_actions(status_changes, additions)
+            failure = self._local.failure
+            if report is not None:
+                self.snapshot.apply_replay(additions, report)
+                for conflict in report["conflicts"]:
+                    logger.warning("Offline change not applied, changed on the server meanwhile: %s", conflict)
+            elif failure is not None and remote.is_connection_error(failure):
+                return False
+            else:
+                # Retrying would fail the same way and block everything queued after it
+                logger.error("Server rejected %d offline changes, dropping them: %s",
+                             len(actions), [payload for _, _, payload in actions])
+            if not self.snapshot.remove_actions([action_id for action_id, _, _ in actions]):
+                return False
+            with self._state_lock:
+                totals = self._report or {"applied": 0, "conflicts": [], "dropped": 0}
+                if report is None:
+                    totals["dropped"] += len(actions)
+                else:
+                    totals["applied"] += len(report["updated"]) + len(report["added"])
+                    # A computer whose changes spanned batches is reported once, with its last one
+                    superseded = {conflict.get("id") for conflict in report["conflicts"]} - {None}
+                    totals["conflicts"] = [
+                        conflict for conflict in totals["conflicts"] if conflict.get("id") not in superseded
+                    ] + report["conflicts"]
+                self._report = totals
+
+    def _sync(self, remote: StorageBackend) -> bool:
+        """Rebuild the snapshot's computers from the server"""
+        self._local.failure = None
+
+        def rows() -> Iterator[Dict[str, Any]]:
+            yield from remote.iter_all_computers()
+            # The stream ends early on an error; a partial copy must not replace the old one
+            if self._local.failure is not None:
+                raise OfflineError(f"Synchronization interrupted: {self._local.failure}")
+
+        try:
+            return self.snapshot.replace_computers(rows())
+        except OfflineError as e:
+            logger.warning("%s", e)
+            return False
+
+    def _on_remote_failure(self, operation: str, error: Exception):
+        self._local.failure = error
+
+    def _call(self, method: str, *args, **kwargs) -> Tuple[bool, Any]:
+        """(True, result) from the server, or (False, None) when it is unreachable"""
+        remote = self._remote
+        if remote is None or not self._online:
+            return False, None
+        self._local.failure = None
+        result = getattr(remote, method)(*args, **kwargs)
+        failure = self._local.failure
+        if failure is not None and remote.is_connection_error(failure):
+            self._set_online(False)
+            self._failed.set()
+            return False, None
+        return True, result
+
+    def _call_starting(self, method: str, *args) -> Tuple[bool, Any]:
+        """_call for the server backend that is connected but not yet online"""
+        remote = self._remote
+        if remote is None:
+            return False, None
+        self._local.failure = None
+        result = getattr(remote, method)(*args)
+        failure = self._local.failure
+        if failure is not None and remote.is_connection_error(failure):
+            return False, None
+        return True, result
+
+    def _unavailable(self, operation: str, result: Any = None) -> Any:
+        self._record_failure(operation, OfflineError("Нет связи с сервером"))
+        return result
+
+    # Users
+
+    def verify_user(self, username: str, password: str) -> Tuple[bool, Optional[str]]:
+        self._local.credentials = None
+        success, role = super().verify_user(username, password)
+        credentials = self._local.credentials
+        if success and credentials is not None:
+            # Lets this user log in here while the server is unreachable
+            self.snapshot.save_credentials(username, *credentials)
+        return success, role
+
+    def _get_credentials(self, username: str) -> Optional[Tuple[str, Optional[str], str]]:
+        reached, credentials = self._call("_get_credentials", username)
+        if not reached and not self._was_online:
+            # Still starting: the snapshot may not know this user yet, so the
+            # server is asked directly once connected, during replay and sync too
+            self._first_attempt.wait(self.login_wait)
+            reached, credentials = self._call_starting("_get_credentials", username)
+        if not reached:
+            return self.snapshot._get_credentials(username)
+        self._local.credentials = credentials
+        return credentials
+
+    def _replace_password_hash(self, username: str, old_hash: str, new_hash: str):
+        # Offline, the upgrade simply waits for a login with the server up
+        self._call("_replace_password_hash", username, old_hash, new_hash)
+
+    # Settings
+
+    def get_theme(self) -> str:
+        reached, theme = self._call("get_theme")
+        return theme if reached else self.snapshot.get_theme()
+
+    def set_theme(self, theme: str) -> bool:
+        reached, saved = self._call("set_theme", theme)
+        return saved if reached else self._unavailable("db.set_theme", False)
+
+    def get_user_settings(self, username: Optional[str]) -> Optional[Dict[str, str]]:
+        reached, values = self._call("get_user_settings", username)
+        if not reached:
+            return self.snapshot.get_user_settings(username)
+        if values is not None and username is not None:
+            self.snapshot.save_user_settings(username, values)
+        return values
+
+    def save_user_settings(self, username: str, values: Dict[str, str]) -> bool:
+        self.snapshot.save_user_settings(username, values)
+        reached, saved = self._call("save_user_settings", username, values)
+        return saved if reached else self._unavailable("db.save_user_settings", False)
+
+    # Computers
+
+    def get_all_computers(self) -> Dict[str, List[Dict[str, Any]]]:
+        reached, computers = self._call("get_all_computers")
+        return computers if reached else self.snapshot.get_all_computers()
+
+    def get_computers_page(self, after: Optional[PageKey] = None, limit: int = 500,
+                           classroom: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        reached, rows = self._call("get_computers_page", after, limit, classroom)
+        return rows if reached else self.snapshot.get_computers_page(after, limit, classroom)
+
+    def iter_all_computers(self, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        remote = self._remote
+        if remote is not None and self._online:
+            return remote.iter_all_computers(batch_size)
+        return self.snapshot.iter_all_computers(batch_size)
+
+    def get_computers_by_classroom(self, classroom: str) -> Optional[List[Dict[str, Any]]]:
+        reached, rows = self._call("get_computers_by_classroom", classroom)
+        if not reached:
+            return self.snapshot.get_computers_by_classroom(classroom)
+        if rows is not None:
+            self.snapshot.replace_classroom(classroom, rows)
+        return rows
+
+    def get_classrooms(self) -> Optional[List[str]]:
+        reached, classrooms = self._call("get_classrooms")
+        return classrooms if reached else self.snapshot.get_classrooms()
+
+    def add_computer(self, name: str, ip_address: str, classroom: str,
+                     mac_address: Optional[str] = None) -> bool:
+        reached, added = self._call("add_computer", name, ip_address, classroom, mac_address)
+        return added if reached else self.snapshot.queue_addition(name, ip_address, classroom, mac_address)
+
+    def update_computer_status(self, name: str, status: str) -> bool:
+        reached, updated = self._call("update_computer_status", name, status)
+        if reached:
+            return updated
+        computer_ids = self.snapshot.find_computer_ids(name=name)
+        self.snapshot.queue_status_changes(dict.fromkeys(computer_ids, status))
+        return bool(computer_ids)
+
+    def update_computer_status_by_id(self, computer_id: int, status: str) -> Optional[Dict[str, Any]]:
+        reached, row = self._call("update_computer_status_by_id", computer_id, status)
+        if not reached:
+            changed = self.snapshot.queue_status_changes({computer_id: status})
+            return changed[0] if changed else self.snapshot.get_computer(computer_id)
+        if row is not None:
+            self.snapshot.apply_computers([row])
+        return row
+
+    def update_status_bulk(self, status: str, computer_ids: Optional[List[int]] = None,
+                           classroom: Optional[str] = None,
+                           current_status: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        reached, rows = self._call("update_status_bulk", status, computer_ids, classroom, current_status)
+        if not reached:
+            matched = self.snapshot.find_computer_ids(computer_ids, classroom=classroom,
+                                                      current_status=current_status)
+            return self.snapshot.queue_status_changes(dict.fromkeys(matched, status))
+        if rows is not None:
+            self.snapshot.apply_computers(rows)
+        return rows
+
+    def update_statuses(self, statuses: Dict[int, str]) -> List[Dict[str, Any]]:
+        reached, rows = self._call("update_statuses", statuses)
+        if not reached:
+            return self.snapshot.queue_status_changes(statuses, skip_maintenance=True)
+        self.snapshot.apply_computers(rows)
+        return rows
+
+    def import_computers(self, computers: Iterable[Dict[str, Any]],
+                         dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        reached, report = self._call("import_computers", computers, dry_run)
+        return report if reached else self._unavailable("db.import_computers")
+
+    # Offline actions
+
+    def replay_actions(self, status_changes: List[Dict[str, Any]],
+                       additions: List[Dict[str, Any]]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        reached, report = self._call("replay_actions", status_changes, additions)
+        return report if reached else self._unavailable("db.replay_actions")
+
+    @property
+    def pending_writes(self) -> int:
+        return self.snapshot.pending_count
+
+    def take_replay_report(self) -> Optional[Dict[str, Any]]:
+        """{"applied", "conflicts", "dropped"} accumulated since the last call"""
+        with self._state_lock:
+            report, self._report = self._report, None
+        return report
+
+    # Status history
+
+    def maintain_status_history(self, retention_days: int = 90) -> Optional[Dict[str, int]]:
+        # Another console does it while this one is cut off
+        reached, result = self._call("maintain_status_history", retention_days)
+        return result if reached else None
+
+    def get_status_summary(self, start: datetime, end: datetime, classroom: Optional[str] = None,
+                           granularity: str = "day") -> List[Dict[str, Any]]:
+        reached, rows = self._call("get_status_summary", start, end, classroom, granularity)
+        return rows if reached else self._unavailable("db.get_status_summary", [])
+
+    # Optional capabilities
+
+    def create_change_listener(self, on_change: Callable[[Any], None],
+                               on_reconnect: Optional[Callable[[], None]] = None):
+        """The server's change feed, copied into the snapshot; None while offline"""
+        remote = self._remote
+        if remote is None or not self._online:
+            return None
+
+        def handle_change(change: ComputerChange):
+            if change.operation == "DELETE":
+                self.snapshot.remove_computers([change.computer.id])
+            else:
+                self.snapshot.apply_computers([_change_row(change)])
+            on_change(change)
+
+        return remote.create_change_listener(handle_change, on_reconnect)
+
+    def is_connection_error(self, error: Exception) -> bool:
+        return isinstance(error, OfflineError)
+
+    def ping(self) -> bool:
+        return self._online
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        remote = self._remote
+        stats = dict(remote.get_pool_stats()) if remote is not None else {}
+        stats["online"] = int(self._online)
+        stats["pending_writes"] = self.pending_writes
+        return stats
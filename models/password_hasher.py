@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import secrets
+from typing import Optional
+
+
+LEGACY_PBKDF2_ITERATIONS = 100000
+
+
+def legacy_pbkdf2(password: str, salt: str) -> str:
+    """Hash format used before algorithm parameters were stored with the hash"""
+    hash_bytes = hashlib.pbkdf2_hmac(
+        'sha256', password.encode('utf-8'), salt.encode('utf-8'), LEGACY_PBKDF2_ITERATIONS
+    )
+    return hash_bytes.hex()
+
+
+class PasswordHasher:
+    """Self-describing password hashes: algorithm$parameters$salt$hash"""
+
+    ALGORITHMS = ("pbkdf2_sha256", "scrypt")
+
+    def __init__(self, algorithm: str = "pbkdf2_sha256", pbkdf2_iterations: int = 100000,
+                 scrypt_n: int = 2 ** 14, scrypt_r: int = 8, scrypt_p: int = 1):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unsupported password algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r * p + (1 << 20), dklen=64
+        )
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(16)
+        if self.algorithm == "scrypt":
+            digest = self._scrypt(password, salt, self.scrypt_n, self.scrypt_r, self.scrypt_p)
+            return f"scrypt${self.scrypt_n}${self.scrypt_r}${self.scrypt_p}${salt.hex()}${digest.hex()}"
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, self.pbkdf2_iterations)
+        return f"pbkdf2_sha256${self.pbkdf2_iterations}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password: str, encoded: str, legacy_salt: Optional[str] = None) -> bool:
+        """Check a password against an encoded hash (or a legacy hash + salt column)"""
+        parts = encoded.split("$")
+        try:
+            if len(parts) == 1:
+                if legacy_salt is None:
+                    return False
+                expected = legacy_pbkdf2(password, legacy_salt)
+                return hmac.compare_digest(expected, encoded)
+
+            if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+                iterations, salt, digest = int(parts[1]), bytes.fromhex(parts[2]), parts[3]
+                actual = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+                return hmac.compare_digest(actual.hex(), digest)
+
+            if parts[0] == "scrypt" and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                actual = self._scrypt(password, bytes.fromhex(parts[4]), n, r, p)
+                return hmac.compare_digest(actual.hex(), parts[5])
+        except ValueError:
+            return False
+        return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """True when the hash was made with another algorithm or cost than configured"""
+        parts = encoded.split("$")
+        if parts[0] != self.algorithm:
+            return True
+        try:
+            if self.algorithm == "pbkdf2_sha256":
+                return int(parts[1]) != self.pbkdf2_iterations
+            return (int(parts[1]), int(parts[2]), int(parts[3])) != \
+                (self.scrypt_n, self.scrypt_r, self.scrypt_p)
+        except (IndexError, ValueError):
+            return True
@@ -0,0 +1,105 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+from .computer import Computer
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of probing a single computer"""
+    computer_id: Optional[int]
+    ip_address: str
+    reachable: bool
+    latency: Optional[float] = None  # seconds until the host answered
+    error: str = ""
+
+    @property
+    def status(self) -> str:
+        return "online" if self.reachable else "offline"
+
+
+class ReachabilityProber:
+    """Concurrent TCP-connect sweeper for computer IP addresses"""
+
+    def __init__(self, ports: Sequence[int] = (445, 3389, 22), timeout: float = 0.5,
+                 concurrency: int = 500, jitter: float = 0.2, refused_is_up: bool = True):
+        if not ports:
+            raise ValueError("At least one probe port is required")
+        self.ports = tuple(ports)
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.jitter = max(0.0, jitter)
+        self.refused_is_up = refused_is_up
+
+    @property
+    def host_concurrency(self) -> int:
+        """Hosts probed at once; each holds one socket per probe port while checked"""
+        # Never 0, even with more ports than allowed sockets, or nothing is probed
+        return max(1, self.concurrency // len(self.ports))
+
+    async def _connect(self, ip_address: str, port: int) -> None:
+        try:
+            _, writer = await asyncio.open_connection(ip_address, port)
+        except ConnectionRefusedError:
+            # An RST still proves the machine is up; only timeouts and
+            # network errors mark a host unreachable
+            if self.refused_is_up:
+                return
+            raise
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def _probe_ports(self, ip_address: str) -> Tuple[bool, str]:
+        attempts = [asyncio.ensure_future(self._connect(ip_address, port)) for port in self.ports]
+        error = ""
+        try:
+            for attempt in asyncio.as_completed(attempts):
+                try:
+                    await attempt
+                    return True, ""
+                except OSError as e:
+                    error = e.strerror or type(e).__name__
+            return False, error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def probe(self, computer: Computer, limiter: asyncio.Semaphore) -> ProbeResult:
+        if self.jitter:
+            # Spread the connection burst instead of firing every SYN at once
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                reachable, error = await asyncio.wait_for(
+                    self._probe_ports(computer.ip_address), self.timeout
+                )
+            except asyncio.TimeoutError:
+                reachable, error = False, "timeout"
+            latency = time.perf_counter() - started
+
+        return ProbeResult(
+            computer_id=computer.id,
+            ip_address=computer.ip_address,
+            reachable=reachable,
+            latency=latency if reachable else None,
+            error=error
+        )
+
+    async def sweep_async(self, computers: Iterable[Computer]) -> List[ProbeResult]:
+        limiter = asyncio.Semaphore(self.host_concurrency)
+        return await asyncio.gather(*(self.probe(computer, limiter) for computer in computers))
+
+    def sweep(self, computers: Iterable[Computer]) -> List[ProbeResult]:
+        """Blocking entry point; runs its own event loop (call it from a worker thread)"""
+        computers = [computer for computer in computers if computer.ip_address]
+        if not computers:
+            return []
+        return asyncio.run(self.sweep_async(computers))
@@ -0,0 +1,203 @@
+import bisect
+import heapq
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .computer import Computer
+
+
+TOKEN_SEPARATORS = re.compile(r"[^\w]+")
+GRAM = 3
+# Above this share of the fleet, walking the sorted keys finds the first
+# matches sooner than ranking every match
+SCAN_RATIO = 16
+# Exact matches are only looked for among this many matches; a query
+# matching more is not specific enough for them to matter
+EXACT_RANK_LIMIT = 1000
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _prefixes(text: str) -> Set[str]:
+    """Two-character prefixes of the text and of each of its parts"""
+    parts = [part for part in TOKEN_SEPARATORS.split(text) if part] + [text]
+    return {part[:2] for part in parts}
+
+
+class SearchIndex:
+    """Case-insensitive search over computer name, IP address and classroom"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._computers: Dict[int, Computer] = {}
+        self._texts: Dict[int, str] = {}
+        self._sorted: List[tuple] = []  # sort keys of every computer
+        self._grams: Dict[str, Set[int]] = {}
+        self._prefixes: Dict[str, Set[int]] = {}
+        self._classrooms: Dict[str, Set[int]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._computers)
+
+    @staticmethod
+    def _sort_key(computer: Computer) -> tuple:
+        return computer.classroom, computer.name, computer.id
+
+    @staticmethod
+    def _text_fields(computer: Computer) -> Tuple[str, ...]:
+        return tuple(
+            field.casefold() for field in (computer.name, computer.ip_address) if field
+        )
+
+    def rebuild(self, computers: Iterable[Computer]):
+        """Replace the contents; the old index answers queries until the swap"""
+        fresh = SearchIndex()
+        for computer in computers:
+            if computer.id is not None:
+                fresh._add(computer, keep_sorted=False)
+        fresh._sorted.sort()
+        with self._lock:
+            for name in ("_computers", "_texts", "_sorted", "_grams", "_prefixes", "_classrooms"):
+                setattr(self, name, getattr(fresh, name))
+            self.ready = True
+
+    def update(self, computers: Iterable[Computer]):
+        """Add new computers and replace changed ones"""
+        with self._lock:
+            for computer in computers:
+                if computer.id is None:
+                    continue
+                self._remove(computer.id)
+                self._add(computer)
+
+    def remove(self, computer_id: int):
+        with self._lock:
+            self._remove(computer_id)
+
+    def invalidate(self):
+        """Changes were missed; the next rebuild makes the index ready again"""
+        self.ready = False
+
+    def _add(self, computer: Computer, keep_sorted: bool = True):
+        computer_id = computer.id
+        fields = self._text_fields(computer)
+        key = self._sort_key(computer)
+        self._computers[computer_id] = computer
+        self._texts[computer_id] = "\n".join(fields)
+        if keep_sorted:
+            bisect.insort(self._sorted, key)
+        else:
+            self._sorted.append(key)
+        for field in fields:
+            for gram in _grams(field):
+                self._grams.setdefault(gram, set()).add(computer_id)
+            for prefix in _prefixes(field):
+                self._prefixes.setdefault(prefix, set()).add(computer_id)
+        self._classrooms.setdefault(computer.classroom.casefold(), set()).add(computer_id)
+
+    def _remove(self, computer_id: int):
+        computer = self._computers.pop(computer_id, None)
+        if computer is None:
+            return
+        del self._texts[computer_id]
+        del self._sorted[bisect.bisect_left(self._sorted, self._sort_key(computer))]
+        for field in self._text_fields(computer):
+            for gram in _grams(field):
+                self._discard(self._grams, gram, computer_id)
+            for prefix in _prefixes(field):
+                self._discard(self._prefixes, prefix, computer_id)
+        self._discard(self._classrooms, computer.classroom.casefold(), computer_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], key: str, computer_id: int):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(computer_id)
+            if not ids:
+                del postings[key]
+
+    def _match(self, term: str) -> Optional[Set[int]]:
+        """Matching ids, None for all; the result may be an index set and must not be modified"""
+        rooms = [members for classroom, members in self._classrooms.items() if term in classroom]
+        if len(rooms) == len(self._classrooms):
+            # "кабинет" matches every classroom and so every computer
+            return None
+        if len(term) == 1:
+            ids = set().union(*(
+                members for prefix, members in self._prefixes.items() if prefix.startswith(term)
+            ))
+        elif len(term) == 2:
+            ids = self._prefixes.get(term, set())
+        else:
+            ids = self._match_grams(term)
+        return ids.union(*rooms) if rooms else ids
+
+    def _match_grams(self, term: str) -> Set[int]:
+        postings = []
+        for gram in _grams(term):
+            ids = self._grams.get(gram)
+            if ids is None:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        if len(term) == GRAM:
+            return postings[0]
+        # The text check below is exact, so trigrams most computers share
+        # are not worth intersecting ("10." in a 10.x.x.x network)
+        common = len(self._computers) // 2
+        ids = postings[0].intersection(*[p for p in postings[1:] if len(p) <= common])
+        # Having every trigram does not mean having them in a row
+        texts = self._texts
+        return {computer_id for computer_id in ids if term in texts[computer_id]}
+
+    def _first(self, ids: Set[int], limit: int) -> List[int]:
+        """Up to limit ids in (classroom, name, id) order"""
+        if len(ids) * SCAN_RATIO < len(self._sorted):
+            computers = self._computers
+            keys = (self._sort_key(computers[computer_id]) for computer_id in ids)
+            return [key[2] for key in heapq.nsmallest(limit, keys)]
+        found = []
+        for key in self._sorted:
+            if key[2] in ids:
+                found.append(key[2])
+                if len(found) == limit:
+                    break
+        return found
+
+    def search(self, query: str, limit: int = 50) -> Tuple[List[Computer], int]:
+        """Computers matching every whitespace-separated term, and the total count
+
+        A computer whose whole name or IP equals the query comes first, the
+        rest follow in (classroom, name) order.
+        """
+        terms = query.casefold().split()
+        if not terms:
+            return [], 0
+        with self._lock:
+            matches = None
+            for term in sorted(terms, key=len, reverse=True):
+                ids = self._match(term)
+                if ids is None:
+                    continue
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return [], 0
+            if matches is None:
+                matches = set(self._computers)
+
+            exact = set()
+            if len(matches) <= EXACT_RANK_LIMIT:
+                whole = " ".join(terms)
+                texts = self._texts
+                exact = {
+                    computer_id for computer_id in matches
+                    if whole in texts[computer_id].split("\n")
+                }
+            ranked = self._first(exact, limit)
+            if len(ranked) < limit:
+                ranked += self._first(matches - exact if exact else matches, limit - len(ranked))
+            return [self._computers[computer_id] for computer_id in ranked], len(matches)
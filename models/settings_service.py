@@ -1,12 +1,168 @@
-from .database import DatabaseManager
+import logging
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+from .storage import StorageBackend
+from .metrics import record_failure
+
+
+logger = logging.getLogger(__name__)
+
+THEMES = ("light", "dark", "glass")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Snapshot of one user's settings; stored as text and parsed by field type"""
+    theme: str = "light"
+    classroom: str = ""  # last selected classroom, reopened at the next login
+
+    @classmethod
+    def from_values(cls, values: Dict[str, str]) -> "Settings":
+        parsed = {}
+        for field in fields(cls):
+            if field.name not in values:
+                continue
+            try:
+                parsed[field.name] = _parse(field.type, values[field.name])
+            except ValueError:
+                logger.warning("Ignoring invalid setting %s=%r", field.name, values[field.name])
+        settings = cls(**parsed)
+        if settings.theme not in THEMES:
+            settings = replace(settings, theme="light")
+        return settings
+
+    def to_values(self, names) -> Dict[str, str]:
+        return {name: _format(getattr(self, name)) for name in names}
+
+
+def _parse(kind, text: str):
+    if kind is bool:
+        return text in ("1", "true")
+    return kind(text)
+
+
+def _format(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
 
 
 class SettingsService:
-    def __init__(self, db_manager: DatabaseManager):
+    """In-memory settings snapshot with coalescing write-behind"""
+
+    def __init__(self, db_manager: StorageBackend, save_delay: float = 1.0, retry_delay: float = 30.0):
         self.db_manager = db_manager
-    
+        self.save_delay = save_delay
+        self.retry_delay = retry_delay
+        self._settings = Settings()
+        self._username: Optional[str] = None
+        self._pending: Dict[str, Dict[str, str]] = {}  # username -> key -> value
+        self._due = 0.0
+        self._writing = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def settings(self) -> Settings:
+        return self._settings
+
+    def load(self, username: Optional[str]) -> Settings:
+        """Blocking; switches the snapshot to username (None for the defaults only)"""
+        values = self.db_manager.get_user_settings(username) or {}
+        with self._condition:
+            # Changes not written yet are newer than what was just read
+            values = {**values, **self._pending.get(username, {})}
+            self._username = username
+            self._settings = Settings.from_values(values)
+            return self._settings
+
+    def update(self, **changes):
+        """Apply changes to the snapshot now and save them in the background"""
+        with self._condition:
+            self._settings = replace(self._settings, **changes)
+            if self._username is None:
+                return
+            self._pending.setdefault(self._username, {}).update(self._settings.to_values(changes))
+            self._due = time.monotonic() + self.save_delay
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="settings-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self) -> bool:
+        """Write pending changes now, blocking; False if some could not be saved"""
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            return self._write_pending() if self._pending else True
+
+    def close(self):
+        """Flush and stop the writer; for application shutdown"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if not self.flush():
+            logger.warning("Settings could not be saved before exit")
+
+    def _run(self):
+        # Writes once no change has come for save_delay seconds, so a burst is one write
+        with self._condition:
+            while not self._closed:
+                if not self._pending or self._writing:
+                    self._condition.wait()
+                    continue
+                delay = self._due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                self._write_pending()
+
+    def _write_pending(self) -> bool:
+        """Called with the condition held; released while the database is written"""
+        pending, self._pending = self._pending, {}
+        self._writing = True
+        self._condition.release()
+        failed = {}
+        try:
+            for username, values in pending.items():
+                try:
+                    saved = self.db_manager.save_user_settings(username, values)
+                except Exception as e:
+                    record_failure("service.save_settings", e)
+                    saved = False
+                if not saved:
+                    failed[username] = values
+        finally:
+            self._condition.acquire()
+            self._writing = False
+            for username, values in failed.items():
+                self._pending[username] = {**values, **self._pending.get(username, {})}
+            if failed:
+                self._due = time.monotonic() + self.retry_delay
+            self._condition.notify_all()
+        return not failed
+
     def get_theme(self) -> str:
-        return self.db_manager.get_theme()
-    
+        return self._settings.theme
+
     def set_theme(self, theme: str) -> bool:
-        return self.db_manager.set_theme(theme)
\ No newline at end of file
+        if theme not in THEMES:
+            theme = "light"
+        self.update(theme=theme)
+        return True
+
+    def get_slow_query_logging(self) -> Optional[dict]:
+        """{"enabled", "threshold"} or None when the storage backend has no slow query log"""
+        log = self.db_manager.slow_query_log
+        if log is None:
+            return None
+        return {"enabled": log.enabled, "threshold": log.threshold}
+
+    def set_slow_query_logging(self, enabled: bool, threshold: Optional[float] = None) -> bool:
+        return self.db_manager.configure_slow_query_log(enabled, threshold)
@@ -0,0 +1,162 @@
+import logging
+import logging.handlers
+import re
+import threading
+import time
+from typing import Any, Optional
+
+import psycopg2
+from psycopg2 import extensions
+
+from .metrics import REGISTRY
+
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_CHARS = 2000
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|INSERT|DELETE)\b", re.IGNORECASE)
+READ_ONLY = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+def params_shape(params: Any) -> str:
+    """Types and sizes of the bound parameters, never their values"""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {_value_shape(value)}" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        return "(" + ", ".join(_value_shape(value) for value in params) + ")"
+    return _value_shape(params)
+
+
+def _value_shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        kinds = {type(item).__name__ for item in value}
+        kind = kinds.pop() if len(kinds) == 1 else ("mixed" if kinds else "empty")
+        return f"list[{kind} x {len(value)}]"
+    return type(value).__name__
+
+
+class SlowQueryLog:
+    """Writes statements slower than a threshold, with their plans, to a rotating file"""
+
+    def __init__(self, path: str = "slow_queries.log", threshold: float = 0.2,
+                 enabled: bool = False, capture_plans: bool = True,
+                 max_bytes: int = 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.threshold = threshold
+        self.capture_plans = capture_plans
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._enabled = False
+        self._file_logger: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+        self.set_enabled(enabled)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def set_enabled(self, enabled: bool, threshold: Optional[float] = None):
+        """Runtime switch; the log file is only opened the first time it is enabled"""
+        with self._lock:
+            if threshold is not None:
+                self.threshold = threshold
+            if enabled and self._file_logger is None:
+                self._file_logger = self._open_file_logger()
+            self._enabled = enabled
+        logger.info("Slow query log %s (threshold %.0f ms, %s)",
+                    "enabled" if enabled else "disabled", self.threshold * 1000, self.path)
+
+    def _open_file_logger(self) -> logging.Logger:
+        file_logger = logging.getLogger(f"{__name__}.file")
+        file_logger.propagate = False
+        file_logger.setLevel(logging.INFO)
+        for handler in list(file_logger.handlers):
+            file_logger.removeHandler(handler)
+            handler.close()
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        file_logger.addHandler(handler)
+        return file_logger
+
+    def record(self, cursor, query, params: Any, duration: float):
+        """Called by SlowQueryCursor for a statement over the threshold"""
+        REGISTRY.inc("pc_slow_queries_total")
+        statement = query.decode("utf-8", "replace") if isinstance(query, bytes) else str(query)
+        statement = " ".join(statement.split())
+        if len(statement) > MAX_STATEMENT_CHARS:
+            statement = statement[:MAX_STATEMENT_CHARS] + " ..."
+
+        plan = self._capture_plan(cursor) if self.capture_plans else "(plan capture disabled)"
+        file_logger = self._file_logger
+        if file_logger is None:
+            return
+        file_logger.info(
+            "slow query: %.1f ms (threshold %.0f ms), rows %s\n"
+            "  statement: %s\n"
+            "  params: %s\n"
+            "  plan:\n%s\n",
+            duration * 1000, self.threshold * 1000, cursor.rowcount,
+            statement, params_shape(params),
+            "\n".join("    " + line for line in plan.splitlines())
+        )
+
+    @staticmethod
+    def _capture_plan(cursor) -> str:
+        executed = cursor.query
+        if executed is None:
+            return "(no statement)"
+        executed = executed.decode("utf-8", "replace") if isinstance(executed, bytes) else executed
+        if not EXPLAINABLE.match(executed):
+            return "(statement cannot be explained)"
+
+        conn = cursor.connection
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+            return "(transaction aborted)"
+        # Without a transaction to roll back, only reads may be re-executed
+        in_savepoint = not conn.autocommit
+        analyze = in_savepoint or bool(READ_ONLY.match(executed))
+        options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+
+        # A plain cursor: the EXPLAIN itself must not be logged as slow
+        explain = extensions.cursor(conn)
+        try:
+            if in_savepoint:
+                explain.execute("SAVEPOINT slow_query_plan")
+            try:
+                explain.execute(f"EXPLAIN ({options}) {executed}")
+                plan = "\n".join(row[0] for row in explain.fetchall())
+            finally:
+                if in_savepoint:
+                    explain.execute("ROLLBACK TO SAVEPOINT slow_query_plan")
+                    explain.execute("RELEASE SAVEPOINT slow_query_plan")
+            return plan
+        except psycopg2.Error as e:
+            return f"(plan unavailable: {e})"
+        finally:
+            explain.close()
+
+
+class SlowQueryCursor(extensions.cursor):
+    """Cursor that reports statements slower than the log's threshold"""
+
+    slow_query_log: Optional[SlowQueryLog] = None
+
+    def execute(self, query, vars=None):
+        log = self.slow_query_log
+        if log is None or not log.enabled:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        duration = time.perf_counter() - started
+        if duration >= log.threshold:
+            try:
+                log.record(self, query, vars, duration)
+            except Exception:
+                logger.exception("Slow query logging failed")
+        return result
@@ -0,0 +1,767 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .migrations import Migration
+from .password_hasher import PasswordHasher
+from .metrics import instrumented
+from .storage import PageKey, StorageBackend, as_date
+
+
+logger = logging.getLogger(__name__)
+
+
+def _initial_schema(cur, storage):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt TEXT,
+            role TEXT NOT NULL CHECK (role IN ('teacher', 'admin'))
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            theme TEXT NOT NULL DEFAULT 'light'
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS computers (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            ip_address TEXT NOT NULL,
+            classroom TEXT NOT NULL,
+            status TEXT DEFAULT 'online',
+            mac_address TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_computers_classroom_name
+        ON computers (classroom, name)
+    """)
+    cur.execute("INSERT OR IGNORE INTO settings (id, theme) VALUES (1, 'light')")
+
+    for username, password, role in (("teacher", "123456", "teacher"), ("admin", "admin123", "admin")):
+        cur.execute("SELECT 1 FROM users WHERE username = ?", (username,))
+        if cur.fetchone() is None:
+            cur.execute(
+                "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                (username, storage.password_hasher.hash(password), role)
+            )
+
+    cur.execute("""
+        INSERT INTO computers (name, ip_address, classroom)
+        SELECT column1, column2, column3
+        FROM (VALUES
+            ('ПК-01', '192.168.1.101', 'Cab 201'),
+            ('ПК-02', '192.168.1.102', 'Cab 201'),
+            ('ПК-03', '192.168.1.103', 'Cab 201'),
+            ('ПК-11', '192.168.1.111', 'Cab 202'),
+            ('ПК-12', '192.168.1.112', 'Cab 202')
+        )
+        WHERE NOT EXISTS (SELECT 1 FROM computers)
+    """)
+
+
+def _index_computer_name(cur, storage):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_computers_name ON computers (name)")
+
+
+# Times are Unix seconds; julianday keeps the milliseconds that strftime('%s') drops
+NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def _status_history(cur, storage):
+    # SQLite triggers are per row, but they run inside the statement's
+    # transaction, so a bulk update still commits its events at once.
+    # A NULL status marks a deleted computer.
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS computer_status_events (
+            id INTEGER PRIMARY KEY,
+            computer_id INTEGER NOT NULL,
+            classroom TEXT NOT NULL,
+            old_status TEXT,
+            status TEXT,
+            occurred_at REAL NOT NULL DEFAULT {NOW}
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_status_events_time
+        ON computer_status_events (occurred_at, computer_id)
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS computers_status_insert AFTER INSERT ON computers
+        BEGIN
+            INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+            VALUES (NEW.id, NEW.classroom, NULL, NEW.status);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS computers_status_update AFTER UPDATE OF status ON computers
+        WHEN NEW.status IS NOT OLD.status
+        BEGIN
+            INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+            VALUES (NEW.id, NEW.classroom, OLD.status, NEW.status);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS computers_status_delete AFTER DELETE ON computers
+        BEGIN
+            INSERT INTO computer_status_events (computer_id, classroom, old_status, status)
+            VALUES (OLD.id, OLD.classroom, OLD.status, NULL);
+        END
+    """)
+    # hour is the Unix time of the hour's start, day an ISO date (UTC)
+    for table, period in (("computer_status_hourly", "hour INTEGER"),
+                          ("computer_status_daily", "day TEXT")):
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                classroom TEXT NOT NULL,
+                {period} NOT NULL,
+                online_seconds REAL NOT NULL DEFAULT 0,
+                offline_seconds REAL NOT NULL DEFAULT 0,
+                maintenance_seconds REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (classroom, {period.split()[0]})
+            )
+        """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS status_rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rolled_until REAL
+        )
+    """)
+    cur.execute(f"""
+        INSERT OR IGNORE INTO status_rollup_state (id, rolled_until)
+        VALUES (1, CAST({NOW} / 3600 AS INTEGER) * 3600)
+    """)
+
+
+def _user_settings(cur, storage):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_settings (
+            username TEXT NOT NULL REFERENCES users (username) ON DELETE CASCADE,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (username, key)
+        )
+    """)
+
+
+# Same approach as the PostgreSQL rollup: the status at :lo comes from a
+# computer's first later event or its current status, every event starts
+# a span, and spans are cut at hour boundaries by a recursive CTE
+ROLLUP_HOURS_SQL = """
+    WITH RECURSIVE events AS (
+        SELECT id, computer_id, classroom, old_status, status, occurred_at
+        FROM computer_status_events
+        WHERE occurred_at >= :lo
+    ),
+    first_events AS (
+        SELECT computer_id, classroom, old_status
+        FROM (
+            SELECT computer_id, classroom, old_status,
+                   row_number() OVER (PARTITION BY computer_id ORDER BY occurred_at, id) AS n
+            FROM events
+        )
+        WHERE n = 1
+    ),
+    starts AS (
+        SELECT c.id AS computer_id, c.classroom AS classroom,
+               CASE WHEN f.computer_id IS NULL THEN c.status ELSE f.old_status END AS status
+        FROM computers c
+        LEFT JOIN first_events f ON f.computer_id = c.id
+        UNION ALL
+        SELECT f.computer_id, f.classroom, f.old_status
+        FROM first_events f
+        WHERE NOT EXISTS (SELECT 1 FROM computers c WHERE c.id = f.computer_id)
+    ),
+    changes AS (
+        SELECT computer_id, classroom, :lo AS since, 0 AS seq, status
+        FROM starts
+        UNION ALL
+        SELECT computer_id, classroom, occurred_at, id, status
+        FROM events
+        WHERE occurred_at < :hi
+    ),
+    spans AS (
+        SELECT classroom, status, since,
+               lead(since, 1, :hi) OVER (PARTITION BY computer_id ORDER BY since, seq) AS until
+        FROM changes
+    ),
+    pieces (classroom, status, hour, since, until) AS (
+        SELECT classroom, status, CAST(since / 3600 AS INTEGER) * 3600, since, until
+        FROM spans
+        WHERE status IS NOT NULL AND until > since
+        UNION ALL
+        SELECT classroom, status, hour + 3600, since, until
+        FROM pieces
+        WHERE hour + 3600 < until
+    )
+    INSERT INTO computer_status_hourly
+        (classroom, hour, online_seconds, offline_seconds, maintenance_seconds)
+    SELECT classroom, hour,
+           total(CASE WHEN status = 'online' THEN min(until, hour + 3600) - max(since, hour) END),
+           total(CASE WHEN status = 'offline' THEN min(until, hour + 3600) - max(since, hour) END),
+           total(CASE WHEN status = 'maintenance' THEN min(until, hour + 3600) - max(since, hour) END)
+    FROM pieces
+    WHERE true
+    GROUP BY classroom, hour
+    ON CONFLICT (classroom, hour) DO UPDATE SET
+        online_seconds = excluded.online_seconds,
+        offline_seconds = excluded.offline_seconds,
+        maintenance_seconds = excluded.maintenance_seconds
+"""
+
+ROLLUP_DAYS_SQL = """
+    INSERT INTO computer_status_daily
+        (classroom, day, online_seconds, offline_seconds, maintenance_seconds)
+    SELECT classroom, date(hour, 'unixepoch'),
+           total(online_seconds), total(offline_seconds), total(maintenance_seconds)
+    FROM computer_status_hourly
+    WHERE hour >= CAST(:lo / 86400 AS INTEGER) * 86400 AND hour < :hi
+    GROUP BY classroom, date(hour, 'unixepoch')
+    ON CONFLICT (classroom, day) DO UPDATE SET
+        online_seconds = excluded.online_seconds,
+        offline_seconds = excluded.offline_seconds,
+        maintenance_seconds = excluded.maintenance_seconds
+"""
+
+
+# Versions are tracked in PRAGMA user_version
+SQLITE_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема: пользователи, настройки, компьютеры", _initial_schema),
+    Migration(2, "Индекс по имени компьютера", _index_computer_name),
+    Migration(3, "История статусов компьютеров и сводки доступности", _status_history),
+    Migration(4, "Персональные настройки пользователей", _user_settings),
+]
+
+
+class SQLiteStorage(StorageBackend):
+    """Embedded single-file storage in WAL mode; one connection per thread"""
+
+    COMPUTER_COLUMNS = "id, name, ip_address, classroom, status, mac_address"
+    MIGRATIONS = SQLITE_MIGRATIONS
+
+    def __init__(self, path: str = "pc_manager.db", busy_timeout: float = 5.0,
+                 password_hasher: Optional[PasswordHasher] = None):
+        super().__init__(password_hasher)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: writes open their own BEGIN IMMEDIATE transactions
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Durable on checkpoint, which is enough for a console's local data
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self.get_connection()
+        # Take the write lock up front so read-then-write never fails halfway
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        with self._connections_lock:
+            return {"connections": len(self._connections)}
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def init_database(self):
+        timings = {}
+        started = time.perf_counter()
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self.get_connection()
+            timings["connect"] = time.perf_counter() - started
+
+            checked = time.perf_counter()
+            current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            timings["schema_check"] = time.perf_counter() - checked
+
+            applied = []
+            if current_version < self.MIGRATIONS[-1].version:
+                migrated = time.perf_counter()
+                with self._transaction() as cur:
+                    # Another console may have migrated while we waited for the lock
+                    version = cur.execute("PRAGMA user_version").fetchone()[0]
+                    for migration in self.MIGRATIONS:
+                        if migration.version <= version:
+                            continue
+                        migration.apply(cur, self)
+                        applied.append(migration.version)
+                    if applied:
+                        cur.execute(f"PRAGMA user_version = {applied[-1]}")
+                timings["migrations"] = time.perf_counter() - migrated
+        except (sqlite3.Error, OSError) as e:
+            raise Exception(f"Database initialization error: {e}")
+
+        timings["total"] = time.perf_counter() - started
+        self.startup_timings = timings
+        logger.info(
+            "SQLite startup (%s): %s; schema v%d%s",
+            self.path,
+            ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()),
+            max([current_version] + applied),
+            f" (applied {applied})" if applied else ""
+        )
+
+    @instrumented("db.get_credentials")
+    def _get_credentials(self, username: str) -> Optional[Tuple[str, Optional[str], str]]:
+        try:
+            return self.get_connection().execute(
+                "SELECT password_hash, salt, role FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_credentials", e)
+            return None
+
+    @instrumented("db.replace_password_hash")
+    def _replace_password_hash(self, username: str, old_hash: str, new_hash: str):
+        try:
+            with self._transaction() as cur:
+                cur.execute("""
+                    UPDATE users SET password_hash = ?, salt = NULL
+                    WHERE username = ? AND password_hash = ?
+                """, (new_hash, username, old_hash))
+        except sqlite3.Error as e:
+            self._record_failure("db.replace_password_hash", e)
+
+    @instrumented("db.get_theme")
+    def get_theme(self) -> str:
+        try:
+            row = self.get_connection().execute("SELECT theme FROM settings WHERE id = 1").fetchone()
+            return row[0] if row else "light"
+        except sqlite3.Error as e:
+            self._record_failure("db.get_theme", e)
+            return "light"
+
+    @instrumented("db.set_theme")
+    def set_theme(self, theme: str) -> bool:
+        if theme not in ["light", "dark", "glass"]:
+            theme = "light"
+        try:
+            with self._transaction() as cur:
+                cur.execute("UPDATE settings SET theme = ? WHERE id = 1", (theme,))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("db.set_theme", e)
+            return False
+
+    @instrumented("db.get_user_settings")
+    def get_user_settings(self, username: Optional[str]) -> Optional[Dict[str, str]]:
+        try:
+            rows = self.get_connection().execute("""
+                SELECT 0, 'theme', theme FROM settings WHERE id = 1
+                UNION ALL
+                SELECT 1, key, value FROM user_settings WHERE username = ?
+                ORDER BY 1
+            """, (username,)).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_user_settings", e)
+            return None
+        return {key: value for _, key, value in rows}
+
+    @instrumented("db.save_user_settings")
+    def save_user_settings(self, username: str, values: Dict[str, str]) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.executemany("""
+                    INSERT INTO user_settings (username, key, value) VALUES (?, ?, ?)
+                    ON CONFLICT (username, key) DO UPDATE SET
+                        value = excluded.value,
+                        updated_at = CURRENT_TIMESTAMP
+                """, [(username, key, value) for key, value in values.items()])
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("db.save_user_settings", e)
+            return False
+
+    @instrumented("db.get_all_computers")
+    def get_all_computers(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            rows = self.get_connection().execute(f"""
+                SELECT {self.COMPUTER_COLUMNS}
+                FROM computers
+                ORDER BY classroom, name
+            """).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_all_computers", e)
+            return {}
+        computers = {}
+        for row in rows:
+            data = self._computer_row_to_dict(row)
+            computers.setdefault(data["classroom"], []).append(data)
+        return computers
+
+    @instrumented("db.get_computers_page")
+    def get_computers_page(self, after: Optional[PageKey] = None, limit: int = 500,
+                           classroom: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        conditions, params = [], []
+        if classroom is not None:
+            conditions.append("classroom = ?")
+            params.append(classroom)
+        if after is not None:
+            # idx_computers_classroom_name ends in the rowid, which is id,
+            # so it already covers the whole (classroom, name, id) key
+            conditions.append("(classroom, name, id) > (?, ?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            rows = self.get_connection().execute(f"""
+                SELECT {self.COMPUTER_COLUMNS}
+                FROM computers
+                {where}
+                ORDER BY classroom, name, id
+                LIMIT ?
+            """, params + [limit]).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_computers_page", e)
+            return None
+        return [self._computer_row_to_dict(row) for row in rows]
+
+    @instrumented("db.get_computers_by_classroom")
+    def get_computers_by_classroom(self, classroom: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            rows = self.get_connection().execute(f"""
+                SELECT {self.COMPUTER_COLUMNS}
+                FROM computers
+                WHERE classroom = ?
+                ORDER BY name
+            """, (classroom,)).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_computers_by_classroom", e)
+            return None
+        return [self._computer_row_to_dict(row) for row in rows]
+
+    @instrumented("db.get_classrooms")
+    def get_classrooms(self) -> Optional[List[str]]:
+        try:
+            # Answered from idx_computers_classroom_name without touching the table
+            rows = self.get_connection().execute(
+                "SELECT DISTINCT classroom FROM computers ORDER BY classroom"
+            ).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_classrooms", e)
+            return None
+        return [row[0] for row in rows]
+
+    @instrumented("db.add_computer")
+    def add_computer(self, name: str, ip_address: str, classroom: str,
+                     mac_address: Optional[str] = None) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.execute("""
+                    INSERT INTO computers (name, ip_address, classroom, mac_address)
+                    VALUES (?, ?, ?, ?)
+                """, (name, ip_address, classroom, mac_address or None))
+            return True
+        except sqlite3.Error as e:
+            self._record_failure("db.add_computer", e)
+            return False
+
+    @instrumented("db.update_computer_status")
+    def update_computer_status(self, name: str, status: str) -> bool:
+        try:
+            with self._transaction() as cur:
+                cur.execute("UPDATE computers SET status = ? WHERE name = ?", (status, name))
+                return cur.rowcount > 0
+        except sqlite3.Error as e:
+            self._record_failure("db.update_computer_status", e)
+            return False
+
+    @instrumented("db.update_computer_status_by_id")
+    def update_computer_status_by_id(self, computer_id: int, status: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._transaction() as cur:
+                row = cur.execute(f"""
+                    UPDATE computers
+                    SET status = ?
+                    WHERE id = ?
+                    RETURNING {self.COMPUTER_COLUMNS}
+                """, (status, computer_id)).fetchone()
+        except sqlite3.Error as e:
+            self._record_failure("db.update_computer_status_by_id", e)
+            return None
+        return self._computer_row_to_dict(row) if row else None
+
+    @instrumented("db.update_status_bulk")
+    def update_status_bulk(self, status: str, computer_ids: Optional[List[int]] = None,
+                           classroom: Optional[str] = None,
+                           current_status: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        conditions = []
+        params: List[Any] = [status]
+        if computer_ids is not None:
+            # One JSON parameter instead of a placeholder per id (SQLite caps those)
+            conditions.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(computer_ids)))
+        if classroom is not None:
+            conditions.append("classroom = ?")
+            params.append(classroom)
+        if current_status is not None:
+            conditions.append("status = ?")
+            params.append(current_status)
+        if not conditions:
+            return []
+        conditions.append("status IS NOT ?")
+        params.append(status)
+
+        try:
+            with self._transaction() as cur:
+                rows = cur.execute(f"""
+                    UPDATE computers
+                    SET status = ?
+                    WHERE {' AND '.join(conditions)}
+                    RETURNING {self.COMPUTER_COLUMNS}
+                """, params).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.update_status_bulk", e)
+            return None
+        return [self._computer_row_to_dict(row) for row in rows]
+
+    @instrumented("db.update_statuses")
+    def update_statuses(self, statuses: Dict[int, str]) -> List[Dict[str, Any]]:
+        if not statuses:
+            return []
+        try:
+            with self._transaction() as cur:
+                rows = cur.execute(f"""
+                    UPDATE computers
+                    SET status = v.value
+                    FROM json_each(?) AS v
+                    WHERE computers.id = CAST(v.key AS INTEGER)
+                      AND computers.status IS NOT v.value
+                      AND computers.status <> 'maintenance'
+                    RETURNING {self.COMPUTER_COLUMNS}
+                """, (json.dumps(statuses),)).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.update_statuses", e)
+            return []
+        return [self._computer_row_to_dict(row) for row in rows]
+
+    @instrumented("db.replay_actions")
+    def replay_actions(self, status_changes: List[Dict[str, Any]],
+                       additions: List[Dict[str, Any]]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        added, updated, current = [], [], {}
+        try:
+            with self._transaction() as cur:
+                for item in additions:
+                    row = cur.execute(f"""
+                        INSERT INTO computers (name, ip_address, classroom, mac_address, status)
+                        SELECT ?, ?, ?, ?, COALESCE(?, 'online')
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM computers WHERE classroom = ? AND name = ?
+                        )
+                        RETURNING {self.COMPUTER_COLUMNS}
+                    """, (item["name"], item["ip"], item["classroom"], item.get("mac") or None,
+                          item.get("status"), item["classroom"], item["name"])).fetchone()
+                    if row is not None:
+                        added.append(row)
+                if status_changes:
+                    # Compare-and-set: a row someone else changed meanwhile keeps their status
+                    updated = cur.execute(f"""
+                        UPDATE computers
+                        SET status = v.status
+                        FROM (
+                            SELECT json_extract(value, '$.id') AS id,
+                                   json_extract(value, '$.expected') AS expected,
+                                   json_extract(value, '$.status') AS status
+                            FROM json_each(?)
+                        ) AS v
+                        WHERE computers.id = v.id
+                          AND (computers.status IS v.expected OR computers.status = v.status)
+                        RETURNING {self.COMPUTER_COLUMNS}
+                    """, (json.dumps(status_changes),)).fetchall()
+                    updated_ids = {row[0] for row in updated}
+                    missed = [change["id"] for change in status_changes if change["id"] not in updated_ids]
+                    if missed:
+                        current = dict(cur.execute(
+                            "SELECT id, status FROM computers WHERE id IN (SELECT value FROM json_each(?))",
+                            (json.dumps(missed),)
+                        ).fetchall())
+        except sqlite3.Error as e:
+            self._record_failure("db.replay_actions", e)
+            return None
+        return self._replay_report(
+            status_changes, additions,
+            [self._computer_row_to_dict(row) for row in updated],
+            [self._computer_row_to_dict(row) for row in added],
+            current
+        )
+
+    @instrumented("db.import_computers")
+    def import_computers(self, computers: Iterable[Dict[str, Any]],
+                         dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        # The last occurrence of a (classroom, name) pair in the file wins
+        staged = {}
+        for data in computers:
+            staged[(data["classroom"], data["name"])] = (
+                data["name"], data["ip_address"], data["classroom"], data["status"],
+                data.get("mac_address") or None
+            )
+
+        try:
+            with self._transaction() as cur:
+                cur.execute("DROP TABLE IF EXISTS temp.computers_import")
+                cur.execute("""
+                    CREATE TEMP TABLE computers_import (
+                        name TEXT NOT NULL,
+                        ip_address TEXT NOT NULL,
+                        classroom TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        mac_address TEXT,
+                        PRIMARY KEY (classroom, name)
+                    )
+                """)
+                cur.executemany(
+                    "INSERT INTO computers_import VALUES (?, ?, ?, ?, ?)", staged.values()
+                )
+
+                cur.execute("""
+                    SELECT s.classroom, s.name,
+                           CASE
+                               WHEN NOT EXISTS (
+                                   SELECT 1 FROM computers c
+                                   WHERE c.classroom = s.classroom AND c.name = s.name
+                               ) THEN 'added'
+                               WHEN EXISTS (
+                                   SELECT 1 FROM computers c
+                                   WHERE c.classroom = s.classroom AND c.name = s.name
+                                     AND (c.ip_address <> s.ip_address
+                                          OR (s.mac_address IS NOT NULL
+                                              AND c.mac_address IS NOT s.mac_address))
+                               ) THEN 'updated'
+                               ELSE 'unchanged'
+                           END
+                    FROM computers_import s
+                    ORDER BY s.classroom, s.name
+                """)
+                report = {"added": [], "updated": [], "unchanged": 0}
+                for classroom, name, change in cur.fetchall():
+                    if change == "unchanged":
+                        report["unchanged"] += 1
+                    else:
+                        report[change].append((classroom, name))
+
+                if not dry_run:
+                    cur.execute("""
+                        UPDATE computers
+                        SET ip_address = s.ip_address,
+                            mac_address = COALESCE(s.mac_address, computers.mac_address)
+                        FROM computers_import s
+                        WHERE computers.classroom = s.classroom AND computers.name = s.name
+                          AND (computers.ip_address <> s.ip_address
+                               OR (s.mac_address IS NOT NULL
+                                   AND computers.mac_address IS NOT s.mac_address))
+                    """)
+                    cur.execute("""
+                        INSERT INTO computers (name, ip_address, classroom, status, mac_address)
+                        SELECT s.name, s.ip_address, s.classroom, s.status, s.mac_address
+                        FROM computers_import s
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM computers c
+                            WHERE c.classroom = s.classroom AND c.name = s.name
+                        )
+                    """)
+                cur.execute("DROP TABLE temp.computers_import")
+            return report
+        except sqlite3.Error as e:
+            self._record_failure("db.import_computers", e)
+            return None
+
+    @instrumented("db.maintain_status_history")
+    def maintain_status_history(self, retention_days: int = 90) -> Optional[Dict[str, int]]:
+        try:
+            with self._transaction() as cur:
+                lo, hi = cur.execute(f"""
+                    SELECT rolled_until, CAST({NOW} / 3600 AS INTEGER) * 3600
+                    FROM status_rollup_state
+                    WHERE id = 1
+                """).fetchone()
+                hours = 0
+                if hi > lo:
+                    bounds = {"lo": lo, "hi": hi}
+                    cur.execute(ROLLUP_HOURS_SQL, bounds)
+                    cur.execute(ROLLUP_DAYS_SQL, bounds)
+                    cur.execute("UPDATE status_rollup_state SET rolled_until = ? WHERE id = 1", (hi,))
+                    hours = int((hi - lo) // 3600)
+                # Events not rolled up yet are kept whatever their age
+                cur.execute(f"""
+                    DELETE FROM computer_status_events
+                    WHERE occurred_at < min({NOW} - ? * 86400, ?)
+                """, (retention_days, max(lo, hi)))
+                return {"hours": hours, "events_deleted": cur.rowcount}
+        except sqlite3.Error as e:
+            self._record_failure("db.maintain_status_history", e)
+            return None
+
+    @instrumented("db.get_status_summary")
+    def get_status_summary(self, start: datetime, end: datetime, classroom: Optional[str] = None,
+                           granularity: str = "day") -> List[Dict[str, Any]]:
+        if granularity == "day":
+            table, period = "computer_status_daily", "day"
+            params = [as_date(start).isoformat(), as_date(end).isoformat()]
+        else:
+            table, period = "computer_status_hourly", "hour"
+            params = [start.timestamp(), end.timestamp()]
+        conditions = [f"{period} >= ?", f"{period} < ?"]
+        if classroom is not None:
+            conditions.append("classroom = ?")
+            params.append(classroom)
+        try:
+            rows = self.get_connection().execute(f"""
+                SELECT classroom, {period}, online_seconds, offline_seconds, maintenance_seconds
+                FROM {table}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY classroom, {period}
+            """, params).fetchall()
+        except sqlite3.Error as e:
+            self._record_failure("db.get_status_summary", e)
+            return []
+        to_period = (
+            date.fromisoformat if granularity == "day"
+            else lambda hour: datetime.fromtimestamp(hour, timezone.utc)
+        )
+        return [
+            {"classroom": row[0], "period": to_period(row[1]), "online": row[2],
+             "offline": row[3], "maintenance": row[4]}
+            for row in rows
+        ]
@@ -0,0 +1,42 @@
+import logging
+import threading
+from typing import Optional
+
+from .storage import StorageBackend
+
+
+logger = logging.getLogger(__name__)
+
+
+class StatusHistoryMaintainer:
+    """Periodically rolls status events up into summaries and applies retention"""
+
+    def __init__(self, storage: StorageBackend, interval: float = 300.0, retention_days: int = 90):
+        self.storage = storage
+        self.interval = interval
+        self.retention_days = retention_days
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="status-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def maintain(self):
+        result = self.storage.maintain_status_history(self.retention_days)
+        if result:
+            logger.info("Status history maintenance: %s", result)
+
+    def _run(self):
+        # The first run catches up on whatever accumulated while no instance was running
+        self.maintain()
+        while not self._stop.wait(self.interval):
+            self.maintain()
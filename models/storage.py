@@ -0,0 +1,275 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metrics import instrumented, record_failure
+from .password_hasher import PasswordHasher
+
+if TYPE_CHECKING:
+    # Loads psycopg2; SQLite-only processes never need it
+    from .slow_query_log import SlowQueryLog
+
+
+# Position in the (classroom, name, id) order that a page continues after
+PageKey = Tuple[str, str, int]
+
+
+def page_key(row: Dict[str, Any]) -> PageKey:
+    return row["classroom"], row["name"], row["id"]
+
+
+def as_date(value) -> date:
+    """Daily summaries are keyed by date; datetimes are truncated"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+class StorageBackend(ABC):
+    """Persistence used by the services; implemented for PostgreSQL and SQLite"""
+
+    def __init__(self, password_hasher: Optional[PasswordHasher] = None):
+        self.password_hasher = password_hasher or PasswordHasher()
+        self.startup_timings: Dict[str, float] = {}
+        self.slow_query_log: Optional["SlowQueryLog"] = None
+        # Also told about every swallowed error, on the failing call's thread
+        self.failure_listener: Optional[Callable[[str, Exception], None]] = None
+
+    def _record_failure(self, operation: str, error: Exception):
+        """Log and count a swallowed driver error; the caller returns an empty or None result"""
+        record_failure(operation, error)
+        if self.failure_listener is not None:
+            self.failure_listener(operation, error)
+
+    # Users
+
+    @abstractmethod
+    def _get_credentials(self, username: str) -> Optional[Tuple[str, Optional[str], str]]:
+        """(password_hash, legacy salt, role) or None when unknown or unreachable"""
+
+    @abstractmethod
+    def _replace_password_hash(self, username: str, old_hash: str, new_hash: str):
+        """Store new_hash only if the row still holds old_hash"""
+
+    @instrumented("auth.verify_user")
+    def verify_user(self, username: str, password: str) -> Tuple[bool, Optional[str]]:
+        credentials = self._get_credentials(username)
+        if not credentials:
+            return False, None
+
+        # The expensive hash runs without holding a connection
+        stored_hash, salt, role = credentials
+        if not self.password_hasher.verify(password, stored_hash, legacy_salt=salt):
+            return False, None
+
+        if self.password_hasher.needs_rehash(stored_hash):
+            self._replace_password_hash(username, stored_hash, self.password_hasher.hash(password))
+        return True, role
+
+    # Settings
+
+    @abstractmethod
+    def get_theme(self) -> str:
+        pass
+
+    @abstractmethod
+    def set_theme(self, theme: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_user_settings(self, username: Optional[str]) -> Optional[Dict[str, str]]:
+        """Global defaults overlaid with the user's own values; None on failure"""
+
+    @abstractmethod
+    def save_user_settings(self, username: str, values: Dict[str, str]) -> bool:
+        """Upsert the given keys for the user in one statement"""
+
+    # Computers
+
+    @abstractmethod
+    def get_all_computers(self) -> Dict[str, List[Dict[str, Any]]]:
+        pass
+
+    @abstractmethod
+    def get_computers_page(self, after: Optional[PageKey] = None, limit: int = 500,
+                           classroom: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Up to `limit` rows ordered by (classroom, name, id), strictly after `after`
+
+        Keyset pagination: the cost of a page does not grow with its
+        position, and rows added or removed meanwhile never shift a page.
+        None on failure, so it is not taken for the end of the list.
+        """
+
+    def iter_all_computers(self, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """Every computer in (classroom, name, id) order, holding one batch in memory
+
+        A failure is logged like any other and ends the stream early.
+        """
+        after = None
+        while True:
+            rows = self.get_computers_page(after, batch_size)
+            if rows is None:
+                return
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = page_key(rows[-1])
+
+    @abstractmethod
+    def get_computers_by_classroom(self, classroom: str) -> Optional[List[Dict[str, Any]]]:
+        """The classroom's rows ordered by name; None on failure, so it is not cached as empty"""
+
+    @abstractmethod
+    def get_classrooms(self) -> Optional[List[str]]:
+        """None on failure, so it is not cached as empty"""
+
+    @abstractmethod
+    def add_computer(self, name: str, ip_address: str, classroom: str,
+                     mac_address: Optional[str] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def update_computer_status(self, name: str, status: str) -> bool:
+        pass
+
+    @abstractmethod
+    def update_computer_status_by_id(self, computer_id: int, status: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def update_status_bulk(self, status: str, computer_ids: Optional[List[int]] = None,
+                           classroom: Optional[str] = None,
+                           current_status: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Set status on the filtered rows; refuses to run without any filter, None on failure"""
+
+    @abstractmethod
+    def update_statuses(self, statuses: Dict[int, str]) -> List[Dict[str, Any]]:
+        """Apply per-computer statuses; maintenance rows are left alone"""
+
+    @abstractmethod
+    def import_computers(self, computers: Iterable[Dict[str, Any]],
+                         dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        """Upsert rows keyed by (classroom, name); None on failure"""
+
+    # Offline actions
+
+    @abstractmethod
+    def replay_actions(self, status_changes: List[Dict[str, Any]],
+                       additions: List[Dict[str, Any]]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Apply actions recorded while the server was unreachable, in one transaction
+
+        A status change {"id", "expected", "status"} applies only if the
+        row still has the expected status or already has the new one; an
+        addition {"name", "ip", "classroom", "mac"} only if the classroom
+        has no computer of that name, with its optional "status". Returns {"updated", "added",
+        "conflicts"}; None on failure, when nothing was applied.
+        """
+
+    @staticmethod
+    def _replay_report(status_changes: List[Dict[str, Any]], additions: List[Dict[str, Any]],
+                       updated: List[Dict[str, Any]], added: List[Dict[str, Any]],
+                       current: Dict[int, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Conflicts are the actions that did not apply; `current` maps their ids to the server's status"""
+        updated_ids = {row["id"] for row in updated}
+        added_keys = {(row["classroom"], row["name"]) for row in added}
+        conflicts = [
+            {"kind": "status", "id": change["id"], "name": change.get("name"),
+             "status": change["status"], "current": current.get(change["id"])}
+            for change in status_changes if change["id"] not in updated_ids
+        ] + [
+            {"kind": "add", "classroom": addition["classroom"], "name": addition["name"]}
+            for addition in additions if (addition["classroom"], addition["name"]) not in added_keys
+        ]
+        return {"updated": updated, "added": added, "conflicts": conflicts}
+
+    # Status history
+
+    @abstractmethod
+    def maintain_status_history(self, retention_days: int = 90) -> Optional[Dict[str, int]]:
+        """Roll complete hours of status events up into the hourly and daily
+        summaries and drop raw events older than retention_days; None on failure
+        """
+
+    @abstractmethod
+    def get_status_summary(self, start: datetime, end: datetime, classroom: Optional[str] = None,
+                           granularity: str = "day") -> List[Dict[str, Any]]:
+        """Seconds online/offline/maintenance per classroom and hour or day in [start, end)
+
+        Rows have the keys classroom, period (datetime for hours, date for
+        days), online, offline and maintenance.
+        """
+
+    # Optional capabilities
+
+    def create_change_listener(self, on_change: Callable[[Any], None],
+                               on_reconnect: Optional[Callable[[], None]] = None):
+        """A startable change feed, or None when the backend cannot push changes"""
+        return None
+
+    @property
+    def online(self) -> bool:
+        """False while only a local copy of the data can be reached"""
+        return True
+
+    def add_connection_listener(self, callback: Callable[[bool], None]):
+        """callback(online) is called from a background thread whenever `online` changes"""
+
+    def is_connection_error(self, error: Exception) -> bool:
+        """Whether a swallowed error means the server is unreachable, not that the call was wrong"""
+        return False
+
+    def ping(self) -> bool:
+        return True
+
+    @property
+    def pending_writes(self) -> int:
+        """Changes recorded locally and not yet sent to the server"""
+        return 0
+
+    def take_replay_report(self) -> Optional[Dict[str, Any]]:
+        """What the last replay of offline changes did, once; None if nothing was replayed"""
+        return None
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def collect_metrics(self):
+        """Gauges for MetricsRegistry.add_collector: the numeric pool statistics"""
+        for name, value in self.get_pool_stats().items():
+            if isinstance(value, (int, float)):
+                yield "pc_db_pool", {"stat": name}, value
+
+    def configure_slow_query_log(self, enabled: bool, threshold: Optional[float] = None) -> bool:
+        """Toggle slow statement logging at runtime; False if the backend has none"""
+        if self.slow_query_log is None:
+            return False
+        self.slow_query_log.set_enabled(enabled, threshold)
+        return True
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _computer_row_to_dict(row) -> Dict[str, Any]:
+        computer_id, name, ip, classroom, status, mac = row
+        return {
+            "id": computer_id,
+            "name": name,
+            "ip": ip,
+            "classroom": classroom,
+            "status": status,
+            "mac": mac or ""
+        }
+
+
+def create_storage(backend: str = "postgres", password_hasher: Optional[PasswordHasher] = None,
+                   slow_query_log: Optional["SlowQueryLog"] = None, **options) -> StorageBackend:
+    """Build the backend named in Config.DB_BACKEND; drivers are imported on demand
+
+    The slow query log relies on PostgreSQL's EXPLAIN and is ignored for SQLite.
+    """
+    if backend == "postgres":
+        from .database import DatabaseManager
+        return DatabaseManager(password_hasher=password_hasher, slow_query_log=slow_query_log, **options)
+    if backend == "sqlite":
+        from .sqlite_storage import SQLiteStorage
+        return SQLiteStorage(password_hasher=password_hasher, **options)
+    raise ValueError(f"Unknown storage backend: {backend}")
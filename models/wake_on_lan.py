@@ -0,0 +1,106 @@
+import ipaddress
+import re
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from .computer import Computer
+
+
+_MAC_SEPARATORS = re.compile(r"[\s:\-.]")
+
+
+def normalize_mac(mac: str) -> str:
+    """Return the MAC address as AA:BB:CC:DD:EE:FF; raises ValueError if malformed"""
+    digits = _MAC_SEPARATORS.sub("", mac or "")
+    if len(digits) != 12 or not re.fullmatch(r"[0-9A-Fa-f]{12}", digits):
+        raise ValueError(f"Некорректный MAC-адрес: {mac!r}")
+    digits = digits.upper()
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def build_magic_packet(mac: str) -> bytes:
+    """6 x 0xFF followed by the MAC address repeated 16 times"""
+    mac_bytes = bytes.fromhex(normalize_mac(mac).replace(":", ""))
+    return b"\xff" * 6 + mac_bytes * 16
+
+
+@dataclass
+class WakeResult:
+    """Outcome of waking a single computer"""
+    computer_id: Optional[int]
+    name: str
+    mac_address: str
+    target: str = ""
+    packets_sent: int = 0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.packets_sent > 0 and not self.error
+
+
+class WakeOnLanSender:
+    """Sends Wake-on-LAN magic packets over UDP broadcast with repeats and pacing"""
+
+    def __init__(self, broadcast: str = "255.255.255.255", port: int = 9, repeat: int = 3,
+                 interval: float = 0.1, rate_limit: int = 0, directed: bool = False,
+                 prefix_length: int = 24):
+        self.broadcast = broadcast
+        self.port = port
+        self.repeat = max(1, repeat)
+        self.interval = max(0.0, interval)
+        self.rate_limit = max(0, rate_limit)  # packets per second, 0 = unlimited
+        self.directed = directed
+        self.prefix_length = prefix_length
+
+    def _target_for(self, computer: Computer) -> str:
+        if self.directed and computer.ip_address:
+            # Directed broadcast reaches hosts behind routers that forward it
+            network = ipaddress.IPv4Network(
+                f"{computer.ip_address}/{self.prefix_length}", strict=False
+            )
+            return str(network.broadcast_address)
+        return self.broadcast
+
+    def wake(self, computers: Iterable[Computer]) -> List[WakeResult]:
+        """Blocking send; call it from a worker thread"""
+        results: List[WakeResult] = []
+        # One packet per distinct MAC, built once and reused for every repeat
+        jobs: List[tuple] = []
+        packets: Dict[str, bytes] = {}
+
+        for computer in computers:
+            result = WakeResult(computer.id, computer.name, computer.mac_address)
+            results.append(result)
+            if not computer.mac_address:
+                result.error = "не указан MAC-адрес"
+                continue
+            try:
+                mac = normalize_mac(computer.mac_address)
+                result.target = self._target_for(computer)
+            except ValueError as e:
+                result.error = str(e)
+                continue
+            if mac not in packets:
+                packets[mac] = build_magic_packet(mac)
+            jobs.append((result, packets[mac]))
+
+        if not jobs:
+            return results
+
+        gap = 1.0 / self.rate_limit if self.rate_limit else 0.0
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            for round_number in range(self.repeat):
+                if round_number and self.interval:
+                    time.sleep(self.interval)
+                for result, packet in jobs:
+                    try:
+                        sock.sendto(packet, (result.target, self.port))
+                        result.packets_sent += 1
+                    except OSError as e:
+                        result.error = e.strerror or str(e)
+                    if gap:
+                        time.sleep(gap)
+        return results
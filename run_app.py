@@ -1,30 +1,47 @@
 import sys
 import os
+import time
+import logging
 from PyQt6.QtWidgets import QApplication, QMessageBox
 
-sys.path.insert(0, '/workspace')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from main import Application
-from models.database import DatabaseManager
+from storage_setup import create_startup_storage
 from config import Config
 
 
+logger = logging.getLogger("run_app")
+
+
 def main():
+    started = time.perf_counter()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
     app = QApplication(sys.argv)
+    qt_ready = time.perf_counter()
 
     db_config = Config.get_db_config()
-    db_manager = DatabaseManager(**db_config)
-    
-    if not db_manager.test_connection():
+    try:
+        # With the local snapshot this does not wait for the server
+        db_manager = create_startup_storage()
+    except Exception as e:
+        logger.warning("Database unavailable: %s", e)
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setWindowTitle("Предупреждение")
-        msg.setText("Не удалось подключиться к базе данных PostgreSQL.")
+        if Config.DB_BACKEND == 'sqlite':
+            msg.setText("Не удалось открыть локальную базу данных SQLite.")
+            location = f"Проверьте доступ к файлу: {Config.SQLITE_PATH}\n\n"
+        else:
+            msg.setText("Не удалось подключиться к базе данных PostgreSQL.")
+            location = (
+                "Убедитесь, что PostgreSQL запущен и настроен с параметрами:\n"
+                f"  Хост: {db_config['host']}\n"
+                f"  Порт: {db_config['port']}\n"
+                f"  Пользователь: {db_config['user']}\n\n"
+            )
         msg.setInformativeText(
-            "Убедитесь, что PostgreSQL запущен и настроен с параметрами:\n"
-            f"  Хост: {db_config['host']}\n"
-            f"  Порт: {db_config['port']}\n"
-            f"  Пользователь: {db_config['user']}\n\n"
+            location +
             "По умолчанию используются следующие учетные данные:\n"
             "  Логин: teacher, Пароль: 123456\n"
             "  Логин: admin, Пароль: admin123"
@@ -32,8 +49,16 @@ def main():
         msg.exec()
         return 1
 
+    db_ready = time.perf_counter()
+
     try:
-        application = Application()
+        application = Application(db_manager)
+        logger.info(
+            "Startup: Qt %.1f ms, database %.1f ms, UI %.1f ms",
+            (qt_ready - started) * 1000,
+            (db_ready - qt_ready) * 1000,
+            (time.perf_counter() - db_ready) * 1000
+        )
         application.run()
     except Exception as e:
         error_msg = QMessageBox()
@@ -0,0 +1,55 @@
+"""Storage construction from Config, shared by the GUI and the command line
+
+Kept free of Qt so the command line starts without it; modules only some
+callers need are imported inside the functions.
+"""
+import os
+from typing import TYPE_CHECKING, Optional
+
+from models.storage import StorageBackend, create_storage
+from models.password_hasher import PasswordHasher
+from config import Config
+
+if TYPE_CHECKING:
+    from models.slow_query_log import SlowQueryLog
+
+
+def create_configured_storage(slow_query_log: Optional["SlowQueryLog"] = None) -> StorageBackend:
+    """Storage backend with hashing and slow query settings taken from Config"""
+    if slow_query_log is None and Config.DB_BACKEND != 'sqlite':
+        from models.slow_query_log import SlowQueryLog
+        slow_query_log = SlowQueryLog(**Config.get_slow_query_log_config())
+    return create_storage(
+        **Config.get_storage_config(),
+        password_hasher=PasswordHasher(**Config.get_password_hasher_config()),
+        slow_query_log=slow_query_log
+    )
+
+
+def create_startup_storage() -> StorageBackend:
+    """The configured backend, behind a local snapshot when Config.OFFLINE_SNAPSHOT_PATH is set
+
+    With the snapshot this returns at once and connects in the background;
+    without it, it connects first and raises if the database is unavailable.
+    """
+    if Config.DB_BACKEND == 'sqlite' or not Config.OFFLINE_SNAPSHOT_PATH:
+        return create_configured_storage()
+    from models.local_snapshot import LocalSnapshot
+    from models.offline_storage import OfflineFirstStorage
+    from models.slow_query_log import SlowQueryLog
+
+    slow_query_log = SlowQueryLog(**Config.get_slow_query_log_config())
+    storage = OfflineFirstStorage(
+        lambda: create_configured_storage(slow_query_log),
+        LocalSnapshot(
+            os.path.expanduser(Config.OFFLINE_SNAPSHOT_PATH),
+            password_hasher=PasswordHasher(**Config.get_password_hasher_config())
+        ),
+        retry_interval=Config.OFFLINE_RETRY_INTERVAL,
+        max_retry_interval=Config.OFFLINE_MAX_RETRY_INTERVAL,
+        slow_query_log=slow_query_log,
+        replay_batch_size=Config.OFFLINE_REPLAY_BATCH_SIZE,
+        login_wait=Config.OFFLINE_LOGIN_WAIT
+    )
+    storage.start()
+    return storage
@@ -6,8 +6,8 @@ Test script to verify the UnicodeDecodeError fix in database connection
 import sys
 import os
 
-# Add the workspace to Python path
-sys.path.insert(0, '/workspace')
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from models.database import DatabaseManager
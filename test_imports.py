@@ -1,20 +1,37 @@
 import sys
 import os
 
-sys.path.insert(0, '/workspace')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 def test_imports():
     try:
         print("Testing imports...")
 
+        from models.storage import StorageBackend, create_storage
         from models.database import DatabaseManager
+        from models.sqlite_storage import SQLiteStorage
+        from models.connection_pool import ConnectionPool
+        from models.migrations import MIGRATIONS
+        from models.password_hasher import PasswordHasher
         from models.user import User
         from models.computer import Computer
         from models.auth_service import AuthService
         from models.computer_service import ComputerService
         from models.settings_service import SettingsService
+        from models.inventory_import import InventoryReader, ImportReport
+        from models.reachability import ReachabilityProber
+        from models.wake_on_lan import WakeOnLanSender
+        from models.change_listener import ComputerChangeListener
+        from models.cache import TTLCache
+        from models.search_index import SearchIndex
+        from models.metrics import MetricsRegistry, REGISTRY
+        from models.slow_query_log import SlowQueryLog
+        from models.status_history import StatusHistoryMaintainer
+        from models.local_snapshot import LocalSnapshot
+        from models.offline_storage import OfflineFirstStorage
         print("✓ Model imports successful")
 
+        from viewmodels.task_runner import TaskRunner
         from viewmodels.base_viewmodel import BaseViewModel
         from viewmodels.login_viewmodel import LoginViewModel
         from viewmodels.main_viewmodel import MainViewModel
@@ -22,6 +39,8 @@ def test_imports():
 
         from views.login_view import LoginView
         from views.main_view import MainView
+        from views.computer_table_model import ComputerTableModel, ComputerActionsDelegate
+        from views.diagnostics_view import DiagnosticsView
         print("✓ View imports successful")
 
         from utils.theme_manager import ThemeManager
@@ -29,6 +48,10 @@ def test_imports():
 
         from config import Config
         print("✓ Config import successful")
+
+        from storage_setup import create_configured_storage, create_startup_storage
+        from cli import main as cli_main
+        print("✓ Entry point imports successful")
         
         print("\nAll imports successful! MVVM architecture is properly structured.")
         return True
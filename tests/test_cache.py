@@ -0,0 +1,77 @@
+from models.cache import TTLCache
+from models.computer_service import ComputerService
+from models.sqlite_storage import SQLiteStorage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    clock.now = 10
+    assert cache.get("k") is TTLCache.MISSING
+
+
+def test_set_after_invalidate_of_same_key_is_dropped():
+    cache = TTLCache()
+    generation = cache.generation("k")
+    cache.invalidate("k")
+    assert not cache.set("k", "read before the change", generation)
+    assert cache.get("k") is TTLCache.MISSING
+    assert cache.get_stats()["stale_sets"] == 1
+
+
+def test_set_after_invalidate_all_is_dropped():
+    cache = TTLCache()
+    generation = cache.generation("k")
+    cache.invalidate()
+    assert not cache.set("k", "stale", generation)
+    assert cache.get("k") is TTLCache.MISSING
+
+
+def test_invalidate_of_other_key_keeps_set():
+    cache = TTLCache()
+    generation = cache.generation("k")
+    cache.invalidate("other")
+    assert cache.set("k", "fresh", generation)
+    assert cache.get("k") == "fresh"
+
+
+class _InterleavingStorage(SQLiteStorage):
+    """Runs during_read between the database read and the service's cache.set"""
+
+    during_read = None
+
+    def get_computers_by_classroom(self, classroom):
+        rows = super().get_computers_by_classroom(classroom)
+        if self.during_read is not None:
+            during_read, self.during_read = self.during_read, None
+            during_read()
+        return rows
+
+
+def test_classroom_read_racing_a_status_change_is_not_cached(tmp_path):
+    storage = _InterleavingStorage(str(tmp_path / "cache.db"))
+    try:
+        service = ComputerService(storage)
+        classroom = service.get_classrooms()[0]
+        target = service.get_computers_by_classroom(classroom, use_cache=False)[0]
+        service.invalidate(classroom)
+
+        # The change commits and invalidates while the read above is in flight
+        storage.during_read = lambda: service.set_computer_status(target.id, "maintenance")
+        stale = service.get_computers_by_classroom(classroom)
+        assert next(c for c in stale if c.id == target.id).status == target.status
+
+        fresh = service.get_computers_by_classroom(classroom)
+        assert next(c for c in fresh if c.id == target.id).status == "maintenance"
+    finally:
+        storage.close()
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from models.local_snapshot import LocalSnapshot
+from models.offline_storage import OfflineFirstStorage
+from models.sqlite_storage import SQLiteStorage
+
+
+class _SlowSyncServer(SQLiteStorage):
+    """A server whose full-fleet read blocks until released"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.release = threading.Event()
+
+    def iter_all_computers(self, batch_size: int = 2000):
+        self.release.wait(10)
+        yield from super().iter_all_computers(batch_size)
+
+
+@pytest.fixture
+def make_storage(tmp_path):
+    created = []
+
+    def make(connect, **options):
+        storage = OfflineFirstStorage(
+            connect, LocalSnapshot(str(tmp_path / "snapshot.db")),
+            retry_interval=0.05, max_retry_interval=0.1, **options
+        )
+        created.append(storage)
+        storage.start()
+        return storage
+
+    yield make
+    for storage in created:
+        storage.close()
+
+
+def test_login_on_fresh_console_while_first_sync_runs(tmp_path, make_storage):
+    server = _SlowSyncServer(str(tmp_path / "server.db"))
+    storage = make_storage(lambda: server)
+    try:
+        assert storage.verify_user("teacher", "123456") == (True, "teacher")
+        assert not storage.online
+        # Remembered for logins while the server is unreachable
+        assert storage.snapshot._get_credentials("teacher") is not None
+        assert storage.verify_user("teacher", "wrong") == (False, None)
+    finally:
+        server.release.set()
+
+
+def test_login_waits_for_the_first_connection(tmp_path, make_storage):
+    def connect():
+        time.sleep(0.3)
+        return SQLiteStorage(str(tmp_path / "server.db"))
+
+    storage = make_storage(connect)
+    assert storage.verify_user("teacher", "123456") == (True, "teacher")
+
+
+def test_login_with_server_down_uses_snapshot_only(make_storage):
+    def connect():
+        raise ConnectionError("server down")
+
+    storage = make_storage(connect, login_wait=5.0)
+    started = time.monotonic()
+    assert storage.verify_user("teacher", "123456") == (False, None)
+    # The failed first attempt ends the wait
+    assert time.monotonic() - started < 2.0
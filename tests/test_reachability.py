@@ -0,0 +1,65 @@
+import socket
+
+import pytest
+
+from models.computer import Computer
+from models.reachability import ReachabilityProber
+
+
+@pytest.fixture
+def open_port():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    yield listener.getsockname()[1]
+    listener.close()
+
+
+@pytest.fixture
+def closed_port():
+    # Bound but not listening: connections are refused with an RST
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _local(computer_id: int = 1) -> Computer:
+    return Computer(id=computer_id, name=f"PC-{computer_id}", ip_address="127.0.0.1")
+
+
+def test_open_port_is_online(open_port, closed_port):
+    prober = ReachabilityProber(ports=(closed_port, open_port), timeout=2, jitter=0, refused_is_up=False)
+    [result] = prober.sweep([_local()])
+    assert result.reachable
+    assert result.status == "online"
+    assert result.latency is not None
+
+
+def test_refused_counts_as_up_by_default(closed_port):
+    prober = ReachabilityProber(ports=(closed_port,), timeout=2, jitter=0)
+    [result] = prober.sweep([_local()])
+    assert result.reachable
+
+
+def test_refused_is_offline_when_disabled(closed_port):
+    prober = ReachabilityProber(ports=(closed_port,), timeout=2, jitter=0, refused_is_up=False)
+    [result] = prober.sweep([_local()])
+    assert not result.reachable
+    assert result.status == "offline"
+    assert result.error
+
+
+def test_more_ports_than_concurrency_still_sweeps(open_port, closed_port):
+    prober = ReachabilityProber(ports=(closed_port, open_port, closed_port), timeout=2,
+                                concurrency=2, jitter=0, refused_is_up=False)
+    assert prober.host_concurrency == 1
+    results = prober.sweep([_local(i) for i in range(1, 4)])
+    assert [result.computer_id for result in results] == [1, 2, 3]
+    assert all(result.reachable for result in results)
+
+
+def test_concurrency_is_split_across_ports():
+    assert ReachabilityProber(ports=(1, 2, 3), concurrency=500).host_concurrency == 166
+    assert ReachabilityProber(ports=(1,), concurrency=0).host_concurrency == 1
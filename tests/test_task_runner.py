@@ -0,0 +1,55 @@
+import threading
+import time
+
+from viewmodels.task_runner import TaskRunner
+
+
+def _deliver(qapp, runner: TaskRunner, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while runner.is_busy and time.monotonic() < deadline:
+        runner.wait_for_done(50)
+        qapp.processEvents()
+
+
+def test_resubmit_after_finished_but_undelivered(qapp):
+    runner = TaskRunner(max_threads=1)
+    results = []
+    runner.submit(lambda: 1, key="k", on_result=results.append)
+    # Finished on the worker; the finished signal is still queued for this thread
+    runner.wait_for_done()
+    runner.submit(lambda: 2, key="k", on_result=results.append)
+    _deliver(qapp, runner)
+    assert results == [2]
+
+
+def test_resubmit_drops_queued_task(qapp):
+    runner = TaskRunner(max_threads=1)
+    release = threading.Event()
+    calls = []
+    runner.submit(release.wait, 5)
+    runner.submit(lambda: calls.append(1), key="k")
+    runner.submit(lambda: calls.append(2) or 2, key="k")
+    release.set()
+    _deliver(qapp, runner)
+    assert calls == [2]
+
+
+def test_result_of_running_stale_task_is_ignored(qapp):
+    runner = TaskRunner(max_threads=2)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    runner.submit(slow, key="k", on_result=results.append)
+    assert started.wait(5)
+    runner.submit(lambda: "new", key="k", on_result=results.append)
+    release.set()
+    _deliver(qapp, runner)
+    runner.wait_for_done()
+    qapp.processEvents()
+    assert results == ["new"]
+    assert not runner.is_busy
@@ -1,109 +1,147 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
 from PyQt6.QtGui import QColor, QFont, QPalette
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
 
 
+GLASS_STYLESHEET = """
+    QMainWindow, QWidget {
+        background: rgba(255, 255, 255, 230);
+        border-radius: 12px;
+    }
+    QTableView {
+        background: rgba(250, 250, 250, 240);
+        border: 1px solid rgba(200, 200, 200, 120);
+        border-radius: 8px;
+        gridline-color: rgba(200, 200, 200, 100);
+    }
+    QHeaderView::section {
+        background: rgba(240, 240, 240, 220);
+        padding: 4px;
+        border: none;
+        border-right: 1px solid rgba(200, 200, 200, 100);
+    }
+    QLineEdit, QComboBox {
+        background: rgba(255, 255, 255, 240);
+        border: 1px solid rgba(180, 180, 180, 120);
+        border-radius: 6px;
+        padding: 4px;
+    }
+    QPushButton {
+        background: rgba(240, 240, 240, 220);
+        border: 1px solid rgba(180, 180, 180, 100);
+        border-radius: 8px;
+        padding: 6px;
+        color: #1e1e1e;
+    }
+    QPushButton:hover {
+        background: rgba(220, 220, 220, 230);
+    }
+    QComboBox QAbstractItemView {
+        background: white;
+        border: 1px solid #ccc;
+    }
+"""
+
+
+@dataclass
+class Theme:
+    palette: QPalette
+    font: QFont
+    stylesheet: str = ""
+
+
 class ThemeManager:
+    """Applies themes built once per process"""
+
+    _themes: Dict[str, Theme] = {}
+    _applied: Optional[Theme] = None
+
     @staticmethod
     def apply_theme(theme_name: str):
         app = QApplication.instance()
         if not app:
             return
 
-        app.setStyleSheet("")  # сброс кастомного CSS
+        theme = ThemeManager.get_theme(theme_name)
+        applied = ThemeManager._applied
+        if applied is None:
+            app.setStyle("Fusion")
+        elif theme is applied:
+            return
 
-        if theme_name == "light":
-            ThemeManager._apply_light(app)
-        elif theme_name == "dark":
-            ThemeManager._apply_dark(app)
-        elif theme_name == "glass":
-            ThemeManager._apply_glass(app)
-        else:
-            ThemeManager._apply_light(app)
+        # Every set* call re-polishes all widgets, so only what differs is set.
+        # The stylesheet is reset first, so its rules are not re-evaluated
+        # against the new palette and then thrown away
+        if applied is None or applied.stylesheet != theme.stylesheet:
+            app.setStyleSheet(theme.stylesheet)
+        if applied is None or applied.palette != theme.palette:
+            app.setPalette(theme.palette)
+        if applied is None or applied.font != theme.font:
+            app.setFont(theme.font)
+        ThemeManager._applied = theme
 
     @staticmethod
-    def _apply_light(app):
-        app.setStyle("Fusion")
-        palette = QPalette()
-        palette.setColor(QPalette.ColorRole.Window, QColor(240, 240, 240))
-        palette.setColor(QPalette.ColorRole.WindowText, Qt.GlobalColor.black)
-        palette.setColor(QPalette.ColorRole.Base, Qt.GlobalColor.white)
-        palette.setColor(QPalette.ColorRole.AlternateBase, QColor(230, 230, 230))
-        palette.setColor(QPalette.ColorRole.Text, Qt.GlobalColor.black)
-        palette.setColor(QPalette.ColorRole.Button, QColor(220, 220, 220))
-        palette.setColor(QPalette.ColorRole.ButtonText, Qt.GlobalColor.black)
-        palette.setColor(QPalette.ColorRole.Highlight, QColor(42, 130, 218))
-        palette.setColor(QPalette.ColorRole.HighlightedText, Qt.GlobalColor.white)
-        app.setPalette(palette)
-        app.setFont(QFont("Segoe UI", 10))
+    def get_theme(theme_name: str) -> Theme:
+        """The cached theme; unknown names fall back to the light theme"""
+        if theme_name not in ("light", "dark", "glass"):
+            theme_name = "light"
+        theme = ThemeManager._themes.get(theme_name)
+        if theme is None:
+            builder = getattr(ThemeManager, f"_build_{theme_name}")
+            theme = ThemeManager._themes[theme_name] = builder()
+        return theme
 
     @staticmethod
-    def _apply_dark(app):
-        app.setStyle("Fusion")
+    def _palette(colors: Dict[QPalette.ColorRole, object]) -> QPalette:
         palette = QPalette()
-        palette.setColor(QPalette.ColorRole.Window, QColor(53, 53, 53))
-        palette.setColor(QPalette.ColorRole.WindowText, Qt.GlobalColor.white)
-        palette.setColor(QPalette.ColorRole.Base, QColor(25, 25, 25))
-        palette.setColor(QPalette.ColorRole.AlternateBase, QColor(53, 53, 53))
-        palette.setColor(QPalette.ColorRole.Text, Qt.GlobalColor.white)
-        palette.setColor(QPalette.ColorRole.Button, QColor(70, 70, 70))
-        palette.setColor(QPalette.ColorRole.ButtonText, Qt.GlobalColor.white)
-        palette.setColor(QPalette.ColorRole.Highlight, QColor(42, 130, 218))
-        palette.setColor(QPalette.ColorRole.HighlightedText, Qt.GlobalColor.black)
-        app.setPalette(palette)
-        app.setFont(QFont("Segoe UI", 10))
+        for role, color in colors.items():
+            palette.setColor(role, color)
+        return palette
+
+    @staticmethod
+    def _build_light() -> Theme:
+        Role = QPalette.ColorRole
+        return Theme(ThemeManager._palette({
+            Role.Window: QColor(240, 240, 240),
+            Role.WindowText: Qt.GlobalColor.black,
+            Role.Base: Qt.GlobalColor.white,
+            Role.AlternateBase: QColor(230, 230, 230),
+            Role.Text: Qt.GlobalColor.black,
+            Role.Button: QColor(220, 220, 220),
+            Role.ButtonText: Qt.GlobalColor.black,
+            Role.Highlight: QColor(42, 130, 218),
+            Role.HighlightedText: Qt.GlobalColor.white,
+        }), QFont("Segoe UI", 10))
 
     @staticmethod
-    def _apply_glass(app):
-        app.setStyle("Fusion")
+    def _build_dark() -> Theme:
+        Role = QPalette.ColorRole
+        return Theme(ThemeManager._palette({
+            Role.Window: QColor(53, 53, 53),
+            Role.WindowText: Qt.GlobalColor.white,
+            Role.Base: QColor(25, 25, 25),
+            Role.AlternateBase: QColor(53, 53, 53),
+            Role.Text: Qt.GlobalColor.white,
+            Role.Button: QColor(70, 70, 70),
+            Role.ButtonText: Qt.GlobalColor.white,
+            Role.Highlight: QColor(42, 130, 218),
+            Role.HighlightedText: Qt.GlobalColor.black,
+        }), QFont("Segoe UI", 10))
+
+    @staticmethod
+    def _build_glass() -> Theme:
+        Role = QPalette.ColorRole
         # Палитра — светлая основа
-        palette = QPalette()
-        palette.setColor(QPalette.ColorRole.Window, QColor(250, 250, 250))
-        palette.setColor(QPalette.ColorRole.WindowText, QColor(30, 30, 30))
-        palette.setColor(QPalette.ColorRole.Base, QColor(245, 245, 245))
-        palette.setColor(QPalette.ColorRole.Text, QColor(20, 20, 20))
-        palette.setColor(QPalette.ColorRole.Button, QColor(235, 235, 235))
-        palette.setColor(QPalette.ColorRole.ButtonText, QColor(30, 30, 30))
-        palette.setColor(QPalette.ColorRole.Highlight, QColor(100, 180, 255))
-        palette.setColor(QPalette.ColorRole.HighlightedText, Qt.GlobalColor.white)
-        app.setPalette(palette)
-        app.setFont(QFont("Segoe UI", 10))
-
-        app.setStyleSheet("""
-            QMainWindow, QWidget {
-                background: rgba(255, 255, 255, 230);
-                border-radius: 12px;
-            }
-            QTableWidget {
-                background: rgba(250, 250, 250, 240);
-                border: 1px solid rgba(200, 200, 200, 120);
-                border-radius: 8px;
-                gridline-color: rgba(200, 200, 200, 100);
-            }
-            QHeaderView::section {
-                background: rgba(240, 240, 240, 220);
-                padding: 4px;
-                border: none;
-                border-right: 1px solid rgba(200, 200, 200, 100);
-            }
-            QLineEdit, QComboBox {
-                background: rgba(255, 255, 255, 240);
-                border: 1px solid rgba(180, 180, 180, 120);
-                border-radius: 6px;
-                padding: 4px;
-            }
-            QPushButton {
-                background: rgba(240, 240, 240, 220);
-                border: 1px solid rgba(180, 180, 180, 100);
-                border-radius: 8px;
-                padding: 6px;
-                color: #1e1e1e;
-            }
-            QPushButton:hover {
-                background: rgba(220, 220, 220, 230);
-            }
-            QComboBox QAbstractItemView {
-                background: white;
-                border: 1px solid #ccc;
-            }
-        """)
\ No newline at end of file
+        return Theme(ThemeManager._palette({
+            Role.Window: QColor(250, 250, 250),
+            Role.WindowText: QColor(30, 30, 30),
+            Role.Base: QColor(245, 245, 245),
+            Role.Text: QColor(20, 20, 20),
+            Role.Button: QColor(235, 235, 235),
+            Role.ButtonText: QColor(30, 30, 30),
+            Role.Highlight: QColor(100, 180, 255),
+            Role.HighlightedText: Qt.GlobalColor.white,
+        }), QFont("Segoe UI", 10), GLASS_STYLESHEET)
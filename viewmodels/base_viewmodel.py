@@ -1,15 +1,40 @@
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 from PyQt6.QtCore import QObject, pyqtSignal
+from .task_runner import TaskRunner
 
 
 class BaseViewModel(QObject):
     error_occurred = pyqtSignal(str)
     success_occurred = pyqtSignal(str)
     info_occurred = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
     
     def __init__(self):
         super().__init__()
         self._observers: Dict[str, list] = {}
+        self._runner = TaskRunner(self)
+        self._runner.busy_changed.connect(self.busy_changed)
+    
+    @property
+    def is_busy(self) -> bool:
+        return self._runner.is_busy
+    
+    def run_async(self, fn: Callable, *args: Any, key: Optional[str] = None,
+                  on_result: Optional[Callable[[Any], None]] = None,
+                  on_error: Optional[Callable[[Exception], None]] = None,
+                  context: str = "") -> int:
+        """Run a blocking service call off the GUI thread; errors go to error_occurred"""
+        if on_error is None:
+            on_error = lambda ex: self.handle_exception(ex, context)
+        return self._runner.submit(
+            fn, *args,
+            key=key,
+            on_result=on_result,
+            on_error=on_error
+        )
+    
+    def cancel_async(self, key: str):
+        self._runner.cancel(key)
     
     def notify_error(self, message: str):
         self.error_occurred.emit(message)
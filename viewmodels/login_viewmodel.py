@@ -1,6 +1,8 @@
+from typing import Optional
 from PyQt6.QtCore import pyqtSignal
 from .base_viewmodel import BaseViewModel
 from models.auth_service import AuthService
+from models.settings_service import SettingsService
 from models.user import User
 
 
@@ -8,9 +10,10 @@ class LoginViewModel(BaseViewModel):
     login_success = pyqtSignal(User)
     login_failed = pyqtSignal()
     
-    def __init__(self, auth_service: AuthService):
+    def __init__(self, auth_service: AuthService, settings_service: Optional[SettingsService] = None):
         super().__init__()
         self.auth_service = auth_service
+        self.settings_service = settings_service
         self._username = ""
         self._password = ""
     
@@ -40,24 +43,45 @@ class LoginViewModel(BaseViewModel):
         return True
     
     def login(self):
-        try:
-            if not self.validate_inputs():
-                return
-            
-            success, user = self.auth_service.authenticate_user(
-                self._username, 
-                self._password
-            )
-            
-            if success and user:
-                self.login_success.emit(user)
-                self.notify_success(f"Добро пожаловать, {user.username}!")
-            else:
-                self.login_failed.emit()
-                self.notify_error("Неверный логин или пароль")
-        except Exception as ex:
-            self.handle_exception(ex, "Ошибка при попытке входа")
+        if self.is_busy:
+            return
+        if not self.validate_inputs():
+            return
+        
+        self.run_async(
+            self._authenticate,
+            self._username,
+            self._password,
+            key="login",
+            on_result=self._on_login_finished,
+            on_error=self._on_login_error
+        )
+    
+    def _authenticate(self, username: str, password: str):
+        """Runs in the background; the user's settings are ready before the main window opens"""
+        success, user = self.auth_service.authenticate_user(username, password)
+        if success and user and self.settings_service is not None:
+            self.settings_service.load(user.username)
+        return success, user
+    
+    def _on_login_finished(self, result):
+        success, user = result
+        if success and user:
+            self.login_success.emit(user)
+            self.notify_success(f"Добро пожаловать, {user.username}!")
+        else:
             self.login_failed.emit()
+            if self.auth_service.db_manager.online:
+                self.notify_error("Неверный логин или пароль")
+            else:
+                self.notify_error(
+                    "Неверный логин или пароль. Нет связи с сервером: без него можно войти "
+                    "только под пользователем, который уже входил на этом компьютере"
+                )
+    
+    def _on_login_error(self, ex: Exception):
+        self.handle_exception(ex, "Ошибка при попытке входа")
+        self.login_failed.emit()
     
     def logout(self):
         self.auth_service.logout()
\ No newline at end of file
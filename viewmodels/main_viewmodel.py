@@ -1,18 +1,39 @@
-from PyQt6.QtCore import pyqtSignal
-from typing import List
+import random
+from PyQt6.QtCore import QTimer, pyqtSignal
+from typing import Dict, List, Optional
 from .base_viewmodel import BaseViewModel
 from models.auth_service import AuthService
 from models.computer_service import ComputerService
 from models.settings_service import SettingsService
 from models.user import User
 from models.computer import Computer
+from models.storage import PageKey
+from models.metrics import REGISTRY
+from config import Config
+
+
+OFFLINE_NOTE = " (сохранено локально, будет отправлено на сервер при восстановлении связи)"
 
 
 class MainViewModel(BaseViewModel):
     computers_changed = pyqtSignal()
+    computer_updated = pyqtSignal(int)  # row of the changed computer
+    computers_appended = pyqtSignal(int)  # first row of a page fetched on scroll
+    computer_revealed = pyqtSignal(int)  # row of a computer picked in the search results
+    search_results_changed = pyqtSignal()
     classrooms_changed = pyqtSignal()
     theme_changed = pyqtSignal(str)
     user_logged_out = pyqtSignal()
+    import_finished = pyqtSignal(object)  # ImportReport
+    connection_changed = pyqtSignal(bool)  # False while showing the local snapshot
+    
+    # Bridges from the change listener thread into the GUI thread
+    _remote_change = pyqtSignal(object)
+    _remote_resync = pyqtSignal()
+    _remote_connection = pyqtSignal(bool)
+    
+    # current_classroom value for the whole fleet, which is loaded page by page
+    ALL_CLASSROOMS = "*"
     
     def __init__(self, 
                  auth_service: AuthService, 
@@ -25,7 +46,28 @@ class MainViewModel(BaseViewModel):
 
         self._current_user = self.auth_service.get_current_user()
         self._current_classroom = ""
+        self._classrooms: List[str] = []
         self._computers = []
+        self._rows_by_id: Dict[int, int] = {}
+        # Key of the next page of the fleet; None when everything is loaded
+        self._next_page: Optional[PageKey] = None
+        
+        self._search_query = ""
+        self._search_results: List[Computer] = []
+        self._search_total = 0
+        self._reveal_id: Optional[int] = None
+        self._indexing = False
+        
+        self._change_listener = None
+        self._remote_change.connect(self.apply_remote_change)
+        self._remote_resync.connect(self.refresh_data)
+        self._remote_connection.connect(self._on_connection_changed)
+        self.computer_service.add_connection_listener(self._remote_connection.emit)
+        
+        self._sweep_interval = 0.0
+        self._sweep_timer = QTimer(self)
+        self._sweep_timer.setSingleShot(True)
+        self._sweep_timer.timeout.connect(self._on_sweep_timer)
     
     @property
     def current_user(self) -> User:
@@ -38,67 +80,514 @@ class MainViewModel(BaseViewModel):
     @current_classroom.setter
     def current_classroom(self, value: str):
         self._current_classroom = value
+        if value and value != self.settings_service.settings.classroom:
+            self.settings_service.update(classroom=value)
+        self._reveal_id = None
         self.update_computers_for_classroom()
     
+    @property
+    def showing_all_classrooms(self) -> bool:
+        return self._current_classroom == self.ALL_CLASSROOMS
+    
     @property
     def computers(self) -> List[Computer]:
         return self._computers
     
-    def load_classrooms(self) -> List[str]:
-        try:
-            classrooms = self.computer_service.get_classrooms()
+    @property
+    def has_more_computers(self) -> bool:
+        return self._next_page is not None
+    
+    def _set_computers(self, computers: List[Computer]):
+        self._computers = computers
+        self._rows_by_id = {
+            computer.id: row for row, computer in enumerate(computers)
+            if computer.id is not None
+        }
+        self.computers_changed.emit()
+    
+    def row_of(self, computer_id: int) -> Optional[int]:
+        return self._rows_by_id.get(computer_id)
+    
+    def _sort_key(self, computer: Computer) -> tuple:
+        if self.showing_all_classrooms:
+            return computer.classroom, computer.name, computer.id
+        return (computer.name,)
+    
+    def apply_computer_update(self, computer: Computer, moved: bool = False):
+        """Apply a keyed change to the loaded rows without reloading them
+
+        moved: the computer may be new or in another classroom, so it may
+        now belong among the loaded rows even if it was not shown before.
+        """
+        row = self._rows_by_id.get(computer.id)
+        if self.showing_all_classrooms:
+            if row is not None and self._sort_key(self._computers[row]) == self._sort_key(computer):
+                self._computers[row] = computer
+                self.computer_updated.emit(row)
+            elif row is not None or moved:
+                # Where the row goes is decided by the database's collation,
+                # which Python's string order does not necessarily match
+                self._reload_loaded_pages()
+            # Otherwise it is past the loaded pages and arrives with its page
+            return
+        
+        if computer.classroom != self._current_classroom:
+            if row is not None:
+                self._set_computers([c for c in self._computers if c.id != computer.id])
+            return
+        
+        if row is None or self._sort_key(self._computers[row]) != self._sort_key(computer):
+            others = [c for c in self._computers if c.id != computer.id]
+            self._set_computers(sorted(others + [computer], key=self._sort_key))
+            return
+        
+        self._computers[row] = computer
+        self.computer_updated.emit(row)
+    
+    def remove_computer(self, computer_id: int):
+        if computer_id in self._rows_by_id:
+            self._set_computers([c for c in self._computers if c.id != computer_id])
+    
+    def apply_remote_change(self, change):
+        """Apply a change made by another console (ComputerChange)"""
+        computer = change.computer
+        if change.operation == "DELETE":
+            self.remove_computer(computer.id)
+            return
+        if computer.classroom and computer.classroom not in self._classrooms:
+            self._classrooms = sorted(self._classrooms + [computer.classroom])
             self.classrooms_changed.emit()
-            return classrooms
-        except Exception as ex:
-            self.handle_exception(ex, "Ошибка при загрузке списка кабинетов")
-            return []
+        moved = change.operation == "INSERT" or change.previous_classroom != computer.classroom
+        self.apply_computer_update(computer, moved)
     
-    def update_computers_for_classroom(self):
+    def start_live_updates(self):
+        if self._change_listener is not None:
+            return
         try:
-            self._computers = self.computer_service.get_computers_by_classroom(
-                self._current_classroom
+            self._change_listener = self.computer_service.listen_for_changes(
+                self._remote_change.emit,
+                self._remote_resync.emit
             )
-            self.computers_changed.emit()
         except Exception as ex:
-            self.handle_exception(ex, "Ошибка при загрузке компьютеров")
-            self._computers = []
+            self.handle_exception(ex, "Не удалось подписаться на изменения")
     
-    def get_all_computers(self) -> dict:
-        try:
-            return self.computer_service.get_all_computers()
-        except Exception as ex:
-            self.handle_exception(ex, "Ошибка при загрузке всех компьютеров")
-            return {}
+    def stop_live_updates(self):
+        if self._change_listener is not None:
+            self._change_listener.stop()
+            self._change_listener = None
+    
+    @property
+    def server_online(self) -> bool:
+        return self.computer_service.online
+    
+    @property
+    def pending_writes(self) -> int:
+        """Changes made offline that wait for the server"""
+        return self.computer_service.pending_writes
+    
+    def _on_connection_changed(self, online: bool):
+        if online and self.auth_service.is_authenticated():
+            # Whatever was shown came from the snapshot
+            self.computer_service.invalidate(include_classrooms=True)
+            self.computer_service.search_index.invalidate()
+            self.start_live_updates()
+            self.refresh_data()
+            self._report_replay()
+        self.connection_changed.emit(online)
+    
+    def _report_replay(self):
+        report = self.computer_service.take_replay_report()
+        if not report:
+            return
+        message = f"Связь с сервером восстановлена. Отправлено изменений: {report['applied']}"
+        conflicts = report["conflicts"]
+        if conflicts:
+            message += f"\nНе применено, на сервере уже изменено: {len(conflicts)}"
+            message += "\n" + "\n".join(
+                f"{conflict['name']}: {conflict['status']} (на сервере: {conflict['current'] or 'удален'})"
+                if conflict["kind"] == "status" else
+                f"{conflict['classroom']}/{conflict['name']}: уже существует"
+                for conflict in conflicts[:10]
+            )
+        if report["dropped"]:
+            message += f"\nОтклонено сервером: {report['dropped']}"
+        self.notify_info(message)
+    
+    def _queued_offline(self) -> bool:
+        """After a write: whether it went to the local queue; updates the offline indicator"""
+        if self.server_online:
+            return False
+        self.connection_changed.emit(False)
+        return True
+    
+    def apply_computer_updates(self, computers: List[Computer]):
+        for computer in computers:
+            self.apply_computer_update(computer)
+    
+    @property
+    def classrooms(self) -> List[str]:
+        return self._classrooms
+    
+    def load_classrooms(self):
+        self.run_async(
+            self.computer_service.get_classrooms,
+            key="classrooms",
+            on_result=self._on_classrooms_loaded,
+            context="Ошибка при загрузке списка кабинетов"
+        )
+    
+    def _on_classrooms_loaded(self, classrooms: List[str]):
+        self._classrooms = classrooms
+        self.classrooms_changed.emit()
+    
+    def update_computers_for_classroom(self):
+        # A newer request for the same key supersedes the one still in flight,
+        # so quickly switching classrooms never shows a stale room.
+        classroom = self._current_classroom
+        self.cancel_async("computers_page")
+        self._next_page = None
+        if not classroom:
+            self.cancel_async("computers")
+            self._set_computers([])
+            return
+        
+        if self.showing_all_classrooms:
+            self.run_async(
+                self.computer_service.get_computers_page,
+                None,
+                Config.COMPUTERS_PAGE_SIZE,
+                key="computers",
+                on_result=lambda page: self._on_page_loaded(None, page),
+                context="Ошибка при загрузке компьютеров"
+            )
+            return
+        
+        self.run_async(
+            self.computer_service.get_computers_by_classroom,
+            classroom,
+            key="computers",
+            on_result=lambda computers: self._on_computers_loaded(classroom, computers),
+            context="Ошибка при загрузке компьютеров"
+        )
+    
+    def _on_computers_loaded(self, classroom: str, computers: List[Computer]):
+        if classroom != self._current_classroom:
+            return
+        self._set_computers(computers)
+        if self._reveal_id is not None:
+            self.reveal_computer(self._reveal_id)
+    
+    def fetch_more_computers(self):
+        """Load the next page of the fleet; the table asks for it on scroll"""
+        after = self._next_page
+        if not self.showing_all_classrooms or after is None:
+            return
+        self.run_async(
+            self.computer_service.get_computers_page,
+            after,
+            Config.COMPUTERS_PAGE_SIZE,
+            key="computers_page",
+            on_result=lambda page: self._on_page_loaded(after, page),
+            context="Ошибка при загрузке компьютеров"
+        )
+    
+    def _on_page_loaded(self, after: Optional[PageKey], page):
+        if page is None:
+            # _next_page is kept: scrolling retries the page
+            self.notify_error("Ошибка при загрузке компьютеров")
+            return
+        computers, next_page = page
+        if not self.showing_all_classrooms or after != self._next_page:
+            return
+        self._next_page = next_page
+        if after is None:
+            self._set_computers(computers)
+            return
+        
+        first_row = len(self._computers)
+        # Live updates may already have placed some of these rows
+        for computer in computers:
+            if computer.id not in self._rows_by_id:
+                self._rows_by_id[computer.id] = len(self._computers)
+                self._computers.append(computer)
+        self.computers_appended.emit(first_row)
+    
+    def _reload_loaded_pages(self):
+        """Refetch the rows loaded so far, in the server's order"""
+        self.cancel_async("computers_page")
+        self.run_async(
+            self.computer_service.get_computers_page,
+            None,
+            max(len(self._computers) + 1, Config.COMPUTERS_PAGE_SIZE),
+            key="computers",
+            on_result=self._on_pages_reloaded,
+            context="Ошибка при загрузке компьютеров"
+        )
+    
+    def _on_pages_reloaded(self, page):
+        if page is None:
+            self.notify_error("Ошибка при загрузке компьютеров")
+            return
+        if not self.showing_all_classrooms:
+            return
+        computers, self._next_page = page
+        self._set_computers(computers)
     
     def refresh_data(self):
         self.load_classrooms()
         if self._current_classroom:
             self.update_computers_for_classroom()
+        if not self.computer_service.search_index_ready:
+            self.load_search_index()
+    
+    @property
+    def search_results(self) -> List[Computer]:
+        return self._search_results
+    
+    @property
+    def search_total(self) -> int:
+        """All matches; search_results holds at most Config.SEARCH_LIMIT of them"""
+        return self._search_total
+    
+    def load_search_index(self):
+        if self._indexing:
+            return
+        self._indexing = True
+        self.run_async(
+            self.computer_service.build_search_index,
+            key="search_index",
+            on_result=self._on_search_index_loaded,
+            on_error=self._on_search_index_failed
+        )
+    
+    def _on_search_index_loaded(self, _size: int):
+        self._indexing = False
+        if self._search_query:
+            self.search(self._search_query)
+    
+    def _on_search_index_failed(self, ex: Exception):
+        self._indexing = False
+        self.handle_exception(ex, "Ошибка при построении индекса поиска")
+    
+    def search(self, query: str):
+        """Search the whole fleet as the user types; answered from memory in the GUI thread"""
+        self._search_query = query
+        if query.strip() and not self.computer_service.search_index_ready:
+            # Answer from what is indexed; the results refresh once it is loaded
+            self.load_search_index()
+        self._search_results, self._search_total = self.computer_service.search_computers(
+            query, Config.SEARCH_LIMIT
+        )
+        self.search_results_changed.emit()
+    
+    def reveal_computer(self, computer_id: int):
+        """Select a search result's row once its classroom is shown"""
+        row = self._rows_by_id.get(computer_id)
+        if row is None:
+            self._reveal_id = computer_id
+            return
+        self._reveal_id = None
+        self.computer_revealed.emit(row)
+    
+    def set_computer_status(self, computer_id: int, status: str):
+        self.run_async(
+            self.computer_service.set_computer_status,
+            computer_id,
+            status,
+            on_result=lambda computer: self._on_status_updated(computer_id, status, computer),
+            context="Ошибка при изменении статуса компьютера"
+        )
+    
+    def _on_status_updated(self, computer_id: int, status: str, computer: Optional[Computer]):
+        if computer is None:
+            self.notify_error("Не удалось изменить статус компьютера")
+            return
+        self.apply_computer_update(computer)
+        message = f"Статус компьютера {computer.name} изменен на {status}"
+        if self._queued_offline():
+            message += OFFLINE_NOTE
+        self.notify_success(message)
+    
+    def set_status_for_computers(self, computer_ids: List[int], status: str):
+        if not computer_ids:
+            self.notify_error("Не выбрано ни одного компьютера")
+            return
+        self.run_async(
+            self.computer_service.bulk_update_status,
+            status,
+            list(computer_ids),
+            on_result=lambda computers: self._on_bulk_status_updated(status, computers),
+            context="Ошибка при групповом изменении статуса"
+        )
+    
+    def set_status_for_classroom(self, status: str):
+        if not self._current_classroom or self.showing_all_classrooms:
+            return
+        self.run_async(
+            self.computer_service.bulk_update_status,
+            status,
+            None,
+            self._current_classroom,
+            on_result=lambda computers: self._on_bulk_status_updated(status, computers),
+            context="Ошибка при групповом изменении статуса"
+        )
+    
+    def _on_bulk_status_updated(self, status: str, computers: Optional[List[Computer]]):
+        if computers is None:
+            self.notify_error("Не удалось изменить статус компьютеров")
+            return
+        self.apply_computer_updates(computers)
+        message = f"Статус изменен на {status} у компьютеров: {len(computers)}"
+        if self._queued_offline():
+            message += OFFLINE_NOTE
+        self.notify_success(message)
+    
+    def sweep_statuses(self):
+        """Probe the current classroom (or the whole fleet) and apply the statuses that changed"""
+        if not self._current_classroom:
+            return
+        self.run_async(
+            self.computer_service.sweep_statuses,
+            None if self.showing_all_classrooms else self._current_classroom,
+            key="sweep",
+            on_result=self._on_sweep_finished,
+            context="Ошибка при проверке доступности компьютеров"
+        )
+    
+    def _on_sweep_finished(self, computers: List[Computer]):
+        self.apply_computer_updates(computers)
+        if computers:
+            self._queued_offline()
+    
+    def start_status_monitoring(self, interval: Optional[float] = None):
+        """Sweep periodically; intervals are jittered so consoles do not sweep in lockstep"""
+        if interval is None:
+            interval = Config.SWEEP_INTERVAL
+        self._sweep_interval = interval
+        if interval > 0:
+            self._schedule_sweep()
+    
+    def stop_status_monitoring(self):
+        self._sweep_timer.stop()
+    
+    def _schedule_sweep(self):
+        delay = self._sweep_interval * random.uniform(0.9, 1.1)
+        self._sweep_timer.start(int(delay * 1000))
+    
+    def _on_sweep_timer(self):
+        self.sweep_statuses()
+        self._schedule_sweep()
+    
+    def wake_computers(self, computer_ids: List[int]):
+        computers = [
+            self._computers[self._rows_by_id[computer_id]]
+            for computer_id in computer_ids if computer_id in self._rows_by_id
+        ]
+        if not computers:
+            self.notify_error("Не выбрано ни одного компьютера")
+            return
+        self.run_async(
+            self.computer_service.wake_computers,
+            computers,
+            on_result=self._on_wake_finished,
+            context="Ошибка при отправке Wake-on-LAN"
+        )
+    
+    def wake_classroom(self):
+        if not self._current_classroom or self.showing_all_classrooms:
+            return
+        self.run_async(
+            self.computer_service.wake_classroom,
+            self._current_classroom,
+            on_result=self._on_wake_finished,
+            context="Ошибка при отправке Wake-on-LAN"
+        )
+    
+    def _on_wake_finished(self, results):
+        sent = [result for result in results if result.ok]
+        failed = [result for result in results if not result.ok]
+        message = f"Сигнал включения отправлен: {len(sent)} из {len(results)}"
+        if failed:
+            message += "\n" + "\n".join(
+                f"{result.name}: {result.error}" for result in failed[:10]
+            )
+        self.notify_info(message)
+    
+    def import_inventory(self, path: str, dry_run: bool = True):
+        self.run_async(
+            self.computer_service.import_inventory,
+            path,
+            dry_run,
+            key="import",
+            on_result=self._on_import_finished,
+            context="Ошибка при импорте"
+        )
+    
+    def _on_import_finished(self, report):
+        if report is None:
+            self.notify_error("Не удалось выполнить импорт: ошибка базы данных")
+            return
+        if not report.dry_run:
+            self.refresh_data()
+        self.import_finished.emit(report)
     
     def change_theme(self, theme: str):
-        try:
-            success = self.settings_service.set_theme(theme)
-            if success:
-                self.theme_changed.emit(theme)
-                self.notify_info("Тема изменена")
-            else:
-                self.notify_error("Не удалось изменить тему")
-        except Exception as ex:
-            self.handle_exception(ex, "Ошибка при изменении темы")
+        """Apply the theme now; SettingsService saves it in the background"""
+        if theme == self.settings_service.get_theme():
+            return
+        self.settings_service.set_theme(theme)
+        self.theme_changed.emit(theme)
     
     def get_current_theme(self) -> str:
-        try:
-            return self.settings_service.get_theme()
-        except Exception as ex:
-            self.handle_exception(ex, "Ошибка при получении темы")
-            return "light"
+        return self.settings_service.get_theme()
+    
+    @property
+    def preferred_classroom(self) -> str:
+        """Classroom to open when none is selected: the user's last one"""
+        return self.settings_service.settings.classroom
     
     def logout(self):
+        self.stop_status_monitoring()
+        self.stop_live_updates()
         self.auth_service.logout()
         self._current_user = User.create_unauthenticated()
         self.user_logged_out.emit()
         self.notify_info("Вы успешно вышли из системы")
     
+    def get_metrics_snapshot(self) -> Optional[dict]:
+        """Latency/error/row metrics for the diagnostics panel (administrators only)"""
+        if not self.can_access_admin_features():
+            return None
+        return REGISTRY.snapshot()
+    
+    def export_metrics(self, path: str) -> bool:
+        """Write the metrics in Prometheus text format (administrators only)"""
+        if not self.can_access_admin_features():
+            return False
+        try:
+            REGISTRY.write(path)
+        except OSError as ex:
+            self.handle_exception(ex, "Не удалось сохранить метрики")
+            return False
+        self.notify_success(f"Метрики сохранены в {path}")
+        return True
+    
+    def get_slow_query_logging(self) -> Optional[dict]:
+        """Current slow query log settings (administrators only; None if unsupported)"""
+        if not self.can_access_admin_features():
+            return None
+        return self.settings_service.get_slow_query_logging()
+    
+    def set_slow_query_logging(self, enabled: bool, threshold_ms: float) -> bool:
+        """Switch the slow query log at runtime (administrators only)"""
+        if not self.can_access_admin_features():
+            self.notify_error("Недостаточно прав")
+            return False
+        if not self.settings_service.set_slow_query_logging(enabled, threshold_ms / 1000):
+            self.notify_error("Журнал медленных запросов недоступен для этой базы данных")
+            return False
+        return True
+    
     def can_access_admin_features(self) -> bool:
         return self.auth_service.has_admin_access()
     
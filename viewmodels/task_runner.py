@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from config import Config
+from models.metrics import REGISTRY
+
+
+class _TaskSignals(QObject):
+    # Emitted from worker threads; receivers live in the GUI thread,
+    # so Qt delivers them through the event loop (queued connection).
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class _Task(QRunnable):
+
+    def __init__(self, task_id: int, fn: Callable, args: tuple, signals: _TaskSignals):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.signals = signals
+        # Qt deletes the runnable once run() returns, so only a task that has
+        # not started may be handed to tryTake; the lock keeps it from starting
+        # in between
+        self.lock = threading.Lock()
+        self.started = False
+
+    def run(self):
+        with self.lock:
+            self.started = True
+        try:
+            result = self.fn(*self.args)
+        except Exception as ex:
+            self.signals.failed.emit(self.task_id, ex)
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+
+class TaskRunner(QObject):
+    """Runs blocking model calls on a worker pool and delivers results in the GUI thread"""
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent: Optional[QObject] = None, max_threads: Optional[int] = None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads or Config.WORKER_THREADS)
+        self._signals = _TaskSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+        self._next_id = 0
+        self._pending: Dict[int, tuple] = {}   # task id -> (task, key, on_result, on_error, queued_at)
+        self._latest_by_key: Dict[str, int] = {}
+
+    @property
+    def is_busy(self) -> bool:
+        return bool(self._pending)
+
+    def submit(self, fn: Callable, *args: Any, key: Optional[str] = None,
+               on_result: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """Queue fn(*args); a newer task with the same key makes the older one stale"""
+        if key is not None:
+            self.cancel(key)
+
+        self._next_id += 1
+        task_id = self._next_id
+        task = _Task(task_id, fn, args, self._signals)
+
+        was_busy = self.is_busy
+        self._pending[task_id] = (task, key, on_result, on_error, time.perf_counter())
+        if key is not None:
+            self._latest_by_key[key] = task_id
+        self._pool.start(task)
+
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return task_id
+
+    def cancel(self, key: str):
+        """Drop the pending task for key; it is removed from the queue if not yet started"""
+        task_id = self._latest_by_key.pop(key, None)
+        if task_id is None:
+            return
+        entry = self._pending.pop(task_id, None)
+        if entry is not None:
+            # A running task cannot be interrupted; its result is simply ignored
+            task = entry[0]
+            with task.lock:
+                if not task.started:
+                    self._pool.tryTake(task)
+            if not self.is_busy:
+                self.busy_changed.emit(False)
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    def _take(self, task_id: int, failed: bool = False):
+        entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return None
+        key = entry[1]
+        if key is not None and self._latest_by_key.get(key) == task_id:
+            del self._latest_by_key[key]
+        # Queue wait + run + delivery: what the user actually waited for
+        task = key or getattr(entry[0].fn, "__name__", "task")
+        REGISTRY.observe("pc_task_duration_seconds", time.perf_counter() - entry[4], task=task)
+        if failed:
+            REGISTRY.inc("pc_task_errors_total", task=task)
+        return entry
+
+    def _on_finished(self, task_id: int, result: Any):
+        entry = self._take(task_id)
+        if entry is None:
+            return
+        if not self.is_busy:
+            self.busy_changed.emit(False)
+        if entry[2] is not None:
+            entry[2](result)
+
+    def _on_failed(self, task_id: int, error: Exception):
+        entry = self._take(task_id, failed=True)
+        if entry is None:
+            return
+        if not self.is_busy:
+            self.busy_changed.emit(False)
+        if entry[3] is not None:
+            entry[3](error)
@@ -0,0 +1,197 @@
+"""
+Computer table model and delegate - virtualized rendering of the computers table
+"""
+from typing import Any, List, Optional
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, pyqtSignal
+)
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import (
+    QStyledItemDelegate, QStyleOptionButton, QStyleOptionViewItem, QStyle,
+    QApplication
+)
+from models.computer import Computer
+
+
+class ComputerTableModel(QAbstractTableModel):
+    """Table model over a list of Computer objects; only visible rows are painted"""
+
+    more_requested = pyqtSignal()
+
+    NAME_COLUMN = 0
+    IP_COLUMN = 1
+    MAC_COLUMN = 2
+    STATUS_COLUMN = 3
+    ACTIONS_COLUMN = 4
+    HEADERS = ["Имя компьютера", "IP-адрес", "MAC-адрес", "Статус", "Действия"]
+
+    ComputerRole = Qt.ItemDataRole.UserRole
+
+    # (background, foreground) per status, built once
+    STATUS_COLORS = {
+        "online": (QColor(Qt.GlobalColor.green), QColor(Qt.GlobalColor.white)),
+        "offline": (QColor(Qt.GlobalColor.red), QColor(Qt.GlobalColor.white)),
+        "maintenance": (QColor(255, 165, 0), QColor(Qt.GlobalColor.black)),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._computers: List[Computer] = []
+        self._has_more = False
+        self._fetching = False
+
+    def set_computers(self, computers: List[Computer], has_more: bool = False):
+        """Replace the whole data set"""
+        self.beginResetModel()
+        self._computers = list(computers)
+        self._has_more = has_more
+        self._fetching = False
+        self.endResetModel()
+
+    def append_computers(self, computers: List[Computer], has_more: bool):
+        """Add a fetched page below the loaded rows"""
+        self._fetching = False
+        self._has_more = has_more
+        if not computers:
+            return
+        first = len(self._computers)
+        self.beginInsertRows(QModelIndex(), first, first + len(computers) - 1)
+        self._computers.extend(computers)
+        self.endInsertRows()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._has_more and not self._fetching
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetching = True
+            self.more_requested.emit()
+
+    def update_row(self, row: int, computer: Computer):
+        """Replace one computer and repaint only its row"""
+        self._computers[row] = computer
+        self.dataChanged.emit(
+            self.index(row, 0), self.index(row, self.columnCount() - 1)
+        )
+
+    def computer_at(self, row: int) -> Optional[Computer]:
+        if 0 <= row < len(self._computers):
+            return self._computers[row]
+        return None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._computers)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        computer = self._computers[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.NAME_COLUMN:
+                return computer.name
+            if column == self.IP_COLUMN:
+                return computer.ip_address
+            if column == self.MAC_COLUMN:
+                return computer.mac_address
+            if column == self.STATUS_COLUMN:
+                return computer.status.title()
+            return None
+
+        if role == self.ComputerRole:
+            return computer
+
+        if column == self.STATUS_COLUMN and role in (
+            Qt.ItemDataRole.BackgroundRole, Qt.ItemDataRole.ForegroundRole
+        ):
+            colors = self.STATUS_COLORS.get(computer.status.lower())
+            if colors is None:
+                return None
+            return colors[0] if role == Qt.ItemDataRole.BackgroundRole else colors[1]
+
+        return None
+
+
+class ComputerActionsDelegate(QStyledItemDelegate):
+    """Paints the status buttons of the actions column instead of creating widgets"""
+
+    # Emitted with the computer and the requested status
+    status_requested = pyqtSignal(object, str)
+
+    # (status, caption, minimum width)
+    BUTTONS = [
+        ("online", "Онлайн", 60),
+        ("offline", "Оффлайн", 60),
+        ("maintenance", "Обслуживание", 80),
+    ]
+    BUTTON_HEIGHT = 25
+    MARGIN = 5
+    SPACING = 3
+    TEXT_PADDING = 16
+
+    def _button_widths(self, option: QStyleOptionViewItem) -> List[int]:
+        metrics = option.fontMetrics
+        return [
+            max(minimum, metrics.horizontalAdvance(caption) + self.TEXT_PADDING)
+            for _, caption, minimum in self.BUTTONS
+        ]
+
+    def _button_rects(self, option: QStyleOptionViewItem) -> List[QRect]:
+        cell = option.rect
+        rects = []
+        x = cell.x() + self.MARGIN
+        y = cell.y() + max(0, (cell.height() - self.BUTTON_HEIGHT) // 2)
+        for width in self._button_widths(option):
+            rects.append(QRect(x, y, width, self.BUTTON_HEIGHT))
+            x += width + self.SPACING
+        return rects
+
+    def paint(self, painter, option: QStyleOptionViewItem, index: QModelIndex):
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+
+        for (_, caption, _), rect in zip(self.BUTTONS, self._button_rects(option)):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = caption
+            button.palette = option.palette
+            button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex):
+        size = super().sizeHint(option, index)
+        width = 2 * self.MARGIN + sum(self._button_widths(option)) \
+            + self.SPACING * (len(self.BUTTONS) - 1)
+        size.setWidth(width)
+        size.setHeight(max(size.height(), self.BUTTON_HEIGHT + 4))
+        return size
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        if event.type() != QEvent.Type.MouseButtonRelease:
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        pos = event.position().toPoint()
+        for (status, _, _), rect in zip(self.BUTTONS, self._button_rects(option)):
+            if rect.contains(pos):
+                computer = index.data(ComputerTableModel.ComputerRole)
+                if computer is not None:
+                    self.status_requested.emit(computer, status)
+                return True
+        return False
@@ -0,0 +1,178 @@
+"""
+Diagnostics View - live latency, error and pool metrics for administrators
+"""
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog
+)
+from PyQt6.QtCore import Qt, QTimer
+from viewmodels.main_viewmodel import MainViewModel
+
+
+class DiagnosticsView(QWidget):
+    """Per-operation timings and gauges; refreshed every few seconds while open"""
+
+    REFRESH_INTERVAL_MS = 2000
+    OPERATION_HEADERS = ["Операция", "Вызовы", "Ошибки", "Строки", "p50, мс", "p95, мс", "Макс., мс"]
+
+    def __init__(self, view_model: MainViewModel, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.view_model = view_model
+        self.setup_ui()
+        self.connect_signals()
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def setup_ui(self):
+        """Setup the user interface"""
+        self.setWindowTitle("Диагностика")
+        self.resize(760, 520)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Операции (время от вызова до результата):"))
+        self.operations_table = self._create_table(self.OPERATION_HEADERS)
+        layout.addWidget(self.operations_table, 3)
+
+        layout.addWidget(QLabel("Пул соединений и кэш:"))
+        self.gauges_table = self._create_table(["Показатель", "Значение"])
+        layout.addWidget(self.gauges_table, 2)
+
+        slow_layout = QHBoxLayout()
+        self.slow_query_checkbox = QCheckBox("Журнал медленных запросов, порог:")
+        slow_layout.addWidget(self.slow_query_checkbox)
+        self.slow_query_threshold = QSpinBox()
+        self.slow_query_threshold.setRange(1, 60000)
+        self.slow_query_threshold.setSuffix(" мс")
+        slow_layout.addWidget(self.slow_query_threshold)
+        slow_layout.addStretch()
+        layout.addLayout(slow_layout)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        self.refresh_button = QPushButton("Обновить")
+        buttons.addWidget(self.refresh_button)
+        self.export_button = QPushButton("Сохранить для Prometheus...")
+        buttons.addWidget(self.export_button)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+    @staticmethod
+    def _create_table(headers) -> QTableWidget:
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        return table
+
+    def connect_signals(self):
+        """Connect UI signals"""
+        self.refresh_button.clicked.connect(self.refresh)
+        self.export_button.clicked.connect(self.on_export_clicked)
+        self.slow_query_checkbox.toggled.connect(self.on_slow_query_changed)
+        self.slow_query_threshold.editingFinished.connect(self.on_slow_query_changed)
+
+    def showEvent(self, event):
+        """Refresh immediately and keep refreshing while visible"""
+        super().showEvent(event)
+        self.load_slow_query_settings()
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        """No polling while hidden"""
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def load_slow_query_settings(self):
+        """Show the current slow query log state; disabled if the backend has none"""
+        settings = self.view_model.get_slow_query_logging()
+        for widget in (self.slow_query_checkbox, self.slow_query_threshold):
+            widget.blockSignals(True)
+            widget.setEnabled(settings is not None)
+        if settings is not None:
+            self.slow_query_checkbox.setChecked(settings["enabled"])
+            self.slow_query_threshold.setValue(round(settings["threshold"] * 1000))
+        for widget in (self.slow_query_checkbox, self.slow_query_threshold):
+            widget.blockSignals(False)
+
+    def on_slow_query_changed(self, *_):
+        """Apply the checkbox and threshold immediately"""
+        self.view_model.set_slow_query_logging(
+            self.slow_query_checkbox.isChecked(), self.slow_query_threshold.value()
+        )
+
+    def refresh(self):
+        """Reload both tables from the metrics snapshot"""
+        snapshot = self.view_model.get_metrics_snapshot()
+        if snapshot is None:
+            self.close()
+            return
+        self._fill_operations(snapshot)
+        self._fill_gauges(snapshot)
+
+    def _fill_operations(self, snapshot: dict):
+        histograms = snapshot["histograms"]
+        counters = snapshot["counters"]
+        errors = counters.get("pc_operation_errors_total", {})
+        rows = counters.get("pc_operation_rows_total", {})
+        task_errors = counters.get("pc_task_errors_total", {})
+
+        lines = []
+        for key, stats in histograms.get("pc_operation_duration_seconds", {}).items():
+            name = dict(key).get("operation", "")
+            lines.append((name, stats, errors.get(key, 0), rows.get(key, 0)))
+        for key, stats in histograms.get("pc_task_duration_seconds", {}).items():
+            name = "фон: " + dict(key).get("task", "")
+            lines.append((name, stats, task_errors.get(key, 0), 0))
+        for key, stats in histograms.get("pc_db_connection_acquire_seconds", {}).items():
+            lines.append(("получение соединения", stats, 0, 0))
+        # Errors of operations that never completed a timed call still matter
+        timed = {line[0] for line in lines}
+        for key, count in errors.items():
+            name = dict(key).get("operation", "")
+            if name not in timed:
+                lines.append((name, {"count": 0, "p50": 0, "p95": 0, "max": 0}, count, 0))
+        lines.sort(key=lambda line: line[0])
+
+        self.operations_table.setRowCount(len(lines))
+        for row, (name, stats, error_count, row_count) in enumerate(lines):
+            values = [
+                name,
+                str(stats["count"]),
+                f"{error_count:g}",
+                f"{row_count:g}",
+                f"{stats['p50'] * 1000:.1f}",
+                f"{stats['p95'] * 1000:.1f}",
+                f"{stats['max'] * 1000:.1f}",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.operations_table.setItem(row, column, item)
+
+    def _fill_gauges(self, snapshot: dict):
+        lines = []
+        for name, series in snapshot["gauges"].items():
+            for key, value in series.items():
+                label = ", ".join(value_ for _, value_ in key)
+                lines.append((f"{name}: {label}" if label else name, value))
+        lines.sort()
+
+        self.gauges_table.setRowCount(len(lines))
+        for row, (name, value) in enumerate(lines):
+            self.gauges_table.setItem(row, 0, QTableWidgetItem(name))
+            item = QTableWidgetItem(f"{value:.3f}" if value % 1 else f"{value:g}")
+            item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.gauges_table.setItem(row, 1, item)
+
+    def on_export_clicked(self):
+        """Save the metrics as a Prometheus text file"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить метрики", "pc_manager.prom", "Prometheus (*.prom);;Текст (*.txt)"
+        )
+        if path:
+            self.view_model.export_metrics(path)
@@ -57,6 +57,7 @@ class LoginView(QWidget):
         self.view_model.login_failed.connect(self.on_login_failed)
         self.view_model.error_occurred.connect(self.on_error)
         self.view_model.success_occurred.connect(self.on_success)
+        self.view_model.busy_changed.connect(self.on_busy_changed)
         
         # Also connect Enter key in password field to login
         self.password_input.returnPressed.connect(self.on_login_clicked)
@@ -82,6 +83,13 @@ class LoginView(QWidget):
         # Focus back to username
         self.username_input.setFocus()
     
+    def on_busy_changed(self, busy: bool):
+        """Lock the form while credentials are being checked"""
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("Вход..." if busy else "Войти")
+        self.username_input.setEnabled(not busy)
+        self.password_input.setEnabled(not busy)
+    
     def on_error(self, message: str):
         """Handle error notification"""
         QMessageBox.critical(self, "Ошибка", message)
@@ -2,23 +2,28 @@
 Main View - the main application window UI
 """
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
-    QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView,
-    QPushButton, QFrame
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit, QListWidget,
+    QListWidgetItem, QTableView, QMessageBox, QHeaderView, QPushButton, QFrame, QFileDialog
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from viewmodels.main_viewmodel import MainViewModel
 from models.user import User
 from utils.theme_manager import ThemeManager
+from .computer_table_model import ComputerTableModel, ComputerActionsDelegate
+from .diagnostics_view import DiagnosticsView
 
 
 class MainView(QWidget):
     """Main application window UI"""
     
+    STATUS_CAPTIONS = {"online": "Онлайн", "offline": "Оффлайн", "maintenance": "Обслуживание"}
+    
     def __init__(self, view_model: MainViewModel):
         super().__init__()
         self.view_model = view_model
+        self._import_path = ""
+        self._diagnostics_view = None
         self.setup_ui()
         self.connect_signals()
         self.initialize_data()
@@ -52,6 +57,16 @@ class MainView(QWidget):
         theme_layout.addWidget(self.theme_combo)
         top_panel.addLayout(theme_layout)
         
+        # Inventory import (admin only)
+        self.import_button = QPushButton("Импорт...")
+        self.import_button.setVisible(self.view_model.can_access_admin_features())
+        top_panel.addWidget(self.import_button)
+        
+        # Latency and error metrics (admin only)
+        self.diagnostics_button = QPushButton("Диагностика")
+        self.diagnostics_button.setVisible(self.view_model.can_access_admin_features())
+        top_panel.addWidget(self.diagnostics_button)
+        
         # Logout button
         self.logout_button = QPushButton("Выйти")
         self.logout_button.setStyleSheet("""
@@ -81,53 +96,139 @@ class MainView(QWidget):
         classroom_layout.addWidget(QLabel("Кабинет:"))
         self.classroom_combo = QComboBox()
         classroom_layout.addWidget(self.classroom_combo)
+        self.sweep_button = QPushButton("Проверить сеть")
+        classroom_layout.addWidget(self.sweep_button)
         classroom_layout.addStretch()
+        self.busy_label = QLabel("Загрузка...")
+        self.busy_label.setVisible(False)
+        classroom_layout.addWidget(self.busy_label)
+        self.offline_label = QLabel()
+        self.offline_label.setStyleSheet("color: #b35c00;")
+        self.on_connection_changed(self.view_model.server_online)
+        classroom_layout.addWidget(self.offline_label)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск: имя, IP или кабинет")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setMinimumWidth(240)
+        classroom_layout.addWidget(self.search_edit)
         main_layout.addLayout(classroom_layout)
         
-        # Computers table
-        self.pc_table = QTableWidget()
-        self.pc_table.setColumnCount(4)  # Name, IP, Status, Actions
-        self.pc_table.setHorizontalHeaderLabels(["Имя компьютера", "IP-адрес", "Статус", "Действия"])
+        # Search results across all classrooms; hidden while the search box is empty
+        self.search_summary_label = QLabel()
+        self.search_summary_label.setVisible(False)
+        main_layout.addWidget(self.search_summary_label)
+        self.search_results_list = QListWidget()
+        self.search_results_list.setMaximumHeight(160)
+        self.search_results_list.setVisible(False)
+        main_layout.addWidget(self.search_results_list)
         
-        # Configure header
+        # Computers table (model/view: only visible rows are painted)
+        self.pc_model = ComputerTableModel(self)
+        self.pc_actions_delegate = ComputerActionsDelegate(self)
+        self.pc_table = QTableView()
+        self.pc_table.setModel(self.pc_model)
+        self.pc_table.setItemDelegateForColumn(
+            ComputerTableModel.ACTIONS_COLUMN, self.pc_actions_delegate
+        )
+        self.pc_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.pc_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        self.pc_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.pc_table.verticalHeader().setDefaultSectionSize(30)
+        
+        # Configure header (fixed widths: no per-row content measuring)
         header = self.pc_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(ComputerTableModel.ACTIONS_COLUMN, QHeaderView.ResizeMode.Stretch)
+        self.pc_table.setColumnWidth(ComputerTableModel.NAME_COLUMN, 180)
+        self.pc_table.setColumnWidth(ComputerTableModel.IP_COLUMN, 130)
+        self.pc_table.setColumnWidth(ComputerTableModel.MAC_COLUMN, 150)
+        self.pc_table.setColumnWidth(ComputerTableModel.STATUS_COLUMN, 110)
         
         main_layout.addWidget(self.pc_table)
         
+        # Bulk status changes for the selection or the whole classroom
+        bulk_layout = QHBoxLayout()
+        bulk_layout.addWidget(QLabel("Групповое изменение статуса:"))
+        self.bulk_status_combo = QComboBox()
+        for status, caption in self.STATUS_CAPTIONS.items():
+            self.bulk_status_combo.addItem(caption, status)
+        bulk_layout.addWidget(self.bulk_status_combo)
+        self.bulk_selected_button = QPushButton("Применить к выделенным")
+        bulk_layout.addWidget(self.bulk_selected_button)
+        self.bulk_classroom_button = QPushButton("Применить ко всему кабинету")
+        bulk_layout.addWidget(self.bulk_classroom_button)
+        bulk_layout.addStretch()
+        main_layout.addLayout(bulk_layout)
+        
+        # Wake-on-LAN
+        wake_layout = QHBoxLayout()
+        wake_layout.addWidget(QLabel("Включение по сети:"))
+        self.wake_selected_button = QPushButton("Включить выделенные")
+        wake_layout.addWidget(self.wake_selected_button)
+        self.wake_classroom_button = QPushButton("Включить весь кабинет")
+        wake_layout.addWidget(self.wake_classroom_button)
+        wake_layout.addStretch()
+        main_layout.addLayout(wake_layout)
+        
         self.setLayout(main_layout)
     
     def connect_signals(self):
         """Connect UI signals to ViewModel"""
         self.theme_combo.currentTextChanged.connect(self.on_theme_changed)
-        self.classroom_combo.currentTextChanged.connect(self.on_classroom_changed)
+        self.classroom_combo.currentIndexChanged.connect(self.on_classroom_changed)
+        self.search_edit.textChanged.connect(self.view_model.search)
+        self.search_results_list.itemActivated.connect(self.on_search_result_activated)
+        self.search_results_list.itemClicked.connect(self.on_search_result_activated)
         self.logout_button.clicked.connect(self.on_logout_clicked)
+        self.bulk_selected_button.clicked.connect(self.on_bulk_selected_clicked)
+        self.import_button.clicked.connect(self.on_import_clicked)
+        self.diagnostics_button.clicked.connect(self.on_diagnostics_clicked)
+        self.wake_selected_button.clicked.connect(
+            lambda: self.view_model.wake_computers(self.selected_computer_ids())
+        )
+        self.wake_classroom_button.clicked.connect(self.view_model.wake_classroom)
+        self.sweep_button.clicked.connect(self.view_model.sweep_statuses)
+        self.bulk_classroom_button.clicked.connect(self.on_bulk_classroom_clicked)
+        self.pc_actions_delegate.status_requested.connect(
+            lambda computer, status: self.set_computer_status(computer.id, status)
+        )
         
         # Connect ViewModel signals
         self.view_model.computers_changed.connect(self.update_pc_table)
+        self.view_model.computer_updated.connect(self.update_pc_row)
+        self.view_model.computers_appended.connect(self.append_pc_rows)
+        self.view_model.computer_revealed.connect(self.select_pc_row)
+        self.view_model.search_results_changed.connect(self.update_search_results)
+        self.pc_model.more_requested.connect(self.view_model.fetch_more_computers)
         self.view_model.classrooms_changed.connect(self.update_classroom_combo)
         self.view_model.theme_changed.connect(self.on_theme_updated)
+        self.view_model.import_finished.connect(self.on_import_finished)
         self.view_model.user_logged_out.connect(self.on_user_logged_out)
         self.view_model.error_occurred.connect(self.on_error)
         self.view_model.success_occurred.connect(self.on_success)
         self.view_model.info_occurred.connect(self.on_info)
+        self.view_model.busy_changed.connect(self.busy_label.setVisible)
+        self.view_model.connection_changed.connect(self.on_connection_changed)
     
     def initialize_data(self):
         """Initialize UI with data from ViewModel"""
         # Update user info
         self.update_user_info()
         
-        # Load classrooms
-        self.update_classroom_combo()
+        # Load classrooms (the combo box is filled when the data arrives)
+        self.view_model.load_classrooms()
+        self.view_model.load_search_index()
+        self.view_model.start_status_monitoring()
+        self.view_model.start_live_updates()
         
         # Apply current theme
         current_theme = self.view_model.get_current_theme()
         theme_map_ui = {"light": "Светлая", "dark": "Тёмная", "glass": "Стекло"}
         current_ui = theme_map_ui.get(current_theme, "Светлая")
+        # Showing the stored choice must not count as a change to save
+        self.theme_combo.blockSignals(True)
         self.theme_combo.setCurrentText(current_ui)
+        self.theme_combo.blockSignals(False)
         ThemeManager.apply_theme(current_theme)
     
     def update_user_info(self):
@@ -141,83 +242,142 @@ class MainView(QWidget):
     
     def update_classroom_combo(self):
         """Update classroom selection combo box"""
+        current = self.view_model.current_classroom or self.view_model.preferred_classroom
+        classrooms = self.view_model.classrooms
+        
+        self.classroom_combo.blockSignals(True)
         self.classroom_combo.clear()
-        classrooms = self.view_model.load_classrooms()
-        self.classroom_combo.addItems(classrooms)
+        for classroom in classrooms:
+            self.classroom_combo.addItem(classroom, classroom)
+        if classrooms:
+            self.classroom_combo.addItem("Все кабинеты", MainViewModel.ALL_CLASSROOMS)
+        index = self.classroom_combo.findData(current)
+        if index >= 0:
+            self.classroom_combo.setCurrentIndex(index)
+        self.classroom_combo.blockSignals(False)
+        
+        if (self.classroom_combo.currentData() or "") != self.view_model.current_classroom:
+            self.on_classroom_changed()
     
     def update_pc_table(self):
         """Update the computers table"""
-        computers = self.view_model.computers
-        self.pc_table.setRowCount(len(computers))
+        self.pc_model.set_computers(
+            self.view_model.computers, has_more=self.view_model.has_more_computers
+        )
+    
+    def append_pc_rows(self, first_row: int):
+        """Add a page fetched on scroll"""
+        self.pc_model.append_computers(
+            self.view_model.computers[first_row:], self.view_model.has_more_computers
+        )
+    
+    def update_pc_row(self, row: int):
+        """Repaint a single row after a keyed update"""
+        self.pc_model.update_row(row, self.view_model.computers[row])
+    
+    def select_pc_row(self, row: int):
+        """Select and scroll to a row, e.g. a computer picked in the search results"""
+        self.pc_table.selectRow(row)
+        self.pc_table.scrollTo(self.pc_model.index(row, 0))
+    
+    def update_search_results(self):
+        """Show the matches of the current search text"""
+        query = self.search_edit.text().strip()
+        results = self.view_model.search_results
+        total = self.view_model.search_total
         
-        for row, computer in enumerate(computers):
-            # Computer name
-            name_item = QTableWidgetItem(computer.name)
-            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.pc_table.setItem(row, 0, name_item)
-            
-            # IP address
-            ip_item = QTableWidgetItem(computer.ip_address)
-            ip_item.setFlags(ip_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.pc_table.setItem(row, 1, ip_item)
-            
-            # Status
-            status_item = QTableWidgetItem(computer.status.title())
-            status_item.setFlags(status_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            # Color code status
-            if computer.is_online():
-                status_item.setBackground(Qt.GlobalColor.green)
-                status_item.setForeground(Qt.GlobalColor.white)
-            elif computer.is_offline():
-                status_item.setBackground(Qt.GlobalColor.red)
-                status_item.setForeground(Qt.GlobalColor.white)
-            elif computer.is_in_maintenance():
-                status_item.setBackground(Qt.GlobalColor.orange)
-                status_item.setForeground(Qt.GlobalColor.black)
-            self.pc_table.setItem(row, 2, status_item)
-            
-            # Actions (buttons for changing status)
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout(actions_widget)
-            actions_layout.setContentsMargins(5, 2, 5, 2)
-            actions_layout.setSpacing(3)
-            
-            # Online button
-            online_btn = QPushButton("Онлайн")
-            online_btn.setFixedSize(60, 25)
-            online_btn.clicked.connect(lambda _, name=computer.name: self.set_computer_status(name, "online"))
-            
-            # Offline button
-            offline_btn = QPushButton("Оффлайн")
-            offline_btn.setFixedSize(60, 25)
-            offline_btn.clicked.connect(lambda _, name=computer.name: self.set_computer_status(name, "offline"))
-            
-            # Maintenance button
-            maint_btn = QPushButton("Обслуживание")
-            maint_btn.setFixedSize(80, 25)
-            maint_btn.clicked.connect(lambda _, name=computer.name: self.set_computer_status(name, "maintenance"))
-            
-            actions_layout.addWidget(online_btn)
-            actions_layout.addWidget(offline_btn)
-            actions_layout.addWidget(maint_btn)
-            actions_layout.addStretch()
-            
-            self.pc_table.setCellWidget(row, 3, actions_widget)
+        self.search_results_list.clear()
+        for computer in results:
+            item = QListWidgetItem(
+                f"{computer.name}   {computer.ip_address}   {computer.classroom}   "
+                f"{self.STATUS_CAPTIONS.get(computer.status, computer.status)}"
+            )
+            item.setData(Qt.ItemDataRole.UserRole, computer)
+            self.search_results_list.addItem(item)
         
-        # Resize columns to fit content
-        self.pc_table.resizeColumnsToContents()
+        if total > len(results):
+            summary = f"Найдено: {total}, показаны первые {len(results)}"
+        else:
+            summary = f"Найдено: {total}"
+        self.search_summary_label.setText(summary)
+        self.search_summary_label.setVisible(bool(query))
+        self.search_results_list.setVisible(bool(results))
     
-    def set_computer_status(self, name: str, status: str):
+    def on_search_result_activated(self, item: QListWidgetItem):
+        """Open the computer's classroom and select its row"""
+        computer = item.data(Qt.ItemDataRole.UserRole)
+        index = self.classroom_combo.findData(computer.classroom)
+        if index >= 0:
+            self.classroom_combo.setCurrentIndex(index)
+        self.view_model.reveal_computer(computer.id)
+    
+    def set_computer_status(self, computer_id: int, status: str):
         """Set computer status"""
-        try:
-            success = self.view_model.computer_service.update_computer_status(name, status)
-            if success:
-                self.view_model.refresh_data()  # Refresh the view
-                self.view_model.notify_success(f"Статус компьютера {name} изменен на {status}")
-            else:
-                self.view_model.notify_error(f"Не удалось изменить статус компьютера {name}")
-        except Exception as ex:
-            self.view_model.handle_exception(ex, f"Ошибка при изменении статуса компьютера {name}")
+        self.view_model.set_computer_status(computer_id, status)
+    
+    def selected_computer_ids(self) -> list:
+        """Ids of the computers in the selected table rows"""
+        ids = []
+        for index in self.pc_table.selectionModel().selectedRows():
+            computer = self.pc_model.computer_at(index.row())
+            if computer is not None and computer.id is not None:
+                ids.append(computer.id)
+        return ids
+    
+    def on_bulk_selected_clicked(self):
+        """Apply the chosen status to all selected computers"""
+        status = self.bulk_status_combo.currentData()
+        self.view_model.set_status_for_computers(self.selected_computer_ids(), status)
+    
+    def on_bulk_classroom_clicked(self):
+        """Apply the chosen status to every computer of the current classroom"""
+        status = self.bulk_status_combo.currentData()
+        reply = QMessageBox.question(
+            self,
+            "Подтверждение",
+            f"Изменить статус всех компьютеров кабинета {self.view_model.current_classroom} "
+            f"на «{self.bulk_status_combo.currentText()}»?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.view_model.set_status_for_classroom(status)
+    
+    def on_import_clicked(self):
+        """Pick an inventory file and start with a dry run"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Импорт компьютеров", "", "Инвентарь (*.json *.csv)"
+        )
+        if path:
+            self._import_path = path
+            self.view_model.import_inventory(path, dry_run=True)
+    
+    def on_import_finished(self, report):
+        """Show the dry-run diff and apply it on confirmation"""
+        details = report.summary()
+        if report.errors:
+            details += "\n\n" + "\n".join(report.errors[:10])
+        
+        if not report.dry_run:
+            self.view_model.notify_success(details)
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "Импорт компьютеров",
+            details + "\n\nПрименить изменения?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.view_model.import_inventory(self._import_path, dry_run=False)
+    
+    def on_diagnostics_clicked(self):
+        """Open (or raise) the diagnostics window"""
+        if self._diagnostics_view is None:
+            self._diagnostics_view = DiagnosticsView(self.view_model, self)
+        self._diagnostics_view.show()
+        self._diagnostics_view.raise_()
     
     def on_theme_changed(self, ui_name: str):
         """Handle theme selection change"""
@@ -233,9 +393,22 @@ class MainView(QWidget):
                 "Для лучшего отображения эффекта стекла рекомендуется перезапустить приложение."
             )
     
-    def on_classroom_changed(self, classroom: str):
+    def on_connection_changed(self, online: bool):
+        """Show whether the data comes from the server or the local snapshot"""
+        text = "Нет связи с сервером — показаны сохраненные данные"
+        pending = 0 if online else self.view_model.pending_writes
+        if pending:
+            text += f", изменений ждут отправки: {pending}"
+        self.offline_label.setText(text)
+        self.offline_label.setVisible(not online)
+    
+    def on_classroom_changed(self, *_):
         """Handle classroom selection change"""
-        self.view_model.current_classroom = classroom
+        self.view_model.current_classroom = self.classroom_combo.currentData() or ""
+        # Whole-classroom actions do not apply to the fleet-wide listing
+        single_room = not self.view_model.showing_all_classrooms
+        self.bulk_classroom_button.setEnabled(single_room)
+        self.wake_classroom_button.setEnabled(single_room)
     
     def on_logout_clicked(self):
         """Handle logout button click"""
@@ -250,6 +423,12 @@ class MainView(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             self.view_model.logout()
     
+    def closeEvent(self, event):
+        """Stop background feeds when the window goes away"""
+        self.view_model.stop_live_updates()
+        self.view_model.stop_status_monitoring()
+        super().closeEvent(event)
+    
     def on_user_logged_out(self):
         """Handle user logout"""
         self.close()